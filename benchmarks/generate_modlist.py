@@ -0,0 +1,189 @@
+"""Write synthetic .wabbajack files for benchmarking Wabbajack Viewer.
+
+The modlist is streamed into the zip one archive and directive at a time,
+so even million-directive lists are generated in constant memory.
+
+    python benchmarks/generate_modlist.py out.wabbajack --directives 100000 --archives 2000
+"""
+import argparse
+import base64
+import json
+import random
+import sys
+import zipfile
+
+# Default share of each directive type, roughly as seen in large Skyrim lists
+DEFAULT_TYPE_MIX = {
+    'FromArchive': 80,
+    'PatchedFromArchive': 6,
+    'InlineFile': 5,
+    'RemappedInlineFile': 2,
+    'TransformedTexture': 4,
+    'CreateBSA': 2,
+    'MergedPatch': 1,
+}
+
+# Most recent distinct file contents that duplicated directives copy from
+DUPLICATE_POOL_SIZE = 100000
+
+# Directive types that extract their file from an archive
+ARCHIVE_TYPES = ('FromArchive', 'PatchedFromArchive', 'TransformedTexture')
+
+_TOP_DIRS = ('mods', 'mods', 'mods', 'mods', 'profiles', 'Stock Game', 'tools', 'downloads')
+_SUB_DIRS = ('meshes', 'textures', 'scripts', 'sound', 'interface', 'actors', 'character', 'armor',
+             'weapons', 'clutter', 'architecture', 'landscape', 'effects', 'skse', 'plugins', 'voice')
+_EXTENSIONS = ('.nif', '.dds', '.pex', '.wav', '.xwm', '.esp', '.ini', '.json', '.hkx', '.txt')
+_WORDS = ('Better', 'Immersive', 'Skyrim', 'Armor', 'Weapons', 'Textures', 'HD', 'Lux', 'Patch', 'Overhaul',
+          'Realistic', 'Water', 'Trees', 'Grass', 'Combat', 'Animations', 'Voices', 'Fixes', 'Unofficial', 'SE')
+
+
+def parse_type_mix(text):
+    """Parse 'FromArchive=80,InlineFile=5,...' into a {type: weight} dict"""
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def encode_hash(value):
+    return base64.b64encode(value.to_bytes(8, 'little')).decode('ascii')
+
+
+def make_archive(rng, index):
+    """A realistic archive record; most come from Nexus, the rest from direct downloads"""
+    name = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(2, 4)))
+    filename = f"{name.replace(' ', '_')}-{index}-{rng.randint(1, 9)}-{rng.randint(0, 9)}.7z"
+    archive = {
+        'Hash': encode_hash(rng.getrandbits(64)),
+        'Meta': "[General]\ngameName=SkyrimSpecialEdition\n",
+        'Name': filename,
+        'Size': rng.randint(10 * 1024, 2 * 1024 * 1024 * 1024),
+    }
+    if rng.random() < 0.85:
+        archive['State'] = {
+            '$type': 'NexusDownloader, Wabbajack.Lib',
+            'Author': f"Author{rng.randint(1, 500)}",
+            'Description': f"{name} for Skyrim Special Edition",
+            'FileID': rng.randint(1, 500000),
+            'GameName': 'SkyrimSpecialEdition',
+            'ImageURL': f"https://staticdelivery.nexusmods.com/mods/1704/images/{index}/{index}-1.jpg",
+            'IsNSFW': False,
+            'ModID': index + 1,
+            'Name': name,
+            'Version': f"{rng.randint(0, 5)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}",
+        }
+    else:
+        archive['State'] = {
+            '$type': 'HttpDownloader, Wabbajack.Lib',
+            'Url': f"https://example.com/files/{filename}",
+        }
+    return archive
+
+
+def make_path(rng, depth, extension):
+    parts = [rng.choice(_SUB_DIRS) for _ in range(rng.randint(0, depth))]
+    parts.append(f"{rng.choice(_WORDS).lower()}_{rng.getrandbits(32):08x}{extension}")
+    return '\\'.join(parts)
+
+
+def make_directive(rng, directive_type, archives, depth):
+    """A directive of the given type installing into a random mod folder"""
+    extension = '.bsa' if directive_type == 'CreateBSA' else rng.choice(_EXTENSIONS)
+    archive = rng.choice(archives)
+    top = rng.choice(_TOP_DIRS)
+    if top == 'mods':
+        mod_name = archive.get('State', {}).get('Name') or archive['Name']
+        to = f"mods\\{mod_name}\\{make_path(rng, depth, extension)}"
+    else:
+        to = f"{top}\\{make_path(rng, max(1, depth // 2), extension)}"
+
+    directive = {
+        '$type': directive_type,
+        'Hash': encode_hash(rng.getrandbits(64)),
+        'Size': int(rng.lognormvariate(11, 2.5)),
+        'To': to,
+    }
+    if directive_type in ARCHIVE_TYPES:
+        directive['ArchiveHashPath'] = [archive['Hash'], make_path(rng, depth, extension)]
+    if directive_type == 'PatchedFromArchive':
+        directive['FromHash'] = encode_hash(rng.getrandbits(64))
+        directive['PatchID'] = f"{rng.getrandbits(128):032x}"
+    elif directive_type in ('InlineFile', 'RemappedInlineFile', 'MergedPatch'):
+        directive['SourceDataID'] = f"{rng.getrandbits(128):032x}"
+    elif directive_type == 'TransformedTexture':
+        directive['ImageState'] = {'Format': 'BC7_UNORM', 'Height': 2048, 'Width': 2048, 'MipLevels': 12}
+    elif directive_type == 'CreateBSA':
+        directive['TempID'] = f"{rng.getrandbits(128):032x}"
+        directive['FileStates'] = []
+    return directive
+
+
+def generate_modlist(path, directives=10000, archives=500, depth=4, type_mix=None, seed=0, duplicates=0.0):
+    """Write a synthetic .wabbajack file; the same arguments always give the same modlist.
+
+    ``duplicates`` is the share of directives installing the same content
+    (hash and size) as an earlier one, as when several archives ship one file.
+    """
+    rng = random.Random(seed)
+    type_mix = type_mix or DEFAULT_TYPE_MIX
+    type_names = list(type_mix)
+    type_weights = [type_mix[name] for name in type_names]
+
+    archive_records = [make_archive(rng, index) for index in range(archives)]
+    header = {
+        'Author': 'Benchmark',
+        'Description': f"Synthetic modlist with {directives} directives and {archives} archives",
+        'GameType': 'SkyrimSpecialEdition',
+        'IsNSFW': False,
+        'Name': f"Synthetic {directives}",
+        'Version': '1.0.0',
+        'WabbajackVersion': '3.0.0.0',
+    }
+
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        with zip_ref.open('modlist', 'w', force_zip64=True) as member:
+            def write(text):
+                member.write(text.encode('utf-8'))
+
+            write('{"Archives":[')
+            for index, archive in enumerate(archive_records):
+                write((',' if index else '') + json.dumps(archive))
+            write('],"Directives":[')
+            types = rng.choices(type_names, type_weights, k=directives)
+            contents = []
+            for index, directive_type in enumerate(types):
+                directive = make_directive(rng, directive_type, archive_records, depth)
+                if duplicates:
+                    if contents and rng.random() < duplicates:
+                        directive['Hash'], directive['Size'] = rng.choice(contents)
+                    else:
+                        contents.append((directive['Hash'], directive['Size']))
+                        if len(contents) > DUPLICATE_POOL_SIZE:
+                            contents[rng.randrange(DUPLICATE_POOL_SIZE)] = contents.pop()
+                write((',' if index else '') + json.dumps(directive))
+            write('],')
+            write(json.dumps(header)[1:])
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic .wabbajack file")
+    parser.add_argument('output', help="Path of the .wabbajack file to write")
+    parser.add_argument('--directives', type=int, default=10000, help="Number of directives (default: 10000)")
+    parser.add_argument('--archives', type=int, default=500, help="Number of archives (default: 500)")
+    parser.add_argument('--depth', type=int, default=4, help="Maximum directory depth below a mod folder (default: 4)")
+    parser.add_argument('--type-mix', type=parse_type_mix, default=None,
+                        help="Directive type weights, e.g. 'FromArchive=80,InlineFile=20'")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument('--duplicates', type=float, default=0.0,
+                        help="Share of directives repeating an earlier file's content (default: 0)")
+    args = parser.parse_args(argv)
+
+    generate_modlist(args.output, directives=args.directives, archives=args.archives, depth=args.depth,
+                     type_mix=args.type_mix, seed=args.seed, duplicates=args.duplicates)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,452 @@
+"""Reproducible benchmarks for Wabbajack Viewer.
+
+Synthetic modlists are generated once into a work directory and reused, then
+each step of opening and browsing a modlist is timed and the results are
+written as JSON so runs can be compared:
+
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 -o results.json
+    python benchmarks/run_benchmarks.py -o new.json --compare results.json
+
+Startup is timed in fresh processes against a budget, and a run that goes
+over it exits with status 1. By default the model layer behind each GUI
+step is timed, so no display is needed. ``--gui`` drives the real window instead; on a headless machine run
+it under ``xvfb-run``.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from generate_modlist import generate_modlist  # noqa: E402
+from wabbajack_cache import ModlistCache, load_modlist_cached  # noqa: E402
+from wabbajack_dedup import DuplicateAnalysis  # noqa: E402
+from wabbajack_modlist import (DIRECTIVE_MEMORY_MIN_DIRECTIVES, DIRECTIVE_MEMORY_TARGET, Modlist,  # noqa: E402
+                               ModlistStreamReader, build_directory_tree, find_modlist_member, load_modlist)
+from wabbajack_search import SearchIndex  # noqa: E402
+from wabbajack_session import ModlistSession, build_mod_rows  # noqa: E402
+from wabbajack_sort import SORT_KEYS, SortIndex  # noqa: E402
+from wabbajack_query import ArchiveTable, Query  # noqa: E402
+from wabbajack_tree import InstallTree  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Text typed into the search box, one keystroke at a time
+SEARCH_QUERY = 'immersive armor'
+
+# Structured queries timed against the archive columns
+BENCHMARK_QUERIES = [
+    'size>500MB',
+    'author:author1 size>500MB type:nexus game:skyrimspecialedition files>10',
+    '(type:http OR installed>100MB) -version<1.0 better',
+]
+
+# Share of generated directives repeating an earlier file's content, for the duplicate analysis
+DEFAULT_DUPLICATES = 0.05
+
+# Peak traced bytes per directive allowed while grouping files by content hash
+DUPLICATE_MEMORY_TARGET = 128
+
+# Number of archives selected for the per-selection benchmarks
+SELECTION_SAMPLES = 50
+
+# Times the same modlist is reopened to check that memory stays flat, and the
+# traced growth per reopen allowed (phase timings are kept, so it is not zero)
+RELOADS = 5
+RELOAD_MEMORY_TARGET = 16 * 1024
+
+# Startup budgets: starting Python and importing the viewer, and (with --gui) until
+# the window is drawn with a modlist load under way. Startup is timed in fresh
+# processes, the fastest of STARTUP_RUNS
+STARTUP_IMPORT_BUDGET = 0.15
+STARTUP_WINDOW_BUDGET = 0.5
+STARTUP_RUNS = 10
+
+# Shows the window for a modlist given on the command line, as main() does, then exits
+STARTUP_WINDOW_SCRIPT = """
+import sys
+import tkinter as tk
+import wabbajack_viewer
+root = tk.Tk()
+wabbajack_viewer.WabbajackGuideApp(root, sys.argv[1])
+root.update()
+"""
+
+# A step counts as a regression when it is this much slower than the baseline...
+REGRESSION_THRESHOLD = 0.25
+# ...and also slower by at least this many seconds, so timer noise on tiny steps is ignored
+REGRESSION_MIN_SECONDS = 0.005
+
+
+def timed(func, *args):
+    """Return (seconds, result) of one call"""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def measure(name, directives, func, repeat=1):
+    """Time func over repeat runs; the result record keeps every run and the best"""
+    runs = []
+    result = None
+    for _ in range(repeat):
+        seconds, result = timed(func)
+        runs.append(seconds)
+    return {'name': name, 'directives': directives, 'seconds': min(runs), 'runs': runs}, result
+
+
+def measure_each(name, directives, func, inputs):
+    """Time func once per input, for steps that run once per keystroke or selection"""
+    runs = [timed(func, value)[0] for value in inputs]
+    return {'name': name, 'directives': directives, 'seconds': statistics.mean(runs) if runs else 0.0,
+            'max_seconds': max(runs, default=0.0), 'runs': runs}
+
+
+def measure_startup(name, directives, command, budget, runs=STARTUP_RUNS):
+    """Wall time of a fresh Python process running command, checked against a budget"""
+    def run():
+        subprocess.run([sys.executable] + command, cwd=REPO_DIR, check=True)
+    record, _ = measure(name, directives, run, runs)
+    record['budget'] = budget
+    return record
+
+
+def over_budget(record):
+    return 'budget' in record and record['seconds'] > record['budget']
+
+
+def over_target(record):
+    return 'target' in record and record['bytes'] > record['target']
+
+
+def ensure_modlist(work_dir, directives, archives, depth, seed, duplicates=0.0):
+    """Generate a synthetic modlist unless an identical one is already in the work directory"""
+    suffix = f"-d{duplicates:g}" if duplicates else ''
+    path = os.path.join(work_dir, f"synthetic-{directives}-{archives}-{depth}-{seed}{suffix}.wabbajack")
+    if not os.path.exists(path):
+        temp_path = path + '.tmp'
+        generate_modlist(temp_path, directives=directives, archives=archives, depth=depth, seed=seed,
+                         duplicates=duplicates)
+        os.replace(temp_path, path)
+    return path
+
+
+def read_directives(wabbajack_path):
+    """Parse a modlist's directives into a list, outside of any timed step"""
+    with zipfile.ZipFile(wabbajack_path, 'r') as zip_ref:
+        with zip_ref.open(find_modlist_member(zip_ref)) as stream:
+            return [value for key, value in ModlistStreamReader(stream) if key == 'Directives']
+
+
+def sample_archives(modlist, count, seed):
+    """Archive indexes to select, always including the archive with the most files"""
+    rng = random.Random(seed)
+    indexes = rng.sample(range(len(modlist.archives)), min(count, len(modlist.archives)))
+    store = modlist.mod_details
+    totals = {archive_hash: files for archive_hash, files, _ in store.archive_totals() if archive_hash}
+    if totals:
+        largest = modlist.archive_index.get(max(totals, key=totals.get))
+        if largest is not None and largest not in indexes:
+            indexes[-1:] = [largest]
+    return indexes
+
+
+def reload_memory_growth(wabbajack_path, cache, reloads=RELOADS):
+    """Traced bytes retained per reopen when each new session replaces and closes the previous one"""
+    tracemalloc.start()
+    try:
+        session = ModlistSession.load(wabbajack_path, cache)
+        file_count = len(session.mod_details)
+        # The first reopen fills one-off caches (regular expressions, the JSON scanner, ...)
+        baseline = None
+        for _ in range(reloads + 1):
+            previous, session = session, ModlistSession.load(wabbajack_path, cache)
+            previous.close()
+            if len(session.mod_details) != file_count:
+                raise RuntimeError(f"Reopening changed the file count from {file_count} to "
+                                   f"{len(session.mod_details)}")
+            gc.collect()
+            if baseline is None:
+                baseline = tracemalloc.get_traced_memory()[0]
+        return (tracemalloc.get_traced_memory()[0] - baseline) / reloads
+    finally:
+        tracemalloc.stop()
+
+
+def duplicate_analysis_peak(modlist):
+    """Peak traced bytes per directive while grouping a modlist's files by content hash"""
+    tracemalloc.start()
+    try:
+        DuplicateAnalysis(modlist)
+        return tracemalloc.get_traced_memory()[1] / max(len(modlist.mod_details), 1)
+    finally:
+        tracemalloc.stop()
+
+
+def run_model_benchmarks(wabbajack_path, directives, repeat, seed):
+    """Time the model-layer work behind each GUI step"""
+    results = []
+
+    # extract_and_load_modlist: a cold parse, then the first and a repeated open through the cache
+    record, modlist = measure('load_modlist', directives, lambda: load_modlist(wabbajack_path), repeat)
+    results.append(record)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ModlistCache(cache_dir)
+        record, _ = measure('load_modlist_cached_cold', directives,
+                            lambda: load_modlist_cached(wabbajack_path, cache), 1)
+        results.append(record)
+        record, _ = measure('load_modlist_cached_warm', directives,
+                            lambda: load_modlist_cached(wabbajack_path, cache), repeat)
+        results.append(record)
+
+        # Reopening, as the window does: memory must not grow from one session to the next
+        results.append({'name': 'reload_memory_growth', 'directives': directives,
+                        'bytes': reload_memory_growth(wabbajack_path, cache), 'target': RELOAD_MEMORY_TARGET})
+
+    # process_directives on already parsed directives, so JSON decoding is not counted
+    parsed = read_directives(wabbajack_path)
+
+    def process():
+        processed = Modlist(wabbajack_path)
+        processed.process_directives(parsed)
+        return processed
+    record, _ = measure('process_directives', directives, process, repeat)
+    results.append(record)
+
+    store = modlist.mod_details
+    record = {'name': 'memory_per_directive', 'directives': directives,
+              'bytes': store.memory_usage() / max(len(store), 1)}
+    if directives >= DIRECTIVE_MEMORY_MIN_DIRECTIVES:
+        record['target'] = DIRECTIVE_MEMORY_TARGET
+    results.append(record)
+
+    # open_install_tree: the tree is built at load, the window lists the largest directories
+    record, install_tree = measure('build_install_tree', directives, lambda: InstallTree.build(store), repeat)
+    results.append(record)
+    record, _ = measure('largest_directories', directives, lambda: install_tree.largest(500), repeat)
+    results.append(record)
+
+    # open_duplicates: grouping every file by content hash, then sorting the groups as a heading click does
+    record, analysis = measure('find_duplicates', directives, lambda: DuplicateAnalysis(modlist), repeat)
+    results.append(record)
+    results.append({'name': 'duplicate_analysis_peak_memory', 'directives': directives,
+                    'bytes': duplicate_analysis_peak(modlist), 'target': DUPLICATE_MEMORY_TARGET})
+    results.append(measure_each('sort_duplicates_click', directives,
+                                lambda column: analysis.order(column, True),
+                                ['group_wasted', 'group_copies', 'group_size', 'group_archives']))
+
+    # populate_mod_list: building the rows and search index the list is filled from
+    record, _ = measure('populate_mod_list', directives, lambda: build_mod_rows(modlist.archives, store), repeat)
+    results.append(record)
+    record, search_index = measure('build_search_index', directives, lambda: SearchIndex(modlist.archives), repeat)
+    results.append(record)
+
+    # sort_mods: the precomputed keys, then a click on each sortable heading
+    record, sort_index = measure('build_sort_index', directives, lambda: SortIndex(modlist), repeat)
+    results.append(record)
+    results.append(measure_each('sort_mods_click', directives,
+                                lambda key: sort_index.order([(key, True), ('name', False)]), SORT_KEYS))
+
+    # filter_mods, once per keystroke of the query
+    prefixes = [SEARCH_QUERY[:length] for length in range(1, len(SEARCH_QUERY) + 1)]
+    results.append(measure_each('filter_mods_keystroke', directives, search_index.search, prefixes))
+
+    # filter_mods with structured queries: parsing plus a vectorized pass over the archive columns
+    record, archive_table = measure('build_query_columns', directives, lambda: ArchiveTable(modlist), repeat)
+    results.append(record)
+    results.append(measure_each('filter_mods_query', directives,
+                                lambda text: Query(text).evaluate(archive_table), BENCHMARK_QUERIES))
+
+    # on_mod_select and update_files_tab, on a sample of archives
+    selected = sample_archives(modlist, SELECTION_SAMPLES, seed)
+    results.append(measure_each('on_mod_select', directives, modlist.overview, selected))
+    hashes = [modlist.archives[index].get('Hash', '') for index in selected]
+    hashes = [archive_hash for archive_hash in hashes if archive_hash in store]
+    results.append(measure_each('update_files_tab', directives,
+                                lambda archive_hash: build_directory_tree(store[archive_hash]), hashes))
+    return results
+
+
+def run_gui_benchmarks(wabbajack_path, directives, repeat, seed):
+    """Time the real GUI methods; needs a display (or Xvfb)"""
+    import tkinter as tk
+    import wabbajack_viewer
+
+    # Dialogs would block the run; errors are collected and end it instead
+    errors = []
+    wabbajack_viewer.messagebox.askyesno = lambda *args, **kwargs: False
+    wabbajack_viewer.messagebox.showinfo = lambda *args, **kwargs: None
+    wabbajack_viewer.messagebox.showerror = lambda title, message, **kwargs: errors.append(message)
+
+    results = []
+    root = tk.Tk()
+    root.withdraw()
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            app = wabbajack_viewer.WabbajackGuideApp(root)
+            app.cache = ModlistCache(cache_dir)
+
+            def load():
+                app.extract_and_load_modlist(wabbajack_path)
+                while app.load_queue is not None or app.modlist is None:
+                    if errors:
+                        raise RuntimeError(errors[0])
+                    root.update()
+                    time.sleep(0.001)
+                root.update_idletasks()
+            # The first load parses the file, later ones come from the cache
+            record, _ = measure('extract_and_load_modlist_cold', directives, load, 1)
+            results.append(record)
+            record, _ = measure('extract_and_load_modlist_warm', directives, load, repeat)
+            results.append(record)
+
+            def populate():
+                app.populate_mod_list()
+                root.update_idletasks()
+            record, _ = measure('populate_mod_list', directives, populate, repeat)
+            results.append(record)
+
+            def keystroke(query):
+                app.search_var.set(query)
+                app.filter_mods()
+                root.update_idletasks()
+            prefixes = [SEARCH_QUERY[:length] for length in range(1, len(SEARCH_QUERY) + 1)]
+            results.append(measure_each('filter_mods_keystroke', directives, keystroke, prefixes))
+            keystroke('')
+
+            selected = sample_archives(app.modlist, SELECTION_SAMPLES, seed)
+
+            def select(archive_index):
+                app.on_mod_select(archive_index)
+                root.update_idletasks()
+            results.append(measure_each('on_mod_select', directives, select, selected))
+
+            def files_tab(archive_hash):
+                app.update_files_tab(archive_hash)
+                root.update_idletasks()
+            hashes = [app.session.archives[index].get('Hash', '') for index in selected]
+            results.append(measure_each('update_files_tab', directives, files_tab, hashes))
+    finally:
+        root.destroy()
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(results, baseline):
+    """Print timings against a baseline run; returns the number of regressions"""
+    previous = {(record['name'], record['directives']): record for record in baseline['results']}
+    regressions = 0
+    for record in results:
+        old = previous.get((record['name'], record['directives']))
+        if old is None or 'seconds' not in record or 'seconds' not in old:
+            continue
+        change = (record['seconds'] - old['seconds']) / old['seconds'] if old['seconds'] else 0.0
+        regressed = (change > REGRESSION_THRESHOLD and
+                     record['seconds'] - old['seconds'] > REGRESSION_MIN_SECONDS)
+        regressions += regressed
+        print(f"{record['name']:<32} {record['directives']:>9,} {old['seconds'] * 1000:10.2f} ms "
+              f"-> {record['seconds'] * 1000:10.2f} ms {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def print_results(results):
+    for record in results:
+        if 'seconds' in record:
+            extra = f" (max {record['max_seconds'] * 1000:.2f} ms)" if 'max_seconds' in record else ''
+            if 'budget' in record:
+                extra = f" (budget {record['budget'] * 1000:.0f} ms){'  OVER BUDGET' if over_budget(record) else ''}"
+            print(f"{record['name']:<32} {record['directives']:>9,} {record['seconds'] * 1000:10.2f} ms{extra}")
+        else:
+            print_bytes(record)
+
+
+def print_bytes(record):
+    extra = ''
+    if 'target' in record:
+        extra = f" (target {record['target']}){'  OVER TARGET' if over_target(record) else ''}"
+    print(f"{record['name']:<32} {record['directives']:>9,} {record['bytes']:10.1f} bytes{extra}")
+
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(',') if size]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Wabbajack Viewer on synthetic modlists")
+    parser.add_argument('--sizes', type=parse_sizes, default=list(DEFAULT_SIZES),
+                        help="Comma-separated directive counts (default: 1000,10000,100000)")
+    parser.add_argument('--archives-per-directive', type=float, default=0.02,
+                        help="Archives generated per directive (default: 0.02, at least 10)")
+    parser.add_argument('--depth', type=int, default=4, help="Maximum directory depth (default: 4)")
+    parser.add_argument('--duplicates', type=float, default=DEFAULT_DUPLICATES,
+                        help=f"Share of directives repeating an earlier file's content (default: {DEFAULT_DUPLICATES})")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed for generation and sampling")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per step; the fastest is reported")
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'wabbajack-viewer-bench'),
+                        help="Where generated modlists are kept between runs")
+    parser.add_argument('--gui', action='store_true', help="Time the real GUI instead of the model layer")
+    parser.add_argument('-o', '--output', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file; exit with status 1 on regressions")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    run = run_gui_benchmarks if args.gui else run_model_benchmarks
+    results = [measure_startup('startup_import', 0, ['-c', 'import wabbajack_viewer'], STARTUP_IMPORT_BUDGET)]
+    for directives in args.sizes:
+        archives = max(10, int(directives * args.archives_per_directive))
+        wabbajack_path = ensure_modlist(args.work_dir, directives, archives, args.depth, args.seed, args.duplicates)
+        if args.gui and directives == args.sizes[0]:
+            results.append(measure_startup('startup_window', directives,
+                                           ['-c', STARTUP_WINDOW_SCRIPT, wabbajack_path], STARTUP_WINDOW_BUDGET))
+        results.extend(run(wabbajack_path, directives, args.repeat, args.seed))
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'mode': 'gui' if args.gui else 'model',
+        'settings': {'sizes': args.sizes, 'archives_per_directive': args.archives_per_directive,
+                     'depth': args.depth, 'seed': args.seed, 'duplicates': args.duplicates,
+                     'repeat': args.repeat},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    # Startup over budget and memory over target fail the run like a regression does
+    failures = sum(map(over_budget, results)) + sum(map(over_target, results))
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        failures += compare_results(results, baseline)
+        for record in filter(over_target, results):
+            print_bytes(record)
+    else:
+        print_results(results)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
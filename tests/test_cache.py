@@ -0,0 +1,22 @@
+"""ModlistCache recovering from damaged entries"""
+import os
+
+import pytest
+
+from generate_modlist import generate_modlist
+from wabbajack_cache import ModlistCache, load_modlist_cached, modlist_cache_key
+
+
+@pytest.mark.parametrize('keep_bytes', [0, 4, 12, 200])
+def test_truncated_entry_is_a_miss_and_rewritten(tmp_path, keep_bytes):
+    path = generate_modlist(str(tmp_path / 'cached.wabbajack'), directives=500, archives=10)
+    cache = ModlistCache(str(tmp_path / 'cache'))
+    directives = len(load_modlist_cached(path, cache).mod_details)
+    entry_path = cache._entry_path(modlist_cache_key(path))
+    with open(entry_path, 'r+b') as f:
+        f.truncate(keep_bytes)
+
+    assert cache.load(path) is None
+    assert not os.path.exists(entry_path)
+    assert len(load_modlist_cached(path, cache).mod_details) == directives
+    assert len(cache.load(path).mod_details) == directives
@@ -0,0 +1,15 @@
+"""The DirectiveStore memory budget documented in wabbajack_modlist"""
+import pytest
+
+from generate_modlist import generate_modlist
+from wabbajack_modlist import DIRECTIVE_MEMORY_MIN_DIRECTIVES, DIRECTIVE_MEMORY_TARGET, load_modlist
+
+
+@pytest.mark.parametrize('directives', [DIRECTIVE_MEMORY_MIN_DIRECTIVES, 100000])
+def test_directives_fit_memory_target(tmp_path, directives):
+    # Archive count as run_benchmarks.py generates it
+    path = generate_modlist(str(tmp_path / 'memory.wabbajack'), directives=directives,
+                            archives=max(10, directives // 50), duplicates=0.05)
+    store = load_modlist(path).mod_details
+    assert len(store) == directives
+    assert store.memory_usage() / directives <= DIRECTIVE_MEMORY_TARGET
@@ -0,0 +1,28 @@
+"""ModlistStreamReader against every chunk boundary"""
+import io
+import json
+
+import pytest
+
+from wabbajack_modlist import ModlistStreamReader
+
+DOCUMENT = ('{"Name": "Stream", "Version": 1.5e3, "Build": -12, "Ratio": 0.25E-2, "Size": 1234567890123,'
+            ' "Archives": [{"Hash": "abc", "Size": 7}, 2.5e1],'
+            ' "Directives": [{"To": "a\\\\b.esp", "Size": 10}, 123],'
+            ' "IsNSFW": false, "Image": null, "Count": 42}')
+
+
+def expected_pairs():
+    pairs = []
+    for key, value in json.loads(DOCUMENT).items():
+        if key in ('Archives', 'Directives'):
+            pairs.extend((key, item) for item in value)
+        else:
+            pairs.append((key, value))
+    return pairs
+
+
+@pytest.mark.parametrize('chunk_size', range(1, len(DOCUMENT) + 2))
+def test_values_split_at_any_chunk_boundary(chunk_size):
+    reader = ModlistStreamReader(io.BytesIO(DOCUMENT.encode('utf-8')), chunk_size=chunk_size)
+    assert list(reader) == expected_pairs()
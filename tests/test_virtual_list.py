@@ -0,0 +1,136 @@
+"""VirtualList scrolling and selection, against a stand-in Treeview so no display is needed"""
+import pytest
+
+import wabbajack_viewer
+from wabbajack_viewer import DEFAULT_HEADING_HEIGHT, DEFAULT_ROW_HEIGHT, VirtualList
+
+VISIBLE_ROWS = 10
+ROW_COUNT = 100
+
+
+class FakeTreeview:
+    """The parts of ttk.Treeview a VirtualList uses, with a fixed height"""
+
+    def __init__(self, parent, columns, show, selectmode):
+        self.items = {}
+        self.selected = ()
+
+    def heading(self, column, text=None, command=None):
+        pass
+
+    def column(self, column, width, minwidth):
+        pass
+
+    def bind(self, sequence, callback):
+        pass
+
+    def insert(self, parent, index, text, values):
+        item = f"I{len(self.items)}"
+        self.items[item] = text
+        return item
+
+    def delete(self, *items):
+        for item in items:
+            del self.items[item]
+
+    def item(self, item, text, values, tags):
+        self.items[item] = text
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, item):
+        self.selected = (item,)
+
+    def selection_remove(self, *items):
+        self.selected = ()
+
+    def yview_moveto(self, fraction):
+        pass
+
+    def winfo_height(self):
+        return DEFAULT_HEADING_HEIGHT + VISIBLE_ROWS * DEFAULT_ROW_HEIGHT
+
+    def bbox(self, item):
+        return ''
+
+    def after_idle(self, callback):
+        pass
+
+
+class FakeScrollbar:
+    def __init__(self, parent, orient, command):
+        pass
+
+    def set(self, first, last):
+        pass
+
+
+@pytest.fixture
+def virtual_list(monkeypatch):
+    monkeypatch.setattr(wabbajack_viewer.ttk, 'Treeview', FakeTreeview)
+    monkeypatch.setattr(wabbajack_viewer.ttk, 'Scrollbar', FakeScrollbar)
+    selections = []
+    virtual_list = VirtualList(None, [('#0', 'Name', 100, 50), ('size', 'Size', 100, 50)],
+                               on_select=selections.append)
+    virtual_list.selections = selections
+    virtual_list.resize()
+    virtual_list.set_rows([(f"row {index}", ('',), ()) for index in range(ROW_COUNT)])
+    return virtual_list
+
+
+def shown_rows(virtual_list):
+    """Text of the slots in view, top first"""
+    return [virtual_list.tree.items[item] for item in virtual_list.slots[:VISIBLE_ROWS]]
+
+
+def click(virtual_list, slot):
+    """Select a slot as a mouse click does"""
+    virtual_list.tree.selection_set(virtual_list.slots[slot])
+    virtual_list.on_tree_select(None)
+    return virtual_list.selected
+
+
+def test_jump_to_selected_row_scrolled_out_of_view(virtual_list):
+    # As Find File does through show_mod
+    virtual_list.select(5)
+    virtual_list.scroll(50)
+    virtual_list.select(5)
+    assert virtual_list.top == 5
+    assert shown_rows(virtual_list)[0] == "row 5"
+    assert click(virtual_list, 1) == 6
+    assert virtual_list.selections == [5, 6]
+
+
+@pytest.mark.parametrize('rows', [-1, 1, -VISIBLE_ROWS, VISIBLE_ROWS])
+def test_keys_on_first_row_redraw_after_scrolling_away(virtual_list, rows):
+    virtual_list.select(0)
+    virtual_list.scroll(40)
+    virtual_list.move_selection(rows)
+    position = virtual_list.order.index(virtual_list.selected)
+    assert virtual_list.top <= position < virtual_list.top + VISIBLE_ROWS
+    assert shown_rows(virtual_list)[0] == f"row {virtual_list.top}"
+    assert click(virtual_list, 0) == virtual_list.top
+
+
+def test_keys_on_last_row_redraw_after_scrolling_away(virtual_list):
+    virtual_list.select(ROW_COUNT - 1)
+    virtual_list.scroll(-60)
+    virtual_list.move_selection(1)
+    assert virtual_list.selected == ROW_COUNT - 1
+    assert virtual_list.top == ROW_COUNT - VISIBLE_ROWS
+    assert shown_rows(virtual_list)[-1] == f"row {ROW_COUNT - 1}"
+    assert click(virtual_list, 0) == ROW_COUNT - VISIBLE_ROWS
+    # Re-selecting the same row only scrolls; on_select runs for the click alone
+    assert virtual_list.selections == [ROW_COUNT - 1, ROW_COUNT - VISIBLE_ROWS]
+
+
+def test_selection_stays_in_view_after_sorting(virtual_list):
+    virtual_list.select(5)
+    virtual_list.set_order(list(reversed(range(ROW_COUNT))))
+    # As sort_mods does to keep the selected mod in view
+    virtual_list.select(5)
+    assert virtual_list.top == ROW_COUNT - 5 - VISIBLE_ROWS
+    assert shown_rows(virtual_list) == [f"row {index}" for index in range(14, 4, -1)]
+    assert click(virtual_list, 0) == 14
+    assert virtual_list.selections == [5, 14]
@@ -0,0 +1,257 @@
+"""On-disk cache of fully indexed modlists for Wabbajack Viewer"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import zipfile
+
+from wabbajack_modlist import DirectiveStore, Modlist, find_modlist_member, load_modlist
+from wabbajack_paths import PathIndex
+from wabbajack_tree import InstallTree
+from wabbajack_profile import diagnostics
+
+CACHE_MAGIC = b'WJVCACHE'
+CACHE_FORMAT_VERSION = 7
+CACHE_SUFFIX = '.wjcache'
+
+# Total size the cache directory may grow to before old entries are evicted
+DEFAULT_CACHE_SIZE = 2 * 1024 * 1024 * 1024
+
+# Magic, format version and header length
+_PREAMBLE = struct.Struct('<8sII')
+_ALIGNMENT = 8
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for this platform"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'WabbajackViewer')
+
+
+def modlist_cache_key(wabbajack_path):
+    """Identify a Wabbajack file by path, size, mtime and modlist content fingerprint.
+
+    The fingerprint is the CRC-32 and size of the modlist member taken from the
+    zip central directory, so it is cheap to compute and changes with the content.
+    """
+    path = os.path.abspath(wabbajack_path)
+    stat = os.stat(path)
+    with zipfile.ZipFile(path, 'r') as zip_ref:
+        modlist_file = find_modlist_member(zip_ref)
+        info = zip_ref.getinfo(modlist_file) if modlist_file else None
+        fingerprint = f"{info.CRC:08x}:{info.file_size}" if info else ''
+    return [path, stat.st_size, stat.st_mtime_ns, fingerprint]
+
+
+def _padding(offset):
+    return -offset % _ALIGNMENT
+
+
+class ModlistCache:
+    """Size-bounded LRU cache of indexed modlists, one memory-mapped file per modlist.
+
+    Each entry holds a JSON header (modlist info, archives and string tables)
+    followed by the raw DirectiveStore, PathIndex and InstallTree columns. Loading maps the
+    file and wraps the columns in memoryviews, so file lists are paged in only
+    when viewed. Least recently used entries are evicted once the directory
+    exceeds ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + CACHE_SUFFIX)
+
+    def _entries(self):
+        """Return (path, size, last access) for every cache file"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def load(self, wabbajack_path):
+        """Return the cached Modlist for a Wabbajack file, or None on a miss"""
+        try:
+            key = modlist_cache_key(wabbajack_path)
+        except (OSError, zipfile.BadZipFile):
+            return None
+
+        entry_path = self._entry_path(key)
+        if not os.path.exists(entry_path):
+            return None
+
+        try:
+            modlist = self._read_entry(entry_path, key)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            # Corrupt, truncated or stale entry, drop it and reload from the source
+            self._remove(entry_path)
+            return None
+
+        if modlist is not None:
+            # Mark as recently used for LRU eviction
+            try:
+                os.utime(entry_path)
+            except OSError:
+                pass
+        return modlist
+
+    def _read_entry(self, entry_path, key):
+        with open(entry_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, header_len = _PREAMBLE.unpack_from(mapped, 0)
+        if magic != CACHE_MAGIC or version != CACHE_FORMAT_VERSION:
+            raise ValueError("Unsupported cache entry")
+
+        header = json.loads(mapped[_PREAMBLE.size:_PREAMBLE.size + header_len].decode('utf-8'))
+        if header['key'] != key:
+            return None
+
+        # Column data follows the aligned header; slices of the map are zero-copy
+        data_start = _PREAMBLE.size + header_len
+        data_start += _padding(data_start)
+        view = memoryview(mapped)
+
+        def block(offset, length):
+            return view[data_start + offset:data_start + offset + length]
+
+        columns = {name: block(offset, length).cast(typecode)
+                   for name, (typecode, offset, length) in header['columns'].items()}
+        names = block(*header['names'])
+
+        modlist = Modlist(key[0])
+        modlist.info = header['info']
+        for archive in header['archives']:
+            modlist.add_archive(archive)
+        modlist.mod_details = DirectiveStore.from_columns(header['dirs'], names, header['archive_hashes'], columns,
+                                                          header['directive_types'], header['top_dirs'])
+        modlist.paths = PathIndex(modlist.mod_details, *(columns[column] for column in PathIndex.COLUMNS))
+        modlist.install_tree = InstallTree(modlist.mod_details, header['tree_names'],
+                                           *(columns[column] for column in InstallTree.COLUMNS))
+        return modlist
+
+    def store(self, modlist):
+        """Write a loaded modlist to the cache, then evict old entries"""
+        key = modlist_cache_key(modlist.path)
+        store = modlist.mod_details
+
+        # Lay out the column blocks after the header
+        blocks = []
+        columns = {}
+        offset = 0
+        store_columns = DirectiveStore.ROW_COLUMNS + DirectiveStore.ARCHIVE_COLUMNS + DirectiveStore.TOTAL_COLUMNS
+        column_owners = ([(store, name) for name in store_columns] +
+                         [(modlist.paths, name) for name in PathIndex.COLUMNS] +
+                         [(modlist.install_tree, name) for name in InstallTree.COLUMNS])
+        for owner, name in column_owners:
+            values = getattr(owner, name)
+            columns[name] = [values.typecode if hasattr(values, 'typecode') else values.format,
+                             offset, len(values) * values.itemsize]
+            blocks.append(values)
+            offset += len(values) * values.itemsize
+            offset += _padding(offset)
+        names_block = [offset, len(store.names)]
+        blocks.append(store.names)
+
+        header = json.dumps({
+            'key': key,
+            'info': modlist.info,
+            'archives': modlist.archives,
+            'dirs': store.dirs.strings,
+            'archive_hashes': store.archive_hashes,
+            'directive_types': store.directive_types.strings,
+            'top_dirs': store.top_dirs,
+            'tree_names': modlist.install_tree.names,
+            'columns': columns,
+            'names': names_block,
+        }).encode('utf-8')
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = self._entry_path(key)
+        temp_path = f"{entry_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(_PREAMBLE.pack(CACHE_MAGIC, CACHE_FORMAT_VERSION, len(header)))
+                f.write(header)
+                f.write(b'\0' * _padding(_PREAMBLE.size + len(header)))
+                for values in blocks:
+                    data = memoryview(values).cast('B')
+                    f.write(data)
+                    f.write(b'\0' * _padding(len(data)))
+            os.replace(temp_path, entry_path)
+        finally:
+            self._remove(temp_path)
+
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+    def clear(self):
+        """Delete every cache entry, returning the number of bytes freed"""
+        freed = 0
+        for path, size, _ in self._entries():
+            if self._remove(path):
+                freed += size
+        return freed
+
+    def total_size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            # Missing, or still mapped by this process on Windows
+            return False
+
+
+def load_modlist_cached(wabbajack_path, cache, progress=None, cancel_event=None):
+    """Load a modlist from the cache, falling back to parsing and caching it"""
+    if progress:
+        progress("Checking cache", 0.0)
+    with diagnostics.phase("Read cache") as phase:
+        modlist = cache.load(wabbajack_path)
+        phase['items'] = len(modlist.mod_details) if modlist is not None else 0
+    if modlist is not None:
+        return modlist
+
+    modlist = load_modlist(wabbajack_path, progress=progress, cancel_event=cancel_event)
+    if progress:
+        progress("Writing cache", 0.0)
+    try:
+        with diagnostics.phase("Write cache", len(modlist.mod_details)):
+            cache.store(modlist)
+    except OSError:
+        # The cache is best-effort; a failed write only costs the next open
+        pass
+    return modlist
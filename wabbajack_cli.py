@@ -0,0 +1,377 @@
+"""Headless command line interface for Wabbajack Viewer"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+from wabbajack_cache import ModlistCache, load_modlist_cached
+from wabbajack_dedup import DuplicateAnalysis
+from wabbajack_diff import ModlistDiff
+from wabbajack_modlist import load_modlist, mod_links
+from wabbajack_profile import PROFILE_ENV_VAR, start_session_profile
+from wabbajack_verify import PRESENT, HashCache, verify_downloads
+
+REPORT_FORMATS = ('jsonl', 'csv', 'markdown')
+
+CSV_FIELDS = ['modlist', 'index', 'name', 'filename', 'author', 'version', 'size', 'hash',
+              'downloader', 'mod_page', 'download', 'file_count', 'installed_size']
+
+
+def find_wabbajack_files(paths):
+    """Expand files and directories into a sorted list of .wabbajack files"""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _, filenames in os.walk(path):
+                found.extend(os.path.join(dirpath, name) for name in filenames
+                             if name.lower().endswith('.wabbajack'))
+        else:
+            found.append(path)
+    return sorted(found)
+
+
+def build_report(modlist):
+    """Summarize a loaded modlist as a JSON-serializable dict"""
+    info = modlist.info
+    store = modlist.mod_details
+    archives = []
+    for i, archive in enumerate(modlist.archives):
+        state = archive.get('State', {})
+        archive_hash = archive.get('Hash', '')
+        mod_page_link, direct_file_link = mod_links(archive)
+        file_list = modlist.mod_details.get(archive_hash)
+        archives.append({
+            'index': i + 1,
+            'name': state.get('Name', archive.get('Name', 'Unknown Mod')),
+            'filename': archive.get('Name', 'Unknown Mod'),
+            'author': state.get('Author', 'Unknown'),
+            'version': state.get('Version', ''),
+            'size': archive.get('Size', 0),
+            'hash': archive_hash,
+            'downloader': state.get('$type', '').split(',')[0],
+            'mod_page': mod_page_link,
+            'download': direct_file_link,
+            'file_count': len(file_list) if file_list is not None else 0,
+            'installed_size': file_list.total_size() if file_list is not None else 0,
+        })
+
+    return {
+        'path': modlist.path,
+        'name': info.get('Name', 'Unknown'),
+        'author': info.get('Author', 'Unknown'),
+        'version': info.get('Version', 'Unknown'),
+        'game': info.get('GameType', 'Unknown'),
+        'wabbajack_version': info.get('WabbajackVersion', 'Unknown'),
+        'archive_count': len(archives),
+        'download_size': sum(archive['size'] for archive in archives),
+        'file_count': len(store),
+        'installed_size': sum(size for _, _, size in store.type_totals()),
+        'directive_types': {name: {'file_count': count, 'installed_size': size}
+                            for name, count, size in store.type_totals()},
+        'top_directories': {name: {'file_count': count, 'installed_size': size}
+                            for name, count, size in store.top_dir_totals()},
+        'archives': archives,
+    }
+
+
+def report_worker(task):
+    """Pool task: load one modlist and return its report, or an error entry"""
+    wabbajack_path, cache_dir = task
+    try:
+        if cache_dir:
+            modlist = load_modlist_cached(wabbajack_path, ModlistCache(cache_dir))
+        else:
+            modlist = load_modlist(wabbajack_path)
+        return build_report(modlist)
+    except Exception as e:
+        return {'path': os.path.abspath(wabbajack_path), 'error': str(e)}
+
+
+def iter_reports(wabbajack_paths, jobs=None, cache_dir=None):
+    """Yield reports for many modlists as they complete, using a process pool.
+
+    Each worker process handles a single modlist and is then replaced, so
+    memory held by one large modlist is returned to the OS before the next.
+    """
+    tasks = [(path, cache_dir) for path in wabbajack_paths]
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield report_worker(task)
+        return
+
+    with multiprocessing.Pool(processes=jobs, maxtasksperchild=1) as pool:
+        for report in pool.imap_unordered(report_worker, tasks):
+            yield report
+
+
+def format_markdown(report):
+    """Render a report as a manual installation guide in Markdown"""
+    lines = [
+        f"# Manual Installation Guide: {report['name']}",
+        "",
+        f"- **Author:** {report['author']}",
+        f"- **Version:** {report['version']}",
+        f"- **Game:** {report['game']}",
+        f"- **Wabbajack Version:** {report['wabbajack_version']}",
+        f"- **Total Mods:** {report['archive_count']}",
+        f"- **Download Size:** {report['download_size'] / (1024 * 1024):.1f} MB",
+        f"- **Installed Size:** {report['installed_size'] / (1024 * 1024):.1f} MB",
+        "",
+    ]
+    for archive in report['archives']:
+        lines.append(f"## {archive['index']}. {archive['name']}")
+        lines.append("")
+        lines.append(f"- Filename: `{archive['filename']}`")
+        lines.append(f"- Author: {archive['author']}")
+        if archive['version']:
+            lines.append(f"- Version: {archive['version']}")
+        lines.append(f"- Archive Size: {archive['size'] / (1024 * 1024):.1f} MB")
+        if archive['mod_page']:
+            lines.append(f"- Mod Page: <{archive['mod_page']}>")
+        if archive['download']:
+            label = "Direct Download" if archive['mod_page'] else "Download"
+            lines.append(f"- {label}: <{archive['download']}>")
+        else:
+            lines.append("- Download: Direct download (link not available)")
+        lines.append(f"- Files to be installed: {archive['file_count']} "
+                     f"({archive['installed_size'] / (1024 * 1024):.1f} MB)")
+        lines.append("")
+    return '\n'.join(lines)
+
+
+def guide_path(output, root, wabbajack_path):
+    """Markdown guide for a modlist, mirroring its directory below root so equal file names don't collide"""
+    wabbajack_path = os.path.abspath(wabbajack_path)
+    if root:
+        relative = os.path.relpath(wabbajack_path, root)
+    else:
+        # Without a common root (modlists on several drives) the whole path is mirrored
+        relative = os.path.splitdrive(wabbajack_path)[1].lstrip('\\/')
+    return os.path.join(output, os.path.splitext(relative)[0] + '.md')
+
+
+def write_reports(reports, report_format, output, root=None):
+    """Stream reports to output (a file, a directory for markdown, or stdout); returns the failure count.
+
+    Markdown guides are named after each modlist's path relative to root.
+    """
+    failures = 0
+    if report_format == 'markdown' and output:
+        os.makedirs(output, exist_ok=True)
+        out = None
+    else:
+        out = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+
+    try:
+        csv_writer = None
+        if report_format == 'csv':
+            csv_writer = csv.DictWriter(out, fieldnames=CSV_FIELDS, extrasaction='ignore')
+            csv_writer.writeheader()
+
+        for report in reports:
+            if 'error' in report:
+                failures += 1
+                print(f"Failed to load {report['path']}: {report['error']}", file=sys.stderr)
+                if report_format == 'jsonl':
+                    out.write(json.dumps(report) + '\n')
+                continue
+
+            if report_format == 'jsonl':
+                out.write(json.dumps(report) + '\n')
+            elif report_format == 'csv':
+                for archive in report['archives']:
+                    csv_writer.writerow(dict(archive, modlist=report['name']))
+            elif out is None:
+                path = guide_path(output, root, report['path'])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(format_markdown(report))
+            else:
+                out.write(format_markdown(report) + '\n')
+            if out is not None:
+                out.flush()
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+    return failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Inspect Wabbajack modlists without the GUI")
+    parser.add_argument('--profile', metavar='FILE',
+                        help=f"Write a cProfile/tracemalloc report for the run to FILE on exit (or set "
+                             f"{PROFILE_ENV_VAR}); use with --jobs 1, worker processes are not profiled")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    report_parser = subparsers.add_parser('report', help="Write per-modlist reports for .wabbajack files")
+    report_parser.add_argument('paths', nargs='+', help=".wabbajack files or directories to scan")
+    report_parser.add_argument('-f', '--format', choices=REPORT_FORMATS, default='jsonl',
+                               help="jsonl: one object per modlist; csv: one row per archive; "
+                                    "markdown: one install guide per modlist")
+    report_parser.add_argument('-o', '--output',
+                               help="Output file (a directory for markdown); defaults to stdout")
+    report_parser.add_argument('-j', '--jobs', type=int, default=None,
+                               help="Worker processes (default: CPU count)")
+    report_parser.add_argument('--no-cache', action='store_true', help="Do not read or write the modlist cache")
+
+    diff_parser = subparsers.add_parser('diff', help="Compare two versions of a modlist")
+    diff_parser.add_argument('old', help="The older .wabbajack file")
+    diff_parser.add_argument('new', help="The newer .wabbajack file")
+    diff_parser.add_argument('-f', '--format', choices=('json', 'jsonl'), default='json',
+                             help="json: one document; jsonl: a summary line, then one line per change")
+    diff_parser.add_argument('-o', '--output', help="Output file; defaults to stdout")
+    diff_parser.add_argument('--no-cache', action='store_true', help="Do not read or write the modlist cache")
+
+    find_parser = subparsers.add_parser('find', help="Find which archives install a path")
+    find_parser.add_argument('wabbajack', help="The .wabbajack file to search")
+    find_parser.add_argument('query', nargs='?', default='',
+                             help="Target path, path prefix or glob such as 'meshes/actors/*.nif' (default: every file)")
+    find_parser.add_argument('--conflicts', action='store_true',
+                             help="Only list paths installed by more than one directive")
+    find_parser.add_argument('-o', '--output', help="Output file; defaults to stdout")
+    find_parser.add_argument('--no-cache', action='store_true', help="Do not read or write the modlist cache")
+
+    verify_parser = subparsers.add_parser('verify', help="Check a downloads folder against a modlist's archives")
+    verify_parser.add_argument('wabbajack', help="The .wabbajack file to verify downloads for")
+    verify_parser.add_argument('downloads', help="Folder holding the downloaded archives (searched recursively)")
+    verify_parser.add_argument('-o', '--output', help="Output file; defaults to stdout")
+    verify_parser.add_argument('-j', '--jobs', type=int, default=None,
+                               help="Hashing processes (default: CPU count)")
+    verify_parser.add_argument('--no-cache', action='store_true',
+                               help="Do not read or write the modlist and download hash caches")
+
+    duplicates_parser = subparsers.add_parser('duplicates',
+                                              help="Find files installed more than once with identical content")
+    duplicates_parser.add_argument('wabbajack', help="The .wabbajack file to analyse")
+    duplicates_parser.add_argument('-f', '--format', choices=('json', 'jsonl'), default='json',
+                                   help="json: one document; jsonl: a summary line, then one line per "
+                                        "duplicated file and per pair of archives sharing files")
+    duplicates_parser.add_argument('-o', '--output', help="Output file; defaults to stdout")
+    duplicates_parser.add_argument('--no-cache', action='store_true', help="Do not read or write the modlist cache")
+    return parser
+
+
+def load_for_cli(wabbajack_path, no_cache):
+    if no_cache:
+        return load_modlist(wabbajack_path)
+    return load_modlist_cached(wabbajack_path, ModlistCache())
+
+
+def run_report(args):
+    wabbajack_paths = find_wabbajack_files(args.paths)
+    if not wabbajack_paths:
+        print("No .wabbajack files found", file=sys.stderr)
+        return 1
+    cache_dir = None if args.no_cache else ModlistCache().cache_dir
+    reports = iter_reports(wabbajack_paths, jobs=args.jobs, cache_dir=cache_dir)
+    try:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in wabbajack_paths])
+    except ValueError:
+        # Modlists on different drives
+        root = None
+    return 1 if write_reports(reports, args.format, args.output, root) else 0
+
+
+def run_diff(args):
+    diff = ModlistDiff(load_for_cli(args.old, args.no_cache), load_for_cli(args.new, args.no_cache))
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.format == 'jsonl':
+            diff.write_jsonl(out)
+        else:
+            json.dump(diff.to_dict(), out, indent=2)
+            out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary = ', '.join(f"{key}={count}" for key, count in sorted(diff.summary().items()))
+    print(summary, file=sys.stderr)
+    return 0
+
+
+def run_find(args):
+    modlist = load_for_cli(args.wabbajack, args.no_cache)
+    store = modlist.mod_details
+    rows = modlist.paths.search(args.query, conflicts_only=args.conflicts)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        # One JSON object per directive, in path order
+        for row in rows:
+            entry = store.entry(row)
+            archive_hash = store.row_archive(row)
+            out.write(json.dumps({
+                'path': entry.target_path,
+                'archive': modlist.archive_lookup.get(archive_hash, ''),
+                'archive_hash': archive_hash,
+                'source': entry.archive_path,
+                'size': entry.size,
+            }) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0 if rows else 1
+
+
+def run_verify(args):
+    modlist = load_for_cli(args.wabbajack, args.no_cache)
+    hash_cache = None if args.no_cache else HashCache()
+    verification = verify_downloads(modlist.archives, args.downloads, hash_cache, jobs=args.jobs)
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        # One JSON object per archive, in modlist order
+        for i, archive in enumerate(modlist.archives):
+            out.write(json.dumps({
+                'index': i + 1,
+                'name': archive.get('State', {}).get('Name', archive.get('Name', 'Unknown Mod')),
+                'filename': archive.get('Name', 'Unknown Mod'),
+                'size': archive.get('Size', 0),
+                'hash': archive.get('Hash', ''),
+                'state': verification.states[i],
+                'path': verification.paths[i],
+            }) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"{verification.summary()} ({verification.hashed_files} files hashed)", file=sys.stderr)
+    return 0 if all(state == PRESENT for state in verification.states) else 1
+
+
+def run_duplicates(args):
+    analysis = DuplicateAnalysis(load_for_cli(args.wabbajack, args.no_cache))
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.format == 'jsonl':
+            analysis.write_jsonl(out)
+        else:
+            json.dump(analysis.to_dict(), out, indent=2)
+            out.write('\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    summary = ', '.join(f"{key}={count}" for key, count in analysis.summary().items())
+    print(summary, file=sys.stderr)
+    return 0
+
+
+COMMANDS = {
+    'report': run_report,
+    'diff': run_diff,
+    'find': run_find,
+    'verify': run_verify,
+    'duplicates': run_duplicates,
+}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start_session_profile(args.profile)
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
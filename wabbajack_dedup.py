@@ -0,0 +1,184 @@
+"""Duplicate file content across a modlist's archives (no GUI dependencies).
+
+Every DirectiveStore row keeps the xxHash64 of the file it installs as one
+unsigned 64-bit integer, so identical files are found by grouping rows on
+that column. The rows are grouped in two linear passes: a C-level count
+of every hash keeps only the hashes seen more than once, then the rows
+holding one of those are collected in row order and bucketed by a
+counting sort. Everything after the first pass is proportional to the
+duplicated rows, not the modlist, and the groups are held as CSR arrays
+rather than a list per group.
+"""
+import json
+from array import array
+from bisect import bisect_right
+from collections import Counter, namedtuple
+from itertools import accumulate, compress, count, repeat
+
+from wabbajack_modlist import encode_hash
+
+# Archive pairs are counted for groups spread over at most this many archives; one
+# file shipped by hundreds of archives would otherwise add tens of thousands of pairs
+OVERLAP_MAX_ARCHIVES = 64
+
+# Two archives installing some of the same file contents
+ArchiveOverlap = namedtuple('ArchiveOverlap', 'first second files size')
+
+
+class DuplicateAnalysis:
+    """Files of a modlist installed more than once with identical content.
+
+    Group ``g`` is one content hash installed by several directives:
+    ``group_hash[g]`` and ``group_size[g]`` describe the content,
+    ``group_rows[group_offsets[g]:group_offsets[g + 1]]`` are its
+    DirectiveStore rows in store order, and ``group_archives[g]`` counts the
+    distinct archives they come from. Every copy after the first is wasted
+    disk space. Directives without a hash and empty files are ignored.
+
+    ``overlaps`` lists each pair of archives (by archive id in the store)
+    sharing any of that content, with the number and total size of the
+    shared contents.
+    """
+
+    def __init__(self, modlist):
+        self.modlist = modlist
+        store = self.store = modlist.mod_details
+        hashes = store.hash
+        sizes = store.size
+
+        # Pass 1: count every non-empty hash, keeping the ones seen more than once
+        counts = Counter(compress(hashes, sizes))
+        counts.pop(0, None)
+        group_of = dict(zip(compress(counts, map((1).__lt__, counts.values())), count()))
+        del counts
+
+        # Pass 2: the rows holding a repeated hash, in row order, each with its group and archive
+        rows = array('Q', compress(range(len(hashes)), map(group_of.__contains__, hashes)))
+        row_groups = array('I', map(group_of.__getitem__, map(hashes.__getitem__, rows)))
+        # A row's archive is the number of archive slices ending at or before it
+        row_archives = array('I', map(bisect_right, repeat(store.archive_offsets[1:]), rows))
+
+        # Bucket the rows by group with a stable counting sort
+        group_count = len(group_of)
+        group_hash = array('Q', bytes(8 * group_count))
+        for file_hash, group in group_of.items():
+            group_hash[group] = file_hash
+        del group_of
+        copies = array('Q', bytes(8 * group_count))
+        for group in row_groups:
+            copies[group] += 1
+        group_offsets = array('Q', [0])
+        group_offsets.extend(accumulate(copies))
+        group_rows = array('Q', bytes(8 * len(rows)))
+        group_archive_ids = array('I', bytes(4 * len(rows)))
+        positions = group_offsets[:-1]
+        for row, group, archive_id in zip(rows, row_groups, row_archives):
+            position = positions[group]
+            group_rows[position] = row
+            group_archive_ids[position] = archive_id
+            positions[group] = position + 1
+        del rows, row_groups, row_archives
+
+        self.group_hash = group_hash
+        self.group_offsets = group_offsets
+        self.group_rows = group_rows
+        self.group_size = array('q', map(sizes.__getitem__, map(group_rows.__getitem__, group_offsets[:-1])))
+        self.group_copies = copies
+        self.group_wasted = array('q', map(lambda size, count: size * (count - 1), self.group_size, copies))
+
+        # Distinct archives per group, and the archive pairs they overlap in
+        self.group_archives = array('I', bytes(4 * group_count))
+        archive_count = len(store.archive_hashes)
+        pair_files = Counter()
+        pair_size = Counter()
+        for group, size in enumerate(self.group_size):
+            archive_ids = set(group_archive_ids[group_offsets[group]:group_offsets[group + 1]])
+            self.group_archives[group] = len(archive_ids)
+            if len(archive_ids) < 2 or len(archive_ids) > OVERLAP_MAX_ARCHIVES:
+                continue
+            # A pair is keyed by one integer, first * archive_count + second
+            archive_ids = sorted(archive_ids)
+            for index, first in enumerate(archive_ids):
+                for second in archive_ids[index + 1:]:
+                    key = first * archive_count + second
+                    pair_files[key] += 1
+                    pair_size[key] += size
+        self.overlaps = [ArchiveOverlap(*divmod(key, archive_count), files, pair_size[key])
+                         for key, files in pair_files.items()]
+
+    def __len__(self):
+        return len(self.group_hash)
+
+    def group_files(self, group):
+        """DirectiveStore rows installing a group's content"""
+        return self.group_rows[self.group_offsets[group]:self.group_offsets[group + 1]]
+
+    def archive_name(self, archive_id):
+        archive_hash = self.store.archive_hashes[archive_id]
+        return self.modlist.archive_lookup.get(archive_hash, archive_hash) or "(Not from an archive)"
+
+    def row_archive_name(self, row):
+        return self.archive_name(bisect_right(self.store.archive_offsets, row) - 1)
+
+    def summary(self):
+        return {
+            'groups': len(self),
+            'duplicate_files': sum(self.group_copies) - len(self),
+            'wasted_bytes': sum(self.group_wasted),
+            'archive_pairs': len(self.overlaps),
+        }
+
+    def order(self, column, descending):
+        """Group indexes sorted by one of the group_* columns"""
+        return sorted(range(len(self)), key=getattr(self, column).__getitem__, reverse=descending)
+
+    def iter_records(self):
+        """Yield one JSON-serializable record per group, most wasted first, then one per archive pair"""
+        store = self.store
+        for group in self.order('group_wasted', True):
+            yield {
+                'kind': 'group',
+                'hash': encode_hash(self.group_hash[group]),
+                'size': self.group_size[group],
+                'copies': self.group_copies[group],
+                'wasted': self.group_wasted[group],
+                'files': [{'path': store.target_path(row), 'archive': self.row_archive_name(row)}
+                          for row in self.group_files(group)],
+            }
+        for overlap in sorted(self.overlaps, key=lambda overlap: overlap.size, reverse=True):
+            yield {
+                'kind': 'overlap',
+                'archives': [self.archive_name(overlap.first), self.archive_name(overlap.second)],
+                'files': overlap.files,
+                'size': overlap.size,
+            }
+
+    def _modlist_summary(self):
+        return {
+            'path': self.modlist.path,
+            'name': self.modlist.info.get('Name', 'Unknown'),
+            'version': self.modlist.info.get('Version', 'Unknown'),
+        }
+
+    def to_dict(self):
+        groups = []
+        overlaps = []
+        for record in self.iter_records():
+            (groups if record.pop('kind') == 'group' else overlaps).append(record)
+        return {
+            'modlist': self._modlist_summary(),
+            'summary': self.summary(),
+            'groups': groups,
+            'overlaps': overlaps,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_jsonl(self, out):
+        """Write a header line with the summary, then one line per group and archive pair"""
+        header = {'kind': 'summary', 'modlist': self._modlist_summary(), 'summary': self.summary()}
+        out.write(json.dumps(header) + '\n')
+        for record in self.iter_records():
+            out.write(json.dumps(record) + '\n')
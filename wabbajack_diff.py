@@ -0,0 +1,206 @@
+"""Comparison of two versions of a modlist"""
+import json
+from collections import namedtuple
+
+from wabbajack_paths import path_key
+
+ArchiveChange = namedtuple('ArchiveChange', 'status old new reason')
+FileChange = namedtuple('FileChange', 'status path old_path size old_size archive old_archive')
+
+
+def nexus_key(archive):
+    """Identify the Nexus mod an archive comes from, or None for other sources"""
+    state = archive.get('State', {})
+    if 'NexusDownloader' not in state.get('$type', '') or not state.get('ModID'):
+        return None
+    return state.get('GameName', '').lower(), state.get('ModID')
+
+
+def archive_summary(archive):
+    """The archive fields included in diff exports"""
+    if archive is None:
+        return None
+    state = archive.get('State', {})
+    return {
+        'name': state.get('Name', archive.get('Name', 'Unknown Mod')),
+        'filename': archive.get('Name', ''),
+        'version': state.get('Version', ''),
+        'hash': archive.get('Hash', ''),
+        'size': archive.get('Size', 0),
+        'mod_id': state.get('ModID'),
+        'file_id': state.get('FileID'),
+    }
+
+
+def diff_archives(old, new):
+    """Join archives by hash, then pair the leftovers by Nexus mod to find version bumps.
+
+    Returns (changes, unchanged count); changes are 'added', 'removed' or
+    'updated' ArchiveChanges.
+    """
+    unchanged = 0
+    matched_new = set()
+    unmatched_old = []
+    for archive in old.archives:
+        new_index = new.archive_index.get(archive.get('Hash', ''))
+        if new_index is None:
+            unmatched_old.append(archive)
+        else:
+            matched_new.add(new_index)
+            unchanged += 1
+
+    # Archives that only changed hash are usually a new file of the same Nexus mod
+    new_by_mod = {}
+    unmatched_new = []
+    for index, archive in enumerate(new.archives):
+        if index in matched_new:
+            continue
+        key = nexus_key(archive)
+        if key is None:
+            unmatched_new.append(archive)
+        else:
+            new_by_mod.setdefault(key, []).append(archive)
+
+    changes = []
+    for archive in unmatched_old:
+        candidates = new_by_mod.get(nexus_key(archive)) if nexus_key(archive) else None
+        if candidates:
+            replacement = candidates.pop(0)
+            old_state = archive.get('State', {})
+            new_state = replacement.get('State', {})
+            if old_state.get('FileID') != new_state.get('FileID'):
+                reason = f"FileID {old_state.get('FileID')} -> {new_state.get('FileID')}"
+            else:
+                reason = "Archive hash changed"
+            if old_state.get('Version', '') != new_state.get('Version', ''):
+                reason += f", version {old_state.get('Version', '?')} -> {new_state.get('Version', '?')}"
+            changes.append(ArchiveChange('updated', archive, replacement, reason))
+        else:
+            changes.append(ArchiveChange('removed', archive, None, ''))
+
+    for archives in new_by_mod.values():
+        unmatched_new.extend(archives)
+    changes.extend(ArchiveChange('added', None, archive, '') for archive in unmatched_new)
+    return changes, unchanged
+
+
+def _rows_by_path(modlist):
+    """Map the path_key of every target path of a modlist to (path, row, archive name)"""
+    store = modlist.mod_details
+    rows = {}
+    target_path = store.target_path
+    for archive_id, archive_hash in enumerate(store.archive_hashes):
+        archive_name = modlist.archive_lookup.get(archive_hash, archive_hash)
+        for row in range(store.archive_offsets[archive_id], store.archive_offsets[archive_id + 1]):
+            path = target_path(row)
+            rows[path_key(path)] = (path, row, archive_name)
+    return rows
+
+
+def diff_files(old, new):
+    """Join directives by target path and classify each difference.
+
+    Paths are joined as Windows installs them, ignoring case and separator
+    style, so a path only respelled is the same file. Files present in both
+    versions are 'changed' when their content hash (or size, if either hash
+    is unknown) differs. Leftover removed and added files with the same
+    content hash are paired up as 'moved'.
+    """
+    old_store = old.mod_details
+    new_store = new.mod_details
+    old_rows = _rows_by_path(old)
+
+    changes = []
+    added = []
+    for key, (path, row, archive_name) in _rows_by_path(new).items():
+        match = old_rows.pop(key, None)
+        if match is None:
+            added.append((path, row, archive_name))
+            continue
+        old_path, old_row, old_archive = match
+        old_hash, new_hash = old_store.hash[old_row], new_store.hash[row]
+        if (old_hash != new_hash) if old_hash and new_hash else (old_store.size[old_row] != new_store.size[row]):
+            changes.append(FileChange('changed', path, old_path, new_store.size[row], old_store.size[old_row],
+                                      archive_name, old_archive))
+
+    # Whatever is left in old_rows was removed or moved
+    removed_by_hash = {}
+    for key, (path, row, archive_name) in old_rows.items():
+        file_hash = old_store.hash[row]
+        if file_hash:
+            removed_by_hash.setdefault(file_hash, []).append(key)
+
+    for path, row, archive_name in added:
+        candidates = removed_by_hash.get(new_store.hash[row])
+        if candidates:
+            old_path, old_row, old_archive = old_rows.pop(candidates.pop())
+            changes.append(FileChange('moved', path, old_path, new_store.size[row], old_store.size[old_row],
+                                      archive_name, old_archive))
+        else:
+            changes.append(FileChange('added', path, '', new_store.size[row], 0, archive_name, ''))
+
+    for path, row, archive_name in old_rows.values():
+        changes.append(FileChange('removed', path, path, 0, old_store.size[row], '', archive_name))
+    return changes
+
+
+class ModlistDiff:
+    """Differences between an older and a newer version of a modlist"""
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        self.archives, self.unchanged_archives = diff_archives(old, new)
+        self.files = diff_files(old, new)
+
+    def summary(self):
+        counts = {'archives_unchanged': self.unchanged_archives}
+        for change in self.archives:
+            key = f"archives_{change.status}"
+            counts[key] = counts.get(key, 0) + 1
+        for change in self.files:
+            key = f"files_{change.status}"
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def _modlist_summary(self, modlist):
+        return {
+            'path': modlist.path,
+            'name': modlist.info.get('Name', 'Unknown'),
+            'version': modlist.info.get('Version', 'Unknown'),
+        }
+
+    def iter_records(self):
+        """Yield one JSON-serializable record per change, archives first"""
+        for change in self.archives:
+            yield {
+                'kind': 'archive',
+                'status': change.status,
+                'old': archive_summary(change.old),
+                'new': archive_summary(change.new),
+                'reason': change.reason,
+            }
+        for change in self.files:
+            record = {'kind': 'file'}
+            record.update(change._asdict())
+            yield record
+
+    def to_dict(self):
+        return {
+            'old': self._modlist_summary(self.old),
+            'new': self._modlist_summary(self.new),
+            'summary': self.summary(),
+            'changes': list(self.iter_records()),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_jsonl(self, out):
+        """Write a header line with the summary, then one line per change"""
+        header = {'kind': 'summary', 'old': self._modlist_summary(self.old),
+                  'new': self._modlist_summary(self.new), 'summary': self.summary()}
+        out.write(json.dumps(header) + '\n')
+        for record in self.iter_records():
+            out.write(json.dumps(record) + '\n')
@@ -0,0 +1,767 @@
+"""Modlist loading for Wabbajack Viewer (no GUI dependencies)"""
+import base64
+import binascii
+import codecs
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from wabbajack_paths import PathIndex
+from wabbajack_tree import InstallTree
+from wabbajack_profile import diagnostics
+
+# Names the modlist member can have inside a .wabbajack archive
+MODLIST_MEMBERS = ('modlist', 'modlist.json')
+
+# Top-level arrays that are yielded one element at a time instead of parsed whole
+STREAMED_SECTIONS = ('Archives', 'Directives')
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# How many records to handle between progress/cancellation checks
+PROGRESS_INTERVAL = 2000
+
+# Documented budget for DirectiveStore.memory_usage() divided by the number of
+# directives, for modlists with typical path lengths (~40 character file names),
+# checked by tests/test_directive_memory.py. A row costs about 80 bytes (38 in
+# columns, the rest its names); the remainder is interned directories at about 80
+# bytes each, shared by more files as a modlist grows. Small modlists hold nearly a
+# directory per file (the generated 1k one interns 1,135 for 1,000 directives, 182
+# bytes each), so below DIRECTIVE_MEMORY_MIN_DIRECTIVES (under 4 MB in all) the
+# ratio measures path spread rather than the store and the budget does not apply
+DIRECTIVE_MEMORY_TARGET = 160
+DIRECTIVE_MEMORY_MIN_DIRECTIVES = 20000
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+# What may still follow the part of a number decoded so far, up to the end of the buffer
+_NUMBER_TAIL = re.compile(r'[0-9.eE+\-]*\Z')
+
+
+class ModlistNotFoundError(ValueError):
+    """Raised when a Wabbajack archive has no modlist member"""
+
+
+class LoadCancelled(Exception):
+    """Raised inside a load when its cancel event has been set"""
+
+
+def find_modlist_member(zip_ref):
+    """Return the name of the modlist member in an open Wabbajack zip, or None"""
+    for name in zip_ref.namelist():
+        if name in MODLIST_MEMBERS:
+            return name
+    return None
+
+
+class ModlistStreamReader:
+    """Incrementally parse a modlist JSON document from a binary stream.
+
+    Iterating yields ``(key, value)`` pairs. Scalar and object fields of the
+    top-level document are yielded once with their full value, while the
+    ``Archives`` and ``Directives`` arrays are yielded one element at a time,
+    so only the current element and one read chunk are held in memory.
+    """
+
+    def __init__(self, stream, chunk_size=READ_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+        self.read_seconds = 0.0
+        self._decoder = codecs.getincrementaldecoder('utf-8-sig')()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self):
+        """Read the next chunk into the buffer, returning False at end of stream"""
+        if self._eof:
+            return False
+        start = time.perf_counter()
+        chunk = self.stream.read(self.chunk_size)
+        self.read_seconds += time.perf_counter() - start
+        self.bytes_read += len(chunk)
+        if not chunk:
+            self._eof = True
+        # Drop everything already consumed so the buffer stays chunk-sized
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk, final=self._eof)
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Skip whitespace and return the next character ('' at end of stream)"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        char = self._peek()
+        if not char or char not in chars:
+            raise ValueError(f"Malformed modlist JSON: expected {' or '.join(repr(c) for c in chars)}, "
+                             f"found {char!r} near byte {self.bytes_read}")
+        self._pos += 1
+        return char
+
+    def _read_value(self):
+        """Decode one complete JSON value starting at the current position"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Most likely the value is cut off at the end of the buffer
+                if not self._fill():
+                    raise
+                continue
+            # A number cut off by the end of the buffer ('1.5' of '1.5e3', or '1.5' before a
+            # trailing 'e') decodes as a shorter one, so it waits for more data or the end
+            if type(value) in (int, float) and _NUMBER_TAIL.match(self._buffer, end) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+
+        while True:
+            key = self._read_value()
+            if not isinstance(key, str):
+                raise ValueError(f"Malformed modlist JSON: invalid key near byte {self.bytes_read}")
+            self._expect(':')
+
+            if key in STREAMED_SECTIONS and self._peek() == '[':
+                self._pos += 1
+                if self._peek() == ']':
+                    self._pos += 1
+                else:
+                    while True:
+                        yield key, self._read_value()
+                        if self._expect(',]') == ']':
+                            break
+            elif key in STREAMED_SECTIONS:
+                # Null or otherwise unexpected section, nothing to stream
+                value = self._read_value()
+                for item in value if isinstance(value, list) else ():
+                    yield key, item
+            else:
+                yield key, self._read_value()
+
+            if self._expect(',}') == '}':
+                break
+
+
+FileEntry = namedtuple('FileEntry', 'target_path archive_path size')
+
+
+def decode_hash(value):
+    """Convert a Wabbajack base64 xxHash64 string to an unsigned int (0 if missing or invalid)"""
+    if not value:
+        return 0
+    try:
+        return int.from_bytes(base64.b64decode(value), 'little')
+    except (binascii.Error, ValueError, TypeError):
+        return 0
+
+
+def encode_hash(value):
+    """Convert a hash decoded by decode_hash back to Wabbajack's base64 form"""
+    return base64.b64encode(value.to_bytes(8, 'little')).decode('ascii') if value else ''
+
+
+_PATH_SEPARATORS = re.compile(r'[\\/]')
+
+
+def split_path(path):
+    """Split a path after its last separator into (directory, name), keeping the separator"""
+    cut = max(path.rfind('/'), path.rfind('\\')) + 1
+    return path[:cut], path[cut:]
+
+
+class StringTable:
+    """Interned strings stored once each and referred to by integer id.
+
+    The string to id lookup is only needed while strings are added, so it
+    is built on the first ``intern()`` and dropped again by ``compact()``.
+    """
+
+    def __init__(self, strings=None):
+        self.strings = list(strings or ())
+        self.ids = None
+
+    def intern(self, value):
+        if self.ids is None:
+            self.ids = {value: string_id for string_id, value in enumerate(self.strings)}
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self.ids[value] = string_id
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def __len__(self):
+        return len(self.strings)
+
+    def compact(self):
+        """Drop the lookup used by intern(), keeping only the strings"""
+        self.ids = None
+
+
+# Placeholder for target directories whose top-level directory is not known yet
+_UNMAPPED = 0xFFFFFFFF
+
+
+class DirectiveStore:
+    """Columnar storage for every file a modlist installs.
+
+    Every directive, of any type, is one row across parallel ``array``
+    columns. Directory parts of paths are interned in a shared
+    ``StringTable`` and file names are kept as UTF-8 in a single byte buffer.
+    Rows record their directive type, and file counts and sizes per
+    archive, per directive type and per top-level target directory are
+    totalled as rows are added, so no aggregate needs another pass over
+    the rows. ``finalize()`` groups the rows by archive so each archive's
+    files are a contiguous slice; lookups by archive hash return an
+    ``ArchiveFiles`` view over that slice. Directives that are not
+    extracted from an archive are grouped under the empty archive hash.
+
+    Columns are ``array`` objects while building; a store loaded from the
+    cache holds memoryviews over a memory-mapped file instead.
+    """
+
+    # Per-row columns, followed by the per-archive, per-type and per-top-level-directory columns.
+    # Name offsets are 32-bit (the names buffer stays far below 4 GB) and name lengths 16-bit,
+    # as a file name is at most 255 characters
+    ROW_COLUMNS = ('to_dir', 'to_name', 'to_name_len', 'from_dir', 'from_name', 'from_name_len', 'size', 'hash',
+                   'kind')
+    ARCHIVE_COLUMNS = ('archive_offsets', 'archive_total_size')
+    TOTAL_COLUMNS = ('type_count', 'type_total_size', 'top_dir_count', 'top_dir_total_size')
+
+    def __init__(self):
+        self.dirs = StringTable()
+        self.names = bytearray()
+        self.archive_ids = {}
+        self.archive_hashes = []
+        self.archive_offsets = None
+        self.archive_total_size = array('q')
+
+        # Directive type names, and top-level directories keyed case-insensitively
+        self.directive_types = StringTable()
+        self.top_dirs = []
+        self.top_dir_ids = {}
+        self._dir_top_dir = array('I')
+        self.type_count = array('Q')
+        self.type_total_size = array('q')
+        self.top_dir_count = array('Q')
+        self.top_dir_total_size = array('q')
+
+        self.archive = array('I')
+        self.to_dir = array('I')
+        self.to_name = array('I')
+        self.to_name_len = array('H')
+        self.from_dir = array('I')
+        self.from_name = array('I')
+        self.from_name_len = array('H')
+        self.size = array('q')
+        self.hash = array('Q')
+        self.kind = array('H')
+
+    def _add_name(self, name):
+        encoded = name.encode('utf-8')
+        start = len(self.names)
+        self.names += encoded
+        return start, len(encoded)
+
+    def _name(self, start, length):
+        return str(self.names[start:start + length], 'utf-8')
+
+    def _top_dir_id(self, dir_id, directory):
+        """Id of the top-level directory of an interned target directory, mapped once per directory"""
+        if dir_id < len(self._dir_top_dir) and self._dir_top_dir[dir_id] != _UNMAPPED:
+            return self._dir_top_dir[dir_id]
+
+        # Source directories share the table, so their slots stay unmapped
+        while len(self._dir_top_dir) <= dir_id:
+            self._dir_top_dir.append(_UNMAPPED)
+        top = _PATH_SEPARATORS.split(directory, 1)[0] if directory else ''
+        top_dir_id = self.top_dir_ids.get(top.lower())
+        if top_dir_id is None:
+            top_dir_id = len(self.top_dirs)
+            self.top_dirs.append(top)
+            self.top_dir_ids[top.lower()] = top_dir_id
+            self.top_dir_count.append(0)
+            self.top_dir_total_size.append(0)
+        self._dir_top_dir[dir_id] = top_dir_id
+        return top_dir_id
+
+    @classmethod
+    def from_columns(cls, dirs, names, archive_hashes, columns, directive_types, top_dirs):
+        """Rebuild a finalized store from previously saved columns"""
+        store = cls()
+        store.dirs = StringTable(dirs)
+        store.names = names
+        store.archive_hashes = list(archive_hashes)
+        store.archive_ids = {archive_hash: archive_id for archive_id, archive_hash in enumerate(store.archive_hashes)}
+        store.directive_types = StringTable(directive_types)
+        store.top_dirs = list(top_dirs)
+        store.top_dir_ids = {top.lower(): top_dir_id for top_dir_id, top in enumerate(store.top_dirs)}
+        for column in cls.ROW_COLUMNS + cls.ARCHIVE_COLUMNS + cls.TOTAL_COLUMNS:
+            setattr(store, column, columns[column])
+        return store
+
+    def add(self, archive_hash, target_path, archive_path, size, file_hash=0, directive_type='FromArchive'):
+        """Append one installed file; archive_hash is empty for files not extracted from an archive"""
+        size = size or 0
+        archive_id = self.archive_ids.get(archive_hash)
+        if archive_id is None:
+            archive_id = len(self.archive_hashes)
+            self.archive_hashes.append(archive_hash)
+            self.archive_ids[archive_hash] = archive_id
+            self.archive_total_size.append(0)
+        self.archive.append(archive_id)
+        self.archive_total_size[archive_id] += size
+
+        type_id = self.directive_types.intern(directive_type)
+        if type_id == len(self.type_count):
+            self.type_count.append(0)
+            self.type_total_size.append(0)
+        self.kind.append(type_id)
+        self.type_count[type_id] += 1
+        self.type_total_size[type_id] += size
+
+        directory, name = split_path(target_path)
+        dir_id = self.dirs.intern(directory)
+        top_dir_id = self._top_dir_id(dir_id, directory)
+        self.top_dir_count[top_dir_id] += 1
+        self.top_dir_total_size[top_dir_id] += size
+
+        self.to_dir.append(dir_id)
+        start, length = self._add_name(name)
+        self.to_name.append(start)
+        self.to_name_len.append(length)
+
+        directory, name = split_path(archive_path)
+        self.from_dir.append(self.dirs.intern(directory))
+        start, length = self._add_name(name)
+        self.from_name.append(start)
+        self.from_name_len.append(length)
+
+        self.size.append(size)
+        self.hash.append(file_hash)
+
+    def finalize(self):
+        """Reorder rows so every archive's files form one contiguous slice"""
+        counts = [0] * len(self.archive_hashes)
+        for archive_id in self.archive:
+            counts[archive_id] += 1
+
+        offsets = array('Q', [0])
+        for count in counts:
+            offsets.append(offsets[-1] + count)
+
+        # Stable counting sort keeps each archive's files in modlist order
+        order = array('Q', bytes(8 * len(self.archive)))
+        positions = list(offsets[:-1])
+        for row, archive_id in enumerate(self.archive):
+            order[positions[archive_id]] = row
+            positions[archive_id] += 1
+
+        for column in self.ROW_COLUMNS:
+            values = getattr(self, column)
+            setattr(self, column, array(values.typecode, [values[row] for row in order]))
+
+        # Rows are now grouped, so the per-row archive column is no longer needed, and
+        # no more directories are interned
+        self.archive = array('I')
+        self._dir_top_dir = array('I')
+        self.archive_offsets = offsets
+        self.dirs.compact()
+
+    def entry(self, row):
+        """Materialize one row as a FileEntry"""
+        return FileEntry(
+            self.dirs[self.to_dir[row]] + self._name(self.to_name[row], self.to_name_len[row]),
+            self.dirs[self.from_dir[row]] + self._name(self.from_name[row], self.from_name_len[row]),
+            self.size[row])
+
+    def target_path(self, row):
+        """Full target path of a row"""
+        return self.dirs[self.to_dir[row]] + self._name(self.to_name[row], self.to_name_len[row])
+
+    def row_type(self, row):
+        """Directive type name of a row"""
+        return self.directive_types[self.kind[row]]
+
+    def type_totals(self):
+        """Return (directive type, file count, total size) for every directive type"""
+        return [(self.directive_types[type_id], self.type_count[type_id], self.type_total_size[type_id])
+                for type_id in range(len(self.directive_types))]
+
+    def top_dir_totals(self):
+        """Return (top-level directory, file count, total size) for every top-level target directory"""
+        return [(self.top_dirs[top_dir_id], self.top_dir_count[top_dir_id], self.top_dir_total_size[top_dir_id])
+                for top_dir_id in range(len(self.top_dirs))]
+
+    def archive_totals(self):
+        """Return (archive hash, file count, total size) for every archive with files"""
+        return [(archive_hash, self.archive_offsets[archive_id + 1] - self.archive_offsets[archive_id],
+                 self.archive_total_size[archive_id])
+                for archive_id, archive_hash in enumerate(self.archive_hashes)]
+
+    def row_archive(self, row):
+        """Hash of the archive a row is installed from"""
+        return self.archive_hashes[bisect_right(self.archive_offsets, row) - 1]
+
+    def target_name(self, row):
+        """File name part of a row's target path"""
+        return self._name(self.to_name[row], self.to_name_len[row])
+
+    def memory_usage(self):
+        """Approximate bytes retained by the store"""
+        total = len(self.names)
+        for column in self.ROW_COLUMNS + self.ARCHIVE_COLUMNS + self.TOTAL_COLUMNS:
+            values = getattr(self, column)
+            total += len(values) * values.itemsize if values is not None else 0
+        total += sys.getsizeof(self.dirs.strings)
+        total += sys.getsizeof(self.dirs.ids) if self.dirs.ids is not None else 0
+        total += sum(sys.getsizeof(value) for value in self.dirs.strings)
+        total += sys.getsizeof(self.archive_ids) + sys.getsizeof(self.archive_hashes)
+        return total
+
+    def __len__(self):
+        return len(self.size)
+
+    def __contains__(self, archive_hash):
+        archive_id = self.archive_ids.get(archive_hash)
+        return archive_id is not None and self.archive_offsets[archive_id] < self.archive_offsets[archive_id + 1]
+
+    def __getitem__(self, archive_hash):
+        archive_id = self.archive_ids[archive_hash]
+        return ArchiveFiles(self, archive_id, self.archive_offsets[archive_id], self.archive_offsets[archive_id + 1])
+
+    def get(self, archive_hash, default=None):
+        return self[archive_hash] if archive_hash in self else default
+
+
+class ArchiveFiles:
+    """Sequence of FileEntry rows installed from a single archive"""
+
+    __slots__ = ('store', 'archive_id', 'start', 'stop')
+
+    def __init__(self, store, archive_id, start, stop):
+        self.store = store
+        self.archive_id = archive_id
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.store.entry(self.start + index)
+
+    def __iter__(self):
+        entry = self.store.entry
+        for row in range(self.start, self.stop):
+            yield entry(row)
+
+    def total_size(self):
+        return self.store.archive_total_size[self.archive_id]
+
+
+class DirectoryNode:
+    """One directory of an archive's install layout with aggregate totals"""
+
+    __slots__ = ('dirs', 'files', 'file_count', 'total_size')
+
+    def __init__(self):
+        self.dirs = {}
+        self.files = []
+        self.file_count = 0
+        self.total_size = 0
+
+
+def build_directory_tree(archive_files):
+    """Group an archive's files into DirectoryNodes by target path.
+
+    Each node lists its subdirectories by name and its files as
+    ``(name, row)`` pairs into the DirectiveStore, and carries the file count
+    and total size of everything below it.
+    """
+    store = archive_files.store
+    root = DirectoryNode()
+    # Rows sharing an interned directory string share the same node
+    nodes_by_dir = {}
+
+    for row in range(archive_files.start, archive_files.stop):
+        dir_id = store.to_dir[row]
+        node = nodes_by_dir.get(dir_id)
+        if node is None:
+            node = root
+            for part in _PATH_SEPARATORS.split(store.dirs[dir_id])[:-1]:
+                child = node.dirs.get(part)
+                if child is None:
+                    child = node.dirs[part] = DirectoryNode()
+                node = child
+            nodes_by_dir[dir_id] = node
+
+        node.files.append((store.target_name(row), row))
+        node.file_count += 1
+        node.total_size += store.size[row]
+
+    # Roll direct totals up into every parent directory
+    def add_subdirectory_totals(node):
+        for child in node.dirs.values():
+            add_subdirectory_totals(child)
+            node.file_count += child.file_count
+            node.total_size += child.total_size
+
+    add_subdirectory_totals(root)
+    return root
+
+
+ModOverview = namedtuple('ModOverview', 'text links')
+
+
+def downloader_type(archive):
+    """Short downloader name of an archive, e.g. 'Nexus' for 'NexusDownloader, Wabbajack.Lib'"""
+    mod_type = archive.get('State', {}).get('$type', '').split(',')[0].strip()
+    for suffix in ('+State', 'Downloader'):
+        if mod_type.endswith(suffix):
+            mod_type = mod_type[:-len(suffix)]
+    return mod_type
+
+
+def mod_links(archive):
+    """Return (mod page link, direct download link) for an archive, '' where unknown"""
+    state = archive.get('State', {})
+    mod_type = state.get('$type', '')
+    mod_page_link = ""
+    direct_file_link = ""
+
+    # Generate links
+    if 'NexusDownloader' in mod_type:
+        mod_id = state.get('ModID')
+        file_id = state.get('FileID')
+        game_name = state.get('GameName', 'skyrimse')
+
+        if mod_id and file_id:
+            if game_name.lower() == 'skyrimspecialedition':
+                mod_page_link = f"https://www.nexusmods.com/skyrimspecialedition/mods/{mod_id}"
+                direct_file_link = f"https://www.nexusmods.com/skyrimspecialedition/mods/{mod_id}?tab=files&file_id={file_id}"
+            else:
+                mod_page_link = f"https://www.nexusmods.com/{game_name.lower()}/mods/{mod_id}"
+                direct_file_link = f"https://www.nexusmods.com/{game_name.lower()}/mods/{mod_id}?tab=files&file_id={file_id}"
+
+    elif 'HttpDownloader' in mod_type:
+        direct_file_link = state.get('Url', '')
+
+    return mod_page_link, direct_file_link
+
+
+def build_mod_overview(archive, file_list=None):
+    """Render the Overview text for an archive.
+
+    Returns a ModOverview whose ``links`` are ``(start, end, url)`` character
+    offsets into ``text``, so links can be tagged without searching the text.
+    """
+    state = archive.get('State', {})
+    filename = archive.get('Name', 'Unknown Mod')
+    size = archive.get('Size', 0)
+
+    mod_author = state.get('Author', 'Unknown')
+    mod_description = state.get('Description', '')
+    mod_version = state.get('Version', '')
+    actual_mod_name = state.get('Name', filename)
+    mod_page_link, direct_file_link = mod_links(archive)
+
+    parts = []
+    links = []
+    length = 0
+
+    def add(text, url=None):
+        nonlocal length
+        if url:
+            links.append((length, length + len(text), url))
+        parts.append(text)
+        length += len(text)
+
+    add(f"Mod Name: {actual_mod_name}\n")
+    add(f"Filename: {filename}\n")
+    add(f"Author: {mod_author}\n")
+    if mod_version:
+        add(f"Version: {mod_version}\n")
+
+    size_mb = size / (1024 * 1024) if size > 0 else 0
+    add(f"Archive Size: {size_mb:.1f} MB\n\n")
+
+    if mod_description:
+        add(f"Description: {mod_description}\n\n")
+
+    # Add download links
+    if mod_page_link and direct_file_link:
+        add("Mod Page: ")
+        add(mod_page_link, mod_page_link)
+        add("\nDirect Download: ")
+        add(direct_file_link, direct_file_link)
+        add("\n\n")
+    elif direct_file_link:
+        add("Download: ")
+        add(direct_file_link, direct_file_link)
+        add("\n\n")
+    else:
+        add("Download: Direct download (link not available)\n\n")
+
+    # Add file count information
+    if file_list is not None:
+        add(f"Files to be installed: {len(file_list)} files\n")
+        total_size = file_list.total_size()
+        add(f"Total file size: {total_size:,} bytes ({total_size / (1024*1024):.1f} MB)\n")
+    else:
+        add("No file details available for this mod.\n")
+
+    return ModOverview(''.join(parts), links)
+
+
+class Modlist:
+    """Indexed contents of a single loaded modlist"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.info = {}
+        self.archives = []
+        self.archive_lookup = {}
+        self.archive_index = {}
+        self.mod_details = DirectiveStore()
+        self.paths = None
+        self.install_tree = None
+
+    @property
+    def name(self):
+        return self.info.get('Name', 'Unknown Modlist')
+
+    def add_archive(self, archive):
+        """Register a single archive record from the modlist"""
+        archive_hash = archive.get('Hash', '')
+        archive_name = archive.get('Name', '')
+        self.archive_index[archive_hash] = len(self.archives)
+        self.archive_lookup[archive_hash] = archive_name
+        self.archives.append(archive)
+
+    def archive_by_hash(self, archive_hash):
+        """Return the archive record with the given hash, or None"""
+        index = self.archive_index.get(archive_hash)
+        return self.archives[index] if index is not None else None
+
+    def overview(self, archive_index):
+        """Build the Overview text and link spans for an archive"""
+        archive = self.archives[archive_index]
+        return build_mod_overview(archive, self.mod_details.get(archive.get('Hash', '')))
+
+    def process_directive(self, directive):
+        """Add a single directive of any type to the mod details lookup"""
+        # Archive-sourced types (FromArchive, PatchedFromArchive, TransformedTexture, ...)
+        # name their archive; inline files, BSAs and other generated files have none, and
+        # inline files record the .wabbajack member holding their data as the source path
+        archive_hash_path = directive.get('ArchiveHashPath') or ()
+        archive_hash = archive_hash_path[0] if archive_hash_path else ''
+        if len(archive_hash_path) > 1:
+            archive_path = archive_hash_path[1]
+        else:
+            archive_path = directive.get('SourceDataID') or ''
+
+        self.mod_details.add(archive_hash, directive.get('To', ''), archive_path, directive.get('Size', 0),
+                             decode_hash(directive.get('Hash')), directive.get('$type', 'Unknown'))
+
+    def process_directives(self, directives):
+        """Replace the mod details lookup with one built from directives"""
+        # A finalized store can't take more rows, and appending would double count
+        self.mod_details = DirectiveStore()
+        for directive in directives:
+            self.process_directive(directive)
+        self.finalize()
+
+    def finalize(self):
+        """Build the per-archive and target path indexes and the install tree once all directives are in"""
+        with diagnostics.phase("Group by archive", len(self.mod_details)):
+            self.mod_details.finalize()
+        with diagnostics.phase("Build path index", len(self.mod_details)):
+            self.paths = PathIndex.build(self.mod_details)
+        with diagnostics.phase("Build install tree", len(self.mod_details)):
+            self.install_tree = InstallTree.build(self.mod_details)
+
+
+def load_modlist(wabbajack_path, progress=None, cancel_event=None):
+    """Stream and index the modlist of a Wabbajack file.
+
+    ``progress`` is called as ``progress(stage, fraction)`` from the calling
+    thread; ``cancel_event`` is a ``threading.Event`` that aborts the load
+    with ``LoadCancelled`` once set.
+    """
+    modlist = Modlist(os.path.abspath(wabbajack_path))
+
+    with diagnostics.phase("Open archive"):
+        zip_ref = zipfile.ZipFile(wabbajack_path, 'r')
+    with zip_ref:
+        modlist_file = find_modlist_member(zip_ref)
+        if modlist_file is None:
+            raise ModlistNotFoundError("No modlist file found in Wabbajack archive")
+
+        total_bytes = zip_ref.getinfo(modlist_file).file_size or 1
+        with zip_ref.open(modlist_file) as modlist_stream:
+            reader = ModlistStreamReader(modlist_stream)
+            # Decompression, JSON decoding and directive processing are interleaved,
+            # so the time of each is accumulated and recorded once at the end
+            reading_start = time.perf_counter()
+            process_seconds = 0.0
+            peak_id = diagnostics.start_peak()
+            try:
+                for count, (key, value) in enumerate(reader):
+                    if key == 'Archives':
+                        modlist.add_archive(value)
+                    elif key == 'Directives':
+                        start = time.perf_counter()
+                        modlist.process_directive(value)
+                        process_seconds += time.perf_counter() - start
+                    else:
+                        modlist.info[key] = value
+
+                    if count % PROGRESS_INTERVAL == 0:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise LoadCancelled()
+                        if progress:
+                            progress("Reading modlist", min(reader.bytes_read / total_bytes, 1.0))
+            finally:
+                # The three stages share one streaming pass, and so its peak
+                peak = diagnostics.end_peak(peak_id)
+
+            reading_seconds = time.perf_counter() - reading_start
+            diagnostics.add("Decompress", reader.read_seconds, reader.bytes_read, peak)
+            diagnostics.add("Parse JSON", reading_seconds - reader.read_seconds - process_seconds,
+                            len(modlist.archives) + len(modlist.mod_details), peak)
+            diagnostics.add("Process directives", process_seconds, len(modlist.mod_details), peak)
+
+    if progress:
+        progress("Indexing", 0.0)
+    modlist.finalize()
+    if progress:
+        progress("Indexing", 1.0)
+    return modlist
@@ -0,0 +1,135 @@
+"""Modlist-wide index of install target paths for Wabbajack Viewer"""
+import fnmatch
+import re
+from array import array
+
+# Characters that start a wildcard in a glob query
+_GLOB_CHARS = '*?['
+
+
+def path_key(path):
+    """Normalize a target path for comparison: Windows paths ignore case and separator style"""
+    return path.replace('/', '\\').lower().lstrip('\\')
+
+
+class PathIndex:
+    """Every directive's target path in sorted order, for reverse lookups.
+
+    ``path_order`` lists the DirectiveStore rows sorted by ``path_key`` of
+    their target path, so full path and prefix queries are binary searches
+    and glob queries only scan the range matching the pattern's literal
+    prefix. ``path_conflicts`` holds flattened [start, stop) position pairs
+    into ``path_order`` for every path written by more than one directive;
+    it is found in the same pass that builds the index.
+    """
+
+    COLUMNS = ('path_order', 'path_conflicts')
+
+    def __init__(self, store, path_order, path_conflicts):
+        self.store = store
+        self.path_order = path_order
+        self.path_conflicts = path_conflicts
+
+    @classmethod
+    def build(cls, store):
+        """Sort a finalized store's rows by target path and find the conflicting paths"""
+        keys = [path_key(store.target_path(row)) for row in range(len(store))]
+        order = array('I', sorted(range(len(keys)), key=keys.__getitem__))
+
+        conflicts = array('I')
+        start = 0
+        for position in range(1, len(order) + 1):
+            if position == len(order) or keys[order[position]] != keys[order[start]]:
+                if position - start > 1:
+                    conflicts.append(start)
+                    conflicts.append(position)
+                start = position
+        return cls(store, order, conflicts)
+
+    def __len__(self):
+        return len(self.path_order)
+
+    def _key(self, position):
+        return path_key(self.store.target_path(self.path_order[position]))
+
+    def _bisect(self, key, lo=0, hi=None, right=False):
+        """Binary search the sorted keys; right=True finds the end of a run of equal keys"""
+        hi = len(self.path_order) if hi is None else hi
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key = self._key(mid)
+            if mid_key < key or (right and mid_key == key):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def prefix_range(self, prefix):
+        """Return the [start, stop) positions of paths starting with prefix"""
+        prefix = path_key(prefix)
+        start = self._bisect(prefix)
+        if not prefix:
+            return start, len(self.path_order)
+        # Every key starting with prefix sorts before prefix + the highest code point
+        return start, self._bisect(prefix + '\U0010ffff', lo=start)
+
+    def lookup(self, path):
+        """Return the rows installing exactly this path"""
+        key = path_key(path)
+        start = self._bisect(key)
+        stop = self._bisect(key, lo=start, right=True)
+        return list(self.path_order[start:stop])
+
+    def prefix(self, prefix):
+        """Return the rows whose path starts with prefix, in path order"""
+        start, stop = self.prefix_range(prefix)
+        return list(self.path_order[start:stop])
+
+    def glob(self, pattern, rows=None):
+        """Return the rows whose whole path matches a glob pattern, in path order.
+
+        Matching is case-insensitive and ``*`` also matches path separators.
+        ``rows``, when given, is a path-ordered subset of rows to filter
+        instead of the whole index.
+        """
+        pattern = path_key(pattern)
+        literal = pattern
+        for char in _GLOB_CHARS:
+            literal = literal.split(char, 1)[0]
+
+        if rows is None:
+            start, stop = self.prefix_range(literal)
+            rows = self.path_order[start:stop]
+        elif literal:
+            rows = [row for row in rows if path_key(self.store.target_path(row)).startswith(literal)]
+
+        match = re.compile(fnmatch.translate(pattern)).match
+        target_path = self.store.target_path
+        return [row for row in rows if match(path_key(target_path(row)))]
+
+    def search(self, query, conflicts_only=False):
+        """Rows matching a path query: a glob if it contains wildcards, otherwise a prefix"""
+        rows = self.conflict_rows() if conflicts_only else None
+        if any(char in query for char in _GLOB_CHARS):
+            return self.glob(query, rows)
+        if rows is None:
+            return self.prefix(query)
+        key = path_key(query)
+        return [row for row in rows if path_key(self.store.target_path(row)).startswith(key)]
+
+    def conflict_count(self):
+        """Number of distinct paths written by more than one directive"""
+        return len(self.path_conflicts) // 2
+
+    def conflicts(self):
+        """Yield (target path, rows) for every path written by more than one directive"""
+        for i in range(0, len(self.path_conflicts), 2):
+            rows = list(self.path_order[self.path_conflicts[i]:self.path_conflicts[i + 1]])
+            yield self.store.target_path(rows[0]), rows
+
+    def conflict_rows(self):
+        """Every row writing a conflicting path, grouped by path"""
+        rows = []
+        for i in range(0, len(self.path_conflicts), 2):
+            rows.extend(self.path_order[self.path_conflicts[i]:self.path_conflicts[i + 1]])
+        return rows
@@ -0,0 +1,253 @@
+"""Previews of the files embedded in a .wabbajack archive (no GUI dependencies).
+
+Besides the modlist itself, a .wabbajack zip holds the data of inline file
+directives (one member per ``SourceDataID``), the modlist image and
+sometimes a readme. The zip's central directory is indexed once; a preview
+then reads only the start of the one member it shows, so a member is never
+extracted to disk and the archive is never read whole.
+"""
+import json
+import struct
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+
+from wabbajack_modlist import find_modlist_member
+
+# Bytes of a text member decoded for its preview
+PREVIEW_TEXT_BYTES = 256 * 1024
+
+# Members up to this size are read whole to show them as images; larger ones only get their dimensions
+PREVIEW_IMAGE_BYTES = 16 * 1024 * 1024
+
+# Bytes read to recognise a member's type and image dimensions
+PREVIEW_HEADER_BYTES = 64 * 1024
+
+# Bytes of a binary member shown as a hex dump
+PREVIEW_HEX_BYTES = 512
+
+# Total size of the decoded previews kept per open modlist
+PREVIEW_CACHE_BYTES = 32 * 1024 * 1024
+
+# Extensions previewed as text even if they happen to hold a NUL byte early on
+TEXT_EXTENSIONS = ('.txt', '.ini', '.json', '.md', '.cfg', '.toml', '.yaml', '.yml', '.xml', '.html', '.htm',
+                   '.log', '.csv', '.psc', '.bat', '.ps1')
+
+# Image formats Tk can display from raw bytes
+DISPLAYABLE_IMAGE_FORMATS = ('PNG', 'GIF')
+
+# kind is 'text', 'image' or 'binary'; text is the decoded text (or hex dump), data the raw image bytes
+Preview = namedtuple('Preview', 'name kind size text data image_format width height truncated')
+
+
+def image_size(header):
+    """(format, width, height) of a PNG, GIF, JPEG, BMP or DDS image from its first bytes, or None"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and len(header) >= 24:
+        width, height = struct.unpack('>II', header[16:24])
+        return 'PNG', width, height
+    if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        width, height = struct.unpack('<HH', header[6:10])
+        return 'GIF', width, height
+    if header.startswith(b'BM') and len(header) >= 26:
+        width, height = struct.unpack('<ii', header[18:26])
+        return 'BMP', width, abs(height)
+    if header.startswith(b'DDS ') and len(header) >= 20:
+        height, width = struct.unpack('<II', header[12:20])
+        return 'DDS', width, height
+    if header.startswith(b'\xff\xd8'):
+        # Walk the JPEG segments to the first start-of-frame marker
+        position = 2
+        while position + 9 <= len(header):
+            if header[position] != 0xFF:
+                return None
+            marker = header[position + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                position += 2
+                continue
+            length = struct.unpack('>H', header[position + 2:position + 4])[0]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', header[position + 5:position + 9])
+                return 'JPEG', width, height
+            position += 2 + length
+    return None
+
+
+def looks_like_text(name, header):
+    """True if a member should be previewed as text"""
+    if name.lower().endswith(TEXT_EXTENSIONS):
+        return True
+    if b'\x00' in header[:8192]:
+        return False
+    try:
+        header[:8192].decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is still text
+        return e.start >= min(len(header), 8192) - 3
+    return True
+
+
+def hex_dump(data):
+    lines = []
+    for offset in range(0, len(data), 16):
+        chunk = data[offset:offset + 16]
+        printable = ''.join(chr(byte) if 32 <= byte < 127 else '.' for byte in chunk)
+        lines.append(f"{offset:08x}  {chunk.hex(' '):<47}  {printable}")
+    return '\n'.join(lines)
+
+
+def decode_text(data, complete):
+    """Decode a member's text, pretty-printing JSON that was read in full"""
+    text = data.decode('utf-8-sig', errors='replace')
+    if complete and text.lstrip()[:1] in ('{', '['):
+        try:
+            return json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+        except ValueError:
+            pass
+    return text
+
+
+class PreviewCache:
+    """LRU cache of decoded previews bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.entries = OrderedDict()
+
+    @staticmethod
+    def cost(preview):
+        return len(preview.text or '') + len(preview.data or b'')
+
+    def get(self, key):
+        preview = self.entries.get(key)
+        if preview is not None:
+            # Most recently used entries live at the end
+            self.entries.move_to_end(key)
+        return preview
+
+    def put(self, key, preview):
+        cost = self.cost(preview)
+        if cost > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total -= self.cost(old)
+        self.entries[key] = preview
+        self.total += cost
+        while self.total > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total -= self.cost(evicted)
+
+    def clear(self):
+        self.entries.clear()
+        self.total = 0
+
+
+class WabbajackContents:
+    """Random access to the members of one .wabbajack file.
+
+    The zip is opened and its member index built on first use, and the
+    handle is kept until ``close()``. Reads are serialized, as one open
+    zip file can only stream one member at a time safely.
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        self.cache = cache if cache is not None else PreviewCache()
+        self._zip = None
+        self._members = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._zip is None:
+            self._zip = zipfile.ZipFile(self.path, 'r')
+            self._members = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        return self._zip
+
+    @property
+    def members(self):
+        """{member name: ZipInfo} of every file in the archive"""
+        with self._lock:
+            self._open()
+            return self._members
+
+    def modlist_member(self):
+        with self._lock:
+            return find_modlist_member(self._open())
+
+    def __contains__(self, name):
+        return name in self.members
+
+    def size(self, name):
+        return self.members[name].file_size
+
+    def read(self, name, limit=None):
+        """Up to limit decompressed bytes from the start of a member"""
+        with self._lock:
+            with self._open().open(name) as member:
+                return member.read(limit) if limit is not None else member.read()
+
+    def preview(self, name):
+        """The decoded Preview of a member, from the LRU cache when possible"""
+        preview = self.cache.get(name)
+        if preview is None:
+            preview = self._build_preview(name)
+            self.cache.put(name, preview)
+        return preview
+
+    def _build_preview(self, name):
+        size = self.size(name)
+        header = self.read(name, PREVIEW_HEADER_BYTES)
+        image = image_size(header)
+        if image is not None:
+            image_format, width, height = image
+            data = None
+            if image_format in DISPLAYABLE_IMAGE_FORMATS and size <= PREVIEW_IMAGE_BYTES:
+                data = header if size <= len(header) else self.read(name)
+            return Preview(name, 'image', size, None, data, image_format, width, height, data is None)
+
+        if looks_like_text(name, header):
+            data = header if size <= len(header) else self.read(name, PREVIEW_TEXT_BYTES)
+            truncated = size > len(data)
+            return Preview(name, 'text', size, decode_text(data, not truncated), None, None, None, None, truncated)
+
+        data = header[:PREVIEW_HEX_BYTES]
+        return Preview(name, 'binary', size, hex_dump(data), None, None, None, None, size > len(data))
+
+    def close(self):
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+            self._zip = None
+            self._members = None
+        self.cache.clear()
+
+
+def embedded_files(modlist, contents):
+    """(member name, label, used as, size) for every member of the archive except the modlist itself.
+
+    Members holding inline file data are labelled with the target path of
+    their directive, and the modlist image and readme by their role.
+    """
+    members = contents.members
+    roles = {}
+    image = modlist.info.get('Image')
+    if image in members:
+        roles[image] = ('Modlist image', "Modlist image")
+    readme = modlist.info.get('Readme')
+    if isinstance(readme, str) and readme in members:
+        roles[readme] = ('Readme', "Readme")
+
+    # Files not extracted from an archive are grouped under the empty hash, and
+    # inline ones name their member as the source path
+    store = modlist.mod_details
+    files = store.get('')
+    if files is not None:
+        for row in range(files.start, files.stop):
+            source = store.entry(row).archive_path
+            if source in members and source not in roles:
+                roles[source] = (store.target_path(row), store.row_type(row))
+
+    modlist_member = contents.modlist_member()
+    return [(name, *roles.get(name, (name, '')), info.file_size)
+            for name, info in members.items() if name != modlist_member]
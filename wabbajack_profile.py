@@ -0,0 +1,274 @@
+"""Phase timing and opt-in session profiling for Wabbajack Viewer (no GUI dependencies)"""
+import atexit
+import os
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from itertools import count
+
+# Set to a file path to profile a whole session (also settable with --profile)
+PROFILE_ENV_VAR = 'WABBAJACK_VIEWER_PROFILE'
+
+# Number of recorded phases kept; searches and selections add one each
+MAX_PHASES = 1000
+
+# Functions and allocation sites listed in a session profile report
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+
+# peak_memory is the highest resident memory during the phase where the platform's
+# high-water mark can be reset (Linux); elsewhere peak_growth is how far the
+# process-lifetime peak rose during the phase
+Phase = namedtuple('Phase', 'name seconds items peak_memory peak_growth')
+
+
+def peak_memory():
+    """Peak resident memory in bytes since the last reset_peak_memory() (for the whole
+    process where it can't be reset), or None if the platform can't tell"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            kernel32 = ctypes.windll.kernel32
+            if not kernel32.K32GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters),
+                                                    counters.cb):
+                return None
+            return counters.PeakWorkingSetSize
+
+        if sys.platform.startswith('linux'):
+            # VmHWM is the resident high-water mark, which clear_refs can reset
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, AttributeError, OSError, ValueError, IndexError):
+        return None
+
+
+def reset_peak_memory():
+    """Lower the peak to the current resident memory; False if the platform can't (only Linux can)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+def format_peak(phase):
+    """A phase's peak memory, or the growth of the process peak (as +N MB) where that's all there is"""
+    if phase.peak_memory:
+        return f"{phase.peak_memory / (1024 * 1024):,.0f} MB"
+    if phase.peak_growth is not None:
+        return f"+{phase.peak_growth / (1024 * 1024):,.0f} MB"
+    return ''
+
+
+class Diagnostics:
+    """Wall time, item counts and peak memory of the phases of a session.
+
+    Phases are coarse (a load stage, one search, one selection), so timing
+    them is always on: it costs two clock reads and a few memory queries per
+    phase. Work done per directive is accumulated by the caller and recorded
+    once with ``add``, with the peak measured between ``start_peak`` and
+    ``end_peak``.
+
+    On Linux the resident high-water mark is reset at the start of each
+    measurement, and the peak reached so far is carried over to the
+    measurements still open first, so phases that nest or overlap in other
+    threads each get their own peak. Elsewhere the process-lifetime peak
+    can't be lowered and only its growth during a phase is recorded. The cProfile/tracemalloc session profile, which does
+    slow everything down, only runs after ``start_profiling``.
+    """
+
+    def __init__(self, max_phases=MAX_PHASES):
+        self.phases = deque(maxlen=max_phases)
+        self.recorded = 0
+        self.profile_path = None
+        self._profilers = []
+        self._lock = threading.Lock()
+        # Open peak measurements: the highest peak seen before a reset where the
+        # high-water mark resets, else the process peak when they started
+        self._peaks = {}
+        self._peak_ids = count()
+        self._peak_resets = None
+
+    def start_peak(self):
+        """Start measuring peak memory; returns an id to pass to end_peak"""
+        with self._lock:
+            peak_id = next(self._peak_ids)
+            if self._peak_resets is None:
+                self._peak_resets = reset_peak_memory()
+            if self._peak_resets:
+                peak = peak_memory() or 0
+                for open_id, highest in self._peaks.items():
+                    self._peaks[open_id] = max(highest, peak)
+                reset_peak_memory()
+                self._peaks[peak_id] = 0
+            else:
+                self._peaks[peak_id] = peak_memory()
+            return peak_id
+
+    def end_peak(self, peak_id):
+        """(peak_memory, peak_growth) of a measurement started with start_peak"""
+        with self._lock:
+            start = self._peaks.pop(peak_id)
+            peak = peak_memory()
+        if peak is None:
+            return None, None
+        if self._peak_resets:
+            return max(start, peak), None
+        return None, max(0, peak - start) if start is not None else None
+
+    def add(self, name, seconds, items=None, peak=(None, None)):
+        """Record a finished phase with the (peak_memory, peak_growth) from end_peak; returns its sequence number"""
+        with self._lock:
+            self.phases.append(Phase(name, seconds, items, *peak))
+            self.recorded += 1
+            return self.recorded
+
+    @contextmanager
+    def phase(self, name, items=None):
+        """Time the enclosed block as one phase.
+
+        The yielded dict can be updated with ``items`` once the count is known,
+        and holds the elapsed ``seconds`` after the block.
+        """
+        details = {'items': items}
+        peak_id = self.start_peak()
+        start = time.perf_counter()
+        try:
+            yield details
+        finally:
+            details['seconds'] = time.perf_counter() - start
+            self.add(name, details['seconds'], details['items'], self.end_peak(peak_id))
+
+    def mark(self):
+        """Sequence number to pass to since() later"""
+        return self.recorded
+
+    def since(self, mark):
+        """Phases recorded after mark, oldest first"""
+        with self._lock:
+            count = min(self.recorded - mark, len(self.phases))
+            return list(self.phases)[len(self.phases) - count:] if count > 0 else []
+
+    def summary(self, phases):
+        """One-line summary such as 'Read modlist 1.20 s, Build path index 80 ms'"""
+        return ', '.join(f"{phase.name} {format_seconds(phase.seconds)}" for phase in phases)
+
+    @property
+    def profiling(self):
+        return self.profile_path is not None
+
+    def start_profiling(self, path):
+        """Profile the rest of the session with cProfile and tracemalloc, reported to path on exit"""
+        import cProfile
+        import tracemalloc
+
+        if self.profiling:
+            return
+        self.profile_path = path
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        self._profilers.append(profiler)
+        profiler.enable()
+        atexit.register(self.write_profile)
+
+    @contextmanager
+    def profile_thread(self):
+        """Include the enclosed block of a worker thread in the session profile"""
+        if not self.profiling:
+            yield
+            return
+
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ profiles every thread from the session profiler already
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profilers.append(profiler)
+
+    def report(self):
+        """Plain text table of the recorded phases"""
+        lines = [f"{'Phase':<32} {'Time':>10} {'Items':>12} {'Peak':>12}"]
+        for phase in list(self.phases):
+            items = f"{phase.items:,}" if phase.items is not None else ''
+            lines.append(f"{phase.name:<32} {format_seconds(phase.seconds):>10} {items:>12} {format_peak(phase):>12}")
+        return '\n'.join(lines)
+
+    def write_profile(self):
+        """Write the session profile: phases, cProfile stats and top allocation sites.
+
+        Writes ``<path>`` as text and ``<path>.prof`` as raw cProfile data for
+        tools such as snakeviz.
+        """
+        import io
+        import pstats
+        import tracemalloc
+
+        if not self.profiling or not self._profilers:
+            return
+        self._profilers[0].disable()
+        with self._lock:
+            profilers = list(self._profilers)
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(*profilers, stream=stats_text)
+        stats.dump_stats(self.profile_path + '.prof')
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+
+        sections = ["Phases", self.report(), "", "Profile (all threads, cumulative)", stats_text.getvalue()]
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            sections.append(f"Traced memory: {current / (1024 * 1024):,.1f} MB current, "
+                            f"{peak / (1024 * 1024):,.1f} MB peak")
+            sections.append("Top allocation sites")
+            for stat in tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+                sections.append(str(stat))
+
+        with open(self.profile_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(sections) + '\n')
+        self._profilers = []
+
+
+# Session-wide diagnostics shared by the loaders, the GUI and the CLI
+diagnostics = Diagnostics()
+
+
+def start_session_profile(path=None):
+    """Start profiling if a path is given or set in the environment; returns the path or None"""
+    path = path or os.environ.get(PROFILE_ENV_VAR)
+    if path:
+        diagnostics.start_profiling(os.path.abspath(path))
+    return path
@@ -0,0 +1,315 @@
+"""Structured mod list queries for Wabbajack Viewer.
+
+A query such as ``author:arthmoor size>500MB (type:nexus OR type:http) -game:fallout4``
+is parsed once into a tree of predicates. Each predicate is evaluated over
+a whole column of archive attributes at a time and yields a mask (one 0/1
+byte per archive); masks are combined with big-integer AND/OR and bytes
+translation for NOT, so evaluation does no per-archive Python work beyond
+the C-level map over each column.
+"""
+import json
+import math
+import os
+import re
+from array import array
+from itertools import compress, repeat
+
+from wabbajack_cache import default_cache_dir
+from wabbajack_modlist import downloader_type
+from wabbajack_search import search_fields
+from wabbajack_sort import version_key
+
+SAVED_QUERIES_NAME = 'saved_queries.json'
+
+# Byte size units accepted by size and installed
+SIZE_UNITS = {'': 1, 'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3, 'tb': 1024 ** 4}
+
+# Field kinds: substring/exact text, natural-order version, and numbers (plain or byte sizes)
+TEXT, VERSION, COUNT, BYTES = 'text', 'version', 'count', 'bytes'
+
+# Query field -> (column, kind)
+FIELDS = {
+    'name': ('name', TEXT),
+    'author': ('author', TEXT),
+    'file': ('filename', TEXT),
+    'filename': ('filename', TEXT),
+    'version': ('version', VERSION),
+    'game': ('game', TEXT),
+    'type': ('source', TEXT),
+    'source': ('source', TEXT),
+    'hash': ('hash', TEXT),
+    'download': ('download', TEXT),
+    'size': ('size', BYTES),
+    'files': ('files', COUNT),
+    'installed': ('installed', BYTES),
+}
+
+_TOKEN = re.compile(r'''\s*(?:
+    (?P<open>\() |
+    (?P<close>\)) |
+    (?P<negate>-)(?=[^\s)]) |
+    (?P<field>[A-Za-z]+)(?P<op><=|>=|!=|:|=|<|>)(?P<value>"[^"]*"|[^\s()"]*) |
+    (?P<quoted>"[^"]*") |
+    (?P<word>[^\s()"]+)
+)''', re.VERBOSE)
+
+_NUMBER = re.compile(r'(\d+(?:\.\d*)?|\.\d+)\s*([a-z]*)')
+
+_NOT = bytes.maketrans(b'\x00\x01', b'\x01\x00')
+
+
+class QueryError(ValueError):
+    """Raised for a query that can't be parsed"""
+
+
+class ArchiveTable:
+    """Archive attributes stored column by column, lowercased where matched as text"""
+
+    def __init__(self, modlist=None):
+        self.columns = {}
+        self.count = 0
+        if modlist is None:
+            return
+        store = modlist.mod_details
+        columns = {name: [] for name in ('name', 'author', 'filename', 'version', 'game', 'source', 'hash',
+                                         'haystack')}
+        files_column = array('Q')
+        installed_column = array('Q')
+        for archive in modlist.archives:
+            state = archive.get('State', {})
+            name, author, filename = search_fields(archive)
+            files = store.get(archive.get('Hash', ''))
+            columns['name'].append(name.casefold())
+            columns['author'].append(author.casefold())
+            columns['filename'].append(filename.casefold())
+            columns['version'].append(version_key(state.get('Version', '')))
+            columns['game'].append(state.get('GameName', '').casefold())
+            columns['source'].append(downloader_type(archive).casefold())
+            columns['hash'].append(archive.get('Hash', '').casefold())
+            # Bare words match like the plain search box
+            columns['haystack'].append(f"{name}\n{author}\n{filename}".lower())
+            files_column.append(len(files) if files is not None else 0)
+            installed_column.append(files.total_size() if files is not None else 0)
+        self.columns = columns
+        self.columns['size'] = array('Q', (max(0, archive.get('Size', 0)) for archive in modlist.archives))
+        self.columns['files'] = files_column
+        self.columns['installed'] = installed_column
+        self.columns['download'] = [''] * len(modlist.archives)
+        self.count = len(modlist.archives)
+
+    def set_column(self, name, values):
+        self.columns[name] = values
+
+
+def _and(left, right):
+    def evaluate(table):
+        return (int.from_bytes(left(table), 'little') & int.from_bytes(right(table), 'little')).to_bytes(
+            table.count, 'little')
+    return evaluate
+
+
+def _or(left, right):
+    def evaluate(table):
+        return (int.from_bytes(left(table), 'little') | int.from_bytes(right(table), 'little')).to_bytes(
+            table.count, 'little')
+    return evaluate
+
+
+def _not(operand):
+    def evaluate(table):
+        return operand(table).translate(_NOT)
+    return evaluate
+
+
+def _contains(column, needle):
+    def evaluate(table):
+        return bytes(map(str.__contains__, table.columns[column], repeat(needle)))
+    return evaluate
+
+
+def _compare(column, op, value):
+    """Mask of column <op> value, with the comparison bound to value so map() stays in C"""
+    predicate = {
+        '=': value.__eq__, ':': value.__eq__, '!=': value.__ne__,
+        '>': value.__lt__, '>=': value.__le__, '<': value.__gt__, '<=': value.__ge__,
+    }[op]
+
+    def evaluate(table):
+        return bytes(map(predicate, table.columns[column]))
+    return evaluate
+
+
+def _nothing(table):
+    return bytes(table.count)
+
+
+def parse_number(text, kind):
+    """Parse '1000', '1.5GB' or '500mb' for a count or byte size field"""
+    match = _NUMBER.fullmatch(text.strip().lower())
+    if not match:
+        raise QueryError(f"Expected a number, got '{text}'")
+    number, unit = match.groups()
+    if kind == BYTES and unit in SIZE_UNITS:
+        return float(number) * SIZE_UNITS[unit]
+    if unit:
+        raise QueryError(f"Unknown unit '{unit}' in '{text}'")
+    return float(number)
+
+
+def _numeric(column, op, number):
+    """Compare an integer column against a possibly fractional number"""
+    if op in ('=', ':', '!='):
+        if number != int(number):
+            # No integer equals a fraction
+            return _nothing if op != '!=' else _not(_nothing)
+        return _compare(column, op, int(number))
+    # x > 1.5 is x > 1 and x >= 1.5 is x >= 2 for integers
+    bound = math.floor(number) if op in ('>', '<=') else math.ceil(number)
+    return _compare(column, op, bound)
+
+
+def _term(field, op, value):
+    try:
+        column, kind = FIELDS[field.lower()]
+    except KeyError:
+        raise QueryError(f"Unknown field '{field}' (fields: {', '.join(sorted(FIELDS))})") from None
+    if kind in (COUNT, BYTES):
+        return _numeric(column, op, parse_number(value, kind))
+    if kind == VERSION:
+        return _compare(column, '=' if op == ':' else op, version_key(value))
+    if op == ':':
+        return _contains(column, value.casefold())
+    if op in ('=', '!='):
+        return _compare(column, op, value.casefold())
+    raise QueryError(f"'{field}' is text and can't be compared with {op}")
+
+
+def tokenize(text):
+    """Split a query into (kind, value) tokens"""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Unexpected '{text[position:].strip()}'")
+        position = match.end()
+        kind = match.lastgroup
+        if kind == 'value' or kind == 'op':
+            kind = 'field'
+        if kind == 'field':
+            value = match.group('value')
+            tokens.append(('term', (match.group('field'), match.group('op'),
+                                    value[1:-1] if value.startswith('"') else value)))
+        elif kind == 'quoted':
+            tokens.append(('quoted', match.group('quoted')[1:-1]))
+        elif kind == 'word' and match.group('word') in ('AND', 'OR', 'NOT'):
+            tokens.append((match.group('word'), None))
+        else:
+            tokens.append((kind, match.group(kind)))
+    return tokens
+
+
+def is_structured(text):
+    """True if text uses known fields, operators or quotes rather than being a plain search"""
+    # Plain text keeps the substring search of the whole text, spaces included, so
+    # mod names such as "SkyUI: Patch" aren't read as an unknown field
+    try:
+        tokens = tokenize(text)
+    except QueryError:
+        return False
+    return any(kind != 'word' and (kind != 'term' or value[0].lower() in FIELDS) for kind, value in tokens)
+
+
+class Query:
+    """A parsed query; calling ``evaluate`` filters an ArchiveTable"""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.predicate = self._or_expression() if self.tokens else None
+        if self.position < len(self.tokens):
+            raise QueryError(f"Unexpected '{self.tokens[self.position][1] or self.tokens[self.position][0]}'")
+        del self.tokens
+
+    def _peek(self):
+        return self.tokens[self.position][0] if self.position < len(self.tokens) else None
+
+    def _or_expression(self):
+        left = self._and_expression()
+        while self._peek() == 'OR':
+            self.position += 1
+            left = _or(left, self._and_expression())
+        return left
+
+    def _and_expression(self):
+        left = self._unary()
+        while self._peek() not in (None, 'OR', 'close'):
+            if self._peek() == 'AND':
+                self.position += 1
+            left = _and(left, self._unary())
+        return left
+
+    def _unary(self):
+        kind = self._peek()
+        if kind is None:
+            raise QueryError("Query ends too early")
+        value = self.tokens[self.position][1]
+        self.position += 1
+        if kind in ('NOT', 'negate'):
+            return _not(self._unary())
+        if kind == 'open':
+            inner = self._or_expression()
+            if self._peek() != 'close':
+                raise QueryError("Missing ')'")
+            self.position += 1
+            return inner
+        if kind == 'term':
+            return _term(*value)
+        if kind in ('word', 'quoted'):
+            return _contains('haystack', value.lower())
+        raise QueryError(f"Unexpected '{value or kind}'")
+
+    def mask(self, table):
+        """One byte per archive, 1 where the archive matches"""
+        if self.predicate is None:
+            return b'\x01' * table.count
+        return self.predicate(table)
+
+    def evaluate(self, table):
+        """Return the indexes of matching archives, in modlist order"""
+        return list(compress(range(table.count), self.mask(table)))
+
+
+class SavedQueries:
+    """Named queries kept in a small JSON file next to the modlist cache"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir(), SAVED_QUERIES_NAME)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.queries = dict(json.load(f))
+        except (OSError, ValueError, TypeError):
+            self.queries = {}
+
+    def names(self):
+        return sorted(self.queries, key=str.casefold)
+
+    def get(self, name):
+        return self.queries.get(name)
+
+    def save(self, name, text):
+        self.queries[name] = text
+        self._write()
+
+    def delete(self, name):
+        if self.queries.pop(name, None) is not None:
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.queries, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.path)
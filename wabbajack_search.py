@@ -0,0 +1,65 @@
+"""Mod list search for Wabbajack Viewer"""
+from array import array
+
+
+def search_fields(archive):
+    """Return the (mod name, author, filename) fields the mod search matches against"""
+    state = archive.get('State', {})
+    filename = archive.get('Name', 'Unknown Mod')
+    return state.get('Name', filename), state.get('Author', 'Unknown'), filename
+
+
+class SearchIndex:
+    """Substring search over archive name, author and filename.
+
+    Haystacks are lowercased once when the index is built, and a trigram index
+    maps every three-character sequence to the archives containing it, so a
+    query only checks archives that have its rarest trigram. A query that
+    extends the previous one only searches the previous results.
+    """
+
+    def __init__(self, archives):
+        self.haystacks = []
+        postings = {}
+        for index, archive in enumerate(archives):
+            # Fields are joined with a newline so matches cannot span two fields
+            haystack = '\n'.join(search_fields(archive)).lower()
+            self.haystacks.append(haystack)
+            for trigram in {haystack[i:i + 3] for i in range(len(haystack) - 2)}:
+                postings.setdefault(trigram, []).append(index)
+
+        self.trigrams = {trigram: array('I', indexes) for trigram, indexes in postings.items()}
+        self._last_query = None
+        self._last_result = None
+
+    def __len__(self):
+        return len(self.haystacks)
+
+    def _candidates(self, query):
+        """Return archive indexes that could contain query, in modlist order"""
+        if self._last_query and self._last_query in query:
+            return self._last_result
+        if len(query) < 3:
+            return range(len(self.haystacks))
+
+        rarest = None
+        for i in range(len(query) - 2):
+            indexes = self.trigrams.get(query[i:i + 3])
+            if indexes is None:
+                return ()
+            if rarest is None or len(indexes) < len(rarest):
+                rarest = indexes
+        return rarest
+
+    def search(self, query):
+        """Return the indexes of archives matching query, in modlist order"""
+        query = query.lower()
+        if not query:
+            result = list(range(len(self.haystacks)))
+        else:
+            haystacks = self.haystacks
+            result = [index for index in self._candidates(query) if query in haystacks[index]]
+
+        self._last_query = query
+        self._last_result = result
+        return result
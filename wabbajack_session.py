@@ -0,0 +1,200 @@
+"""Per-file state of one loaded modlist for Wabbajack Viewer (no GUI dependencies)"""
+from collections import OrderedDict
+
+from wabbajack_cache import load_modlist_cached
+from wabbajack_dedup import DuplicateAnalysis
+from wabbajack_modlist import build_directory_tree, downloader_type
+from wabbajack_preview import WabbajackContents
+from wabbajack_profile import diagnostics
+from wabbajack_query import ArchiveTable, Query, QueryError, is_structured
+from wabbajack_search import SearchIndex
+from wabbajack_sort import SortIndex
+
+# Number of archives whose Files tab directory structure is kept
+DIRECTORY_TREE_CACHE_SIZE = 64
+
+# Number of rendered Overview texts kept
+OVERVIEW_CACHE_SIZE = 256
+
+
+def build_mod_rows(archives, mod_details, download_states=None):
+    """Precompute the mod list row (text, values, tags) for every archive"""
+    rows = []
+    for i, archive in enumerate(archives):
+        download_state = download_states[i] if download_states else ''
+        state = archive.get('State', {})
+        filename = archive.get('Name', 'Unknown Mod')
+        size = archive.get('Size', 0)
+        archive_hash = archive.get('Hash', '')
+
+        # Get mod details
+        mod_author = state.get('Author', 'Unknown')
+        mod_version = state.get('Version', '')
+        actual_mod_name = state.get('Name', filename)
+
+        # Calculate size in MB
+        size_mb = size / (1024 * 1024) if size > 0 else 0
+
+        # Files installed from the archive
+        files = mod_details.get(archive_hash)
+        file_count = len(files) if files is not None else 0
+        installed_mb = files.total_size() / (1024 * 1024) if files is not None else 0
+
+        rows.append((f"{i+1}. {actual_mod_name}",
+                     (mod_author, mod_version, f"{size_mb:.1f}", f"{file_count:,}", f"{installed_mb:.1f}",
+                      downloader_type(archive), download_state.capitalize()),
+                     (archive_hash, download_state) if download_state else (archive_hash,)))
+    return rows
+
+
+class ModlistSession:
+    """Everything derived from one opened .wabbajack file.
+
+    The modlist and its indexes, the mod list rows, the structured query
+    columns, the download verification, the Files/Overview caches, the
+    duplicate content analysis and the handle on the file's embedded
+    members and their previews all live here rather than on the window, so
+    opening another file builds a complete new session off the UI thread
+    and the window swaps it in with a single assignment. ``close()`` then empties the old one, so nothing
+    that still holds it (an open window, a pending callback) can keep a
+    previous modlist's directives alive.
+    """
+
+    def __init__(self, modlist, rows, search_index, sort_index, archive_table):
+        self.modlist = modlist
+        self.rows = rows
+        self.search_index = search_index
+        self.sort_index = sort_index
+        self.archive_table = archive_table
+        self.verification = None
+
+        # Order of all archives for the window's sort keys (None for modlist order),
+        # the last parsed query, and why the last search wasn't a valid query
+        self.sorted_order = None
+        self.query = None
+        self.query_error = None
+
+        # Files tab directory structures per archive hash, and rendered Overview text
+        # per archive index, least recently used first
+        self.directory_trees = OrderedDict()
+        self.overviews = OrderedDict()
+
+        # Embedded files of the .wabbajack, opened on the first preview
+        self.contents = WabbajackContents(modlist.path)
+
+        # Duplicate file content across archives, analysed the first time it is shown
+        self.duplicate_analysis = None
+
+    @classmethod
+    def load(cls, wabbajack_path, cache, progress=None, cancel_event=None):
+        """Load a modlist, through the cache, and build everything the window shows of it"""
+        modlist = load_modlist_cached(wabbajack_path, cache, progress=progress, cancel_event=cancel_event)
+        archives = modlist.archives
+        if progress:
+            progress("Building rows", 0.0)
+        with diagnostics.phase("Build rows", len(archives)):
+            rows = build_mod_rows(archives, modlist.mod_details)
+        if progress:
+            progress("Building search index", 0.0)
+        with diagnostics.phase("Build search index", len(archives)):
+            search_index = SearchIndex(archives)
+        with diagnostics.phase("Build sort keys", len(archives)):
+            sort_index = SortIndex(modlist)
+        with diagnostics.phase("Build query columns", len(archives)):
+            archive_table = ArchiveTable(modlist)
+        if progress:
+            progress("Building search index", 1.0)
+        return cls(modlist, rows, search_index, sort_index, archive_table)
+
+    @property
+    def archives(self):
+        return self.modlist.archives
+
+    @property
+    def mod_details(self):
+        return self.modlist.mod_details
+
+    def apply_verification(self, verification):
+        """Record the download state of every archive in the rows, sort keys and query columns"""
+        self.verification = verification
+        self.rows = build_mod_rows(self.archives, self.mod_details, verification.states)
+        self.sort_index.set_key('download', verification.states)
+        self.archive_table.set_column('download', verification.states)
+
+    def sort(self, sort_keys):
+        """Recompute the order of all archives for [(column, descending)], '#0' being the name"""
+        if sort_keys:
+            self.sorted_order = self.sort_index.order([('name' if column == '#0' else column, descending)
+                                                       for column, descending in sort_keys])
+        else:
+            self.sorted_order = None
+
+    def sorted_mods(self, matches):
+        """Put the archive indexes matching a search in the current sort order"""
+        if self.sorted_order is None:
+            return matches
+        return self.sort_index.restrict(self.sorted_order, matches)
+
+    def search(self, text):
+        """Archive indexes matching the search box, in modlist order.
+
+        Plain text uses the substring search index; anything with fields,
+        operators or quotes is parsed as a query, once per distinct text.
+        Text that fails to parse is searched as plain text, with the reason
+        kept in ``query_error``.
+        """
+        self.query_error = None
+        if not is_structured(text):
+            return self.search_index.search(text)
+        if self.query is None or self.query.text != text:
+            try:
+                self.query = Query(text)
+            except QueryError as e:
+                self.query_error = str(e)
+                return self.search_index.search(text)
+        return self.query.evaluate(self.archive_table)
+
+    def directory_tree(self, archive_hash):
+        """Return the directory structure of an archive, built once and then cached"""
+        tree = self.directory_trees.pop(archive_hash, None)
+        if tree is None:
+            with diagnostics.phase("Build directory tree", len(self.mod_details[archive_hash])):
+                tree = build_directory_tree(self.mod_details[archive_hash])
+        # Most recently used entries live at the end
+        self.directory_trees[archive_hash] = tree
+        while len(self.directory_trees) > DIRECTORY_TREE_CACHE_SIZE:
+            self.directory_trees.popitem(last=False)
+        return tree
+
+    def overview(self, archive_index):
+        """Return the Overview view model for an archive, from the LRU cache when possible"""
+        overview = self.overviews.pop(archive_index, None)
+        if overview is None:
+            overview = self.modlist.overview(archive_index)
+        self.overviews[archive_index] = overview
+        while len(self.overviews) > OVERVIEW_CACHE_SIZE:
+            self.overviews.popitem(last=False)
+        return overview
+
+    def duplicates(self):
+        """Return the duplicate content analysis, built once and then kept"""
+        if self.duplicate_analysis is None:
+            with diagnostics.phase("Find duplicate files", len(self.mod_details)):
+                self.duplicate_analysis = DuplicateAnalysis(self.modlist)
+        return self.duplicate_analysis
+
+    def close(self):
+        """Drop everything this session holds so its memory is freed even if the session object lingers"""
+        self.directory_trees.clear()
+        self.overviews.clear()
+        self.contents.close()
+        self.duplicate_analysis = None
+        self.modlist = None
+        self.rows = []
+        self.search_index = SearchIndex([])
+        self.sort_index = SortIndex()
+        self.archive_table = ArchiveTable()
+        self.verification = None
+        self.sorted_order = None
+        self.query = None
+        self.query_error = None
@@ -0,0 +1,94 @@
+"""Mod list sorting for Wabbajack Viewer"""
+import re
+from array import array
+
+from wabbajack_modlist import downloader_type
+
+# Sort keys of the mod list, in heading order
+SORT_KEYS = ('name', 'author', 'version', 'size', 'files', 'installed', 'source', 'download')
+
+# Number of sort keys kept: the one clicked last, then the ones before it as tie breakers
+MAX_SORT_KEYS = 3
+
+_VERSION_PARTS = re.compile(r'(\d+)')
+
+
+def version_key(version):
+    """Natural sort key for a version string, so '1.10' sorts after '1.9'"""
+    return [(int(part), '') if part.isdigit() else (-1, part)
+            for part in _VERSION_PARTS.split(version.lower()) if part]
+
+
+def archive_sort_values(modlist):
+    """Return {sort key: per-archive values} for everything the mod list sorts by"""
+    store = modlist.mod_details
+    values = {key: [] for key in SORT_KEYS}
+    for archive in modlist.archives:
+        state = archive.get('State', {})
+        filename = archive.get('Name', 'Unknown Mod')
+        files = store.get(archive.get('Hash', ''))
+        values['name'].append(state.get('Name', filename).casefold())
+        values['author'].append(state.get('Author', 'Unknown').casefold())
+        values['version'].append(version_key(state.get('Version', '')))
+        values['size'].append(archive.get('Size', 0))
+        values['files'].append(len(files) if files is not None else 0)
+        values['installed'].append(files.total_size() if files is not None else 0)
+        values['source'].append(downloader_type(archive).casefold())
+        values['download'].append('')
+    return values
+
+
+class SortIndex:
+    """Precomputed orderings of the archives for every sort key.
+
+    For each key, ``orders[key]`` is the ascending permutation of archive
+    indexes and ``ranks[key]`` the dense rank of every archive, so sorting
+    by several keys or sorting a filtered subset only compares small ints.
+    """
+
+    def __init__(self, modlist=None):
+        self.orders = {}
+        self.ranks = {}
+        self.count = 0
+        if modlist is not None:
+            for key, values in archive_sort_values(modlist).items():
+                self.set_key(key, values)
+
+    def set_key(self, key, values):
+        """Precompute the ordering for one key from its per-archive values"""
+        order = sorted(range(len(values)), key=values.__getitem__)
+        ranks = array('I', bytes(4 * len(values)))
+        rank = 0
+        for position in range(1, len(order)):
+            if values[order[position]] != values[order[position - 1]]:
+                rank += 1
+            ranks[order[position]] = rank
+        self.orders[key] = array('I', order)
+        self.ranks[key] = ranks
+        self.count = len(values)
+
+    def order(self, sort_keys):
+        """Return every archive index sorted by [(key, descending), ...], primary key first.
+
+        Ties left by all keys keep modlist order.
+        """
+        if not sort_keys:
+            return array('I', range(self.count))
+        # The last tie breaker is applied first, then each more significant key re-sorts stably
+        key, descending = sort_keys[-1]
+        if descending:
+            order = sorted(range(self.count), key=self.ranks[key].__getitem__, reverse=True)
+        else:
+            order = list(self.orders[key])
+        for key, descending in sort_keys[-2::-1]:
+            order.sort(key=self.ranks[key].__getitem__, reverse=descending)
+        return array('I', order)
+
+    def restrict(self, order, indexes):
+        """Keep only the archive indexes in indexes, in the order given by order"""
+        if len(indexes) == self.count:
+            return list(order)
+        member = bytearray(self.count)
+        for index in indexes:
+            member[index] = 1
+        return [index for index in order if member[index]]
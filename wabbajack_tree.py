@@ -0,0 +1,147 @@
+"""Whole-modlist install tree for Wabbajack Viewer"""
+import heapq
+from array import array
+from collections import Counter
+from itertools import accumulate
+
+# Placeholder for store directories not mapped to a tree node yet
+_UNMAPPED = 0xFFFFFFFF
+
+
+class InstallTree:
+    """Every target directory of a modlist as a prefix tree held in arrays.
+
+    Node 0 is the install root and every other node is one directory, with
+    ``node_parent`` and ``node_depth`` describing the tree and ``names``
+    giving each node's own name. ``node_file_count`` and
+    ``node_total_size`` total every directive installing into the node or
+    below it. ``child_offsets``/``children`` and ``file_offsets``/
+    ``file_rows`` list each node's subdirectories (by name) and its own
+    DirectiveStore rows as CSR slices, so a directory is expanded by
+    slicing instead of walking nested dicts. Directory names are matched
+    case-insensitively, as Windows installs them.
+    """
+
+    COLUMNS = ('node_parent', 'node_depth', 'node_file_count', 'node_total_size', 'child_offsets', 'children',
+               'file_offsets', 'file_rows')
+
+    def __init__(self, store, names, node_parent, node_depth, node_file_count, node_total_size, child_offsets,
+                 children, file_offsets, file_rows):
+        self.store = store
+        self.names = names
+        self.node_parent = node_parent
+        self.node_depth = node_depth
+        self.node_file_count = node_file_count
+        self.node_total_size = node_total_size
+        self.child_offsets = child_offsets
+        self.children = children
+        self.file_offsets = file_offsets
+        self.file_rows = file_rows
+
+    @classmethod
+    def build(cls, store):
+        """Build the tree of a finalized store's target directories"""
+        names = ['']
+        parents = array('I', [0])
+        depths = array('H', [0])
+
+        # Map each distinct target directory to its node. Directories are looked up by
+        # lowercased path, so only the missing tail of a path is ever walked
+        node_by_path = {'': 0}
+        node_of_dir = array('I', [_UNMAPPED]) * len(store.dirs)
+        for dir_id in set(store.to_dir):
+            path = store.dirs[dir_id].replace('/', '\\')
+            if path.endswith('\\'):
+                path = path[:-1]
+            key = path.lower()
+            missing = []
+            while key not in node_by_path:
+                cut = path.rfind('\\')
+                missing.append((key, path[cut + 1:]))
+                path = path[:cut] if cut >= 0 else ''
+                key = path.lower()
+            node = node_by_path[key]
+            for key, name in reversed(missing):
+                child = node_by_path[key] = len(names)
+                names.append(name)
+                parents.append(node)
+                depths.append(depths[node] + 1)
+                node = child
+            node_of_dir[dir_id] = node
+        del node_by_path
+
+        node_count = len(names)
+        row_nodes = array('I', map(node_of_dir.__getitem__, store.to_dir))
+
+        # Direct totals per node, then each node's own rows as one slice (stable, so in store order)
+        file_count = cls._counts(row_nodes, node_count)
+        total_size = array('q', bytes(8 * node_count))
+        for node, size in zip(row_nodes, store.size):
+            total_size[node] += size
+        file_rows = array('I', sorted(range(len(row_nodes)), key=row_nodes.__getitem__))
+        file_offsets = cls._offsets(file_count)
+
+        # Children by parent, then name: two stable sorts on precomputed keys
+        lower_names = [name.lower() for name in names]
+        children = sorted(range(1, node_count), key=lower_names.__getitem__)
+        children = array('I', sorted(children, key=parents.__getitem__))
+        child_offsets = cls._offsets(cls._counts(parents[1:], node_count))
+
+        # Roll direct totals up into every ancestor; a child always has a higher id than its parent
+        for node in range(node_count - 1, 0, -1):
+            parent = parents[node]
+            file_count[parent] += file_count[node]
+            total_size[parent] += total_size[node]
+
+        return cls(store, names, parents, depths, file_count, total_size, child_offsets, children, file_offsets,
+                   file_rows)
+
+    @staticmethod
+    def _offsets(counts):
+        """CSR offsets: where each node's slice starts, plus the total"""
+        offsets = array('I', [0])
+        offsets.extend(accumulate(counts))
+        return offsets
+
+    @staticmethod
+    def _counts(values, length):
+        """Occurrences of each value in range(length)"""
+        counts = array('Q', bytes(8 * length))
+        for value, count in Counter(values).items():
+            counts[value] = count
+        return counts
+
+    def __len__(self):
+        return len(self.names)
+
+    def node_children(self, node):
+        """Subdirectory nodes of a node, by name"""
+        return self.children[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def node_files(self, node):
+        """DirectiveStore rows installed directly into a node"""
+        return self.file_rows[self.file_offsets[node]:self.file_offsets[node + 1]]
+
+    def path(self, node):
+        """Full directory path of a node, '' for the root"""
+        parts = []
+        while node:
+            parts.append(self.names[node])
+            node = self.node_parent[node]
+        return '\\'.join(reversed(parts))
+
+    def ancestors(self, node):
+        """Nodes from the root's child down to node"""
+        path = []
+        while node:
+            path.append(node)
+            node = self.node_parent[node]
+        return path[::-1]
+
+    def largest(self, count, depth=None):
+        """The count directories with the most bytes below them, optionally only at one depth"""
+        nodes = range(1, len(self.names))
+        if depth is not None:
+            node_depth = self.node_depth
+            nodes = [node for node in nodes if node_depth[node] == depth]
+        return heapq.nlargest(count, nodes, key=self.node_total_size.__getitem__)
@@ -0,0 +1,356 @@
+"""Verification of a downloads folder against a modlist's archives for Wabbajack Viewer"""
+import json
+import mmap
+import os
+import struct
+
+from wabbajack_cache import default_cache_dir
+from wabbajack_modlist import LoadCancelled, decode_hash
+
+try:
+    # A listed requirement; the ~100x slower pure Python fallback below is a last resort
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Download states of an archive
+PRESENT = 'present'
+MISSING = 'missing'
+MISMATCHED = 'mismatched'
+DOWNLOAD_STATES = (PRESENT, MISSING, MISMATCHED)
+
+# How often hashing in a process pool checks for a cancel
+CANCEL_POLL_SECONDS = 0.2
+
+HASH_CACHE_NAME = 'download_hashes.json'
+HASH_CACHE_VERSION = 1
+
+# Bytes of a memory-mapped download hashed per step
+HASH_CHUNK_SIZE = 16 * 1024 * 1024
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_PRIME1 = 11400714785074694791
+_PRIME2 = 14029467366897019727
+_PRIME3 = 1609587929392839161
+_PRIME4 = 9650029242287828579
+_PRIME5 = 2870177450012600261
+_STRIPES = struct.Struct('<4Q')
+
+
+def _round(acc, lane):
+    acc = (acc + lane * _PRIME2) & _MASK
+    return (((acc << 31) | (acc >> 33)) & _MASK) * _PRIME1 & _MASK
+
+
+def _merge_round(acc, value):
+    return ((acc ^ _round(0, value)) * _PRIME1 + _PRIME4) & _MASK
+
+
+class XXHash64:
+    """Streaming xxHash64 in pure Python, used when the xxhash package is not installed"""
+
+    def __init__(self, seed=0):
+        self.v1 = (seed + _PRIME1 + _PRIME2) & _MASK
+        self.v2 = (seed + _PRIME2) & _MASK
+        self.v3 = seed
+        self.v4 = (seed - _PRIME1) & _MASK
+        self.seed = seed
+        self.total = 0
+        self.buffer = b''
+
+    def update(self, data):
+        data = memoryview(data).cast('B')
+        self.total += len(data)
+        if self.buffer:
+            needed = 32 - len(self.buffer)
+            self.buffer += bytes(data[:needed])
+            data = data[needed:]
+            if len(self.buffer) < 32:
+                return
+            self._stripes(self.buffer)
+            self.buffer = b''
+        whole = len(data) - len(data) % 32
+        if whole:
+            self._stripes(data[:whole])
+        self.buffer = bytes(data[whole:])
+
+    def _stripes(self, data):
+        v1, v2, v3, v4 = self.v1, self.v2, self.v3, self.v4
+        # _round inlined, this loop is where all the time goes
+        for a, b, c, d in _STRIPES.iter_unpack(data):
+            v1 = (v1 + a * _PRIME2) & _MASK
+            v1 = (((v1 << 31) | (v1 >> 33)) & _MASK) * _PRIME1 & _MASK
+            v2 = (v2 + b * _PRIME2) & _MASK
+            v2 = (((v2 << 31) | (v2 >> 33)) & _MASK) * _PRIME1 & _MASK
+            v3 = (v3 + c * _PRIME2) & _MASK
+            v3 = (((v3 << 31) | (v3 >> 33)) & _MASK) * _PRIME1 & _MASK
+            v4 = (v4 + d * _PRIME2) & _MASK
+            v4 = (((v4 << 31) | (v4 >> 33)) & _MASK) * _PRIME1 & _MASK
+        self.v1, self.v2, self.v3, self.v4 = v1, v2, v3, v4
+
+    def intdigest(self):
+        if self.total >= 32:
+            v1, v2, v3, v4 = self.v1, self.v2, self.v3, self.v4
+            h = (((v1 << 1) | (v1 >> 63)) + ((v2 << 7) | (v2 >> 57)) +
+                 ((v3 << 12) | (v3 >> 52)) + ((v4 << 18) | (v4 >> 46))) & _MASK
+            for v in (v1, v2, v3, v4):
+                h = _merge_round(h, v)
+        else:
+            h = (self.seed + _PRIME5) & _MASK
+        h = (h + self.total) & _MASK
+
+        tail = self.buffer
+        position = 0
+        while position + 8 <= len(tail):
+            h ^= _round(0, int.from_bytes(tail[position:position + 8], 'little'))
+            h = ((((h << 27) | (h >> 37)) & _MASK) * _PRIME1 + _PRIME4) & _MASK
+            position += 8
+        if position + 4 <= len(tail):
+            h ^= int.from_bytes(tail[position:position + 4], 'little') * _PRIME1 & _MASK
+            h = ((((h << 23) | (h >> 41)) & _MASK) * _PRIME2 + _PRIME3) & _MASK
+            position += 4
+        for byte in tail[position:]:
+            h ^= byte * _PRIME5 & _MASK
+            h = (((h << 11) | (h >> 53)) & _MASK) * _PRIME1 & _MASK
+
+        h ^= h >> 33
+        h = h * _PRIME2 & _MASK
+        h ^= h >> 29
+        h = h * _PRIME3 & _MASK
+        h ^= h >> 32
+        return h
+
+
+def new_hasher():
+    return xxhash.xxh64() if xxhash is not None else XXHash64()
+
+
+def hash_file(path):
+    """xxHash64 of a file's contents as an unsigned int, read through a memory map"""
+    hasher = new_hasher()
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return hasher.intdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(view), HASH_CHUNK_SIZE):
+                    hasher.update(view[start:start + HASH_CHUNK_SIZE])
+            finally:
+                view.release()
+    return hasher.intdigest()
+
+
+def _hash_worker(path):
+    """Pool task: hash one file, or None if it can't be read"""
+    try:
+        return path, hash_file(path)
+    except (OSError, ValueError):
+        return path, None
+
+
+class HashCache:
+    """Persistent xxHash64 of downloaded files, keyed by path, size and mtime.
+
+    A file is only hashed again when its size or modification time changes,
+    so rescanning a downloads folder costs one stat per file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(default_cache_dir(), HASH_CACHE_NAME)
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == HASH_CACHE_VERSION:
+                self.entries = data['files']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, path, size, mtime_ns):
+        """Return the cached hash of a file, or None if it is unknown or changed"""
+        entry = self.entries.get(path)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def put(self, path, size, mtime_ns, file_hash):
+        self.entries[path] = [size, mtime_ns, file_hash]
+        self.dirty = True
+
+    def prune(self, folder, paths):
+        """Forget files under folder that were not seen in the latest scan of it"""
+        prefix = os.path.join(folder, '')
+        for path in [path for path in self.entries if path.startswith(prefix) and path not in paths]:
+            del self.entries[path]
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': HASH_CACHE_VERSION, 'files': self.entries}, f)
+            os.replace(temp_path, self.path)
+            self.dirty = False
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def scan_folder(folder):
+    """Return (path, size, mtime_ns) for every file under folder"""
+    files = []
+    for dirpath, _, filenames in os.walk(folder):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((os.path.abspath(path), stat.st_size, stat.st_mtime_ns))
+    return files
+
+
+class DownloadVerification:
+    """Download state of every archive of a modlist, in archive order.
+
+    ``states[i]`` is PRESENT when a file with the archive's size and
+    xxHash64 was found, MISMATCHED when a file with the archive's name
+    exists but differs, and MISSING otherwise; ``paths[i]`` is the
+    matching (or mismatching) file, or None.
+    """
+
+    def __init__(self, folder, states, paths, hashed_files, hashed_bytes):
+        self.folder = folder
+        self.states = states
+        self.paths = paths
+        self.hashed_files = hashed_files
+        self.hashed_bytes = hashed_bytes
+
+    def counts(self):
+        counts = dict.fromkeys(DOWNLOAD_STATES, 0)
+        for state in self.states:
+            counts[state] += 1
+        return counts
+
+    def summary(self):
+        counts = self.counts()
+        return ', '.join(f"{counts[state]} {state}" for state in DOWNLOAD_STATES)
+
+
+def verify_downloads(archives, folder, hash_cache=None, jobs=None, progress=None, cancel_event=None):
+    """Match a downloads folder against archives by size, then by xxHash64.
+
+    Only files whose size equals some archive's size are hashed, in a
+    process pool, and hashes already in ``hash_cache`` are reused.
+    ``progress`` is called with (stage, fraction) and ``cancel_event``
+    stops the scan with LoadCancelled.
+    """
+    folder = os.path.abspath(folder)
+    if progress:
+        progress("Scanning downloads", 0.0)
+    files = scan_folder(folder)
+    sizes = {path: size for path, size, _ in files}
+    if hash_cache is not None:
+        hash_cache.prune(folder, sizes)
+
+    wanted_sizes = {archive.get('Size', 0) for archive in archives if archive.get('Hash')}
+    by_name = {}
+    for path, size in sizes.items():
+        by_name.setdefault(os.path.basename(path).lower(), []).append((path, size))
+
+    # Size first: a file can only be a download if some archive has its exact size
+    file_hashes = {}
+    to_hash = []
+    for path, size, mtime_ns in files:
+        if size not in wanted_sizes:
+            continue
+        cached = hash_cache.get(path, size, mtime_ns) if hash_cache is not None else None
+        if cached is not None:
+            file_hashes[path] = cached
+        else:
+            to_hash.append((path, size, mtime_ns))
+
+    hashed_bytes = sum(size for _, size, _ in to_hash)
+    done_bytes = 0
+    mtimes = {path: mtime_ns for path, _, mtime_ns in to_hash}
+
+    def record(path, file_hash):
+        nonlocal done_bytes
+        done_bytes += sizes[path]
+        if file_hash is not None:
+            file_hashes[path] = file_hash
+            if hash_cache is not None:
+                hash_cache.put(path, sizes[path], mtimes[path], file_hash)
+        if progress:
+            progress("Hashing downloads", done_bytes / (hashed_bytes or 1))
+
+    try:
+        if jobs == 1 or len(to_hash) <= 1:
+            for path, _, _ in to_hash:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise LoadCancelled()
+                record(*_hash_worker(path))
+        elif to_hash:
+            # Imported only when needed, as multiprocessing slows down starting the viewer
+            from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+            pool = ProcessPoolExecutor(max_workers=jobs)
+            cancelled = False
+            try:
+                # Largest first, so one huge archive doesn't finish last on its own
+                pending = {pool.submit(_hash_worker, path)
+                           for path, _, _ in sorted(to_hash, key=lambda item: item[1], reverse=True)}
+                while pending:
+                    # Wake up regularly so a cancel doesn't wait for a large file to finish hashing
+                    done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                    if cancel_event is not None and cancel_event.is_set():
+                        cancelled = True
+                        raise LoadCancelled()
+                    for future in done:
+                        record(*future.result())
+            finally:
+                # On cancel, drop the queued files and return without waiting for the ones
+                # being hashed, instead of blocking until the whole pool drains
+                pool.shutdown(wait=not cancelled, cancel_futures=True)
+    finally:
+        # Hashes computed before a cancel are kept for the next scan
+        if hash_cache is not None:
+            try:
+                hash_cache.save()
+            except OSError:
+                pass
+
+    paths_by_hash = {}
+    for path, file_hash in file_hashes.items():
+        paths_by_hash.setdefault(file_hash, path)
+
+    states = []
+    paths = []
+    for archive in archives:
+        size = archive.get('Size', 0)
+        expected = decode_hash(archive.get('Hash'))
+        path = paths_by_hash.get(expected) if expected else None
+        named = by_name.get(archive.get('Name', '').lower(), [])
+        if not expected:
+            # Without a hash, a file with the archive's name and size is the best match there is
+            path = next((path for path, named_size in named if named_size == size), None)
+        if path is not None and sizes[path] == size:
+            states.append(PRESENT)
+            paths.append(path)
+        elif named:
+            states.append(MISMATCHED)
+            paths.append(named[0][0])
+        else:
+            states.append(MISSING)
+            paths.append(None)
+
+    if progress:
+        progress("Hashing downloads", 1.0)
+    return DownloadVerification(folder, states, paths, len(to_hash), hashed_bytes)
@@ -1,14 +1,1117 @@
-import json
+import argparse
+import base64
+import heapq
 import os
+import sys
+import time
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, filedialog
+from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
 from datetime import datetime
-import webbrowser
+import threading
+import queue
 import zipfile
-import tempfile
 
-class WabbajackGuideApp:
+from wabbajack_modlist import LoadCancelled, ModlistNotFoundError
+from wabbajack_cache import ModlistCache, load_modlist_cached
+from wabbajack_query import Query, QueryError, SavedQueries, is_structured
+from wabbajack_session import ModlistSession
+from wabbajack_sort import MAX_SORT_KEYS
+from wabbajack_diff import ModlistDiff
+from wabbajack_preview import PREVIEW_HEX_BYTES, PREVIEW_TEXT_BYTES, embedded_files
+from wabbajack_profile import PROFILE_ENV_VAR, diagnostics, format_peak, format_seconds, start_session_profile
+from wabbajack_verify import DOWNLOAD_STATES, MISMATCHED, MISSING, PRESENT, HashCache, verify_downloads
+
+# How often the UI checks for progress from the load worker
+LOAD_POLL_INTERVAL_MS = 50
+
+# Rows whose detail views are prefetched each side of the selection
+PREFETCH_ROWS = 3
+
+# Extra rows materialized below the visible part of a virtual list
+LIST_OVERSCAN = 2
+
+# Row and heading heights used until a virtual list has been drawn once
+DEFAULT_ROW_HEIGHT = 20
+DEFAULT_HEADING_HEIGHT = 25
+
+# Delay after the last keystroke before the search is applied
+SEARCH_DEBOUNCE_MS = 150
+
+# Shown under the search box
+SEARCH_HELP = ("Plain text matches mod name, author and file name. Query fields with e.g. "
+               "author:arthmoor size>500MB type:nexus game:skyrimspecialedition files>1000, "
+               "combined with OR, NOT (or -) and parentheses.")
+
+# (column id, heading, width, minwidth) of the mod list; the ids double as
+# sort keys, with '#0' sorting by mod name
+MOD_LIST_COLUMNS = [
+    ('#0', 'Mod Name', 400, 300),
+    ('author', 'Author', 150, 100),
+    ('version', 'Version', 100, 80),
+    ('size', 'Size (MB)', 100, 80),
+    ('files', 'Files', 80, 60),
+    ('installed', 'Installed (MB)', 100, 80),
+    ('source', 'Source', 90, 70),
+    ('download', 'Download', 90, 80),
+]
+
+# Mod list text colour per download state, once a downloads folder is verified
+DOWNLOAD_STATE_COLORS = {
+    PRESENT: 'dark green',
+    MISSING: 'red',
+    MISMATCHED: 'dark orange',
+}
+
+# Columns of the archive and file lists in the compare window
+DIFF_ARCHIVE_COLUMNS = [
+    ('#0', 'Change', 100, 80),
+    ('name', 'Mod Name', 350, 200),
+    ('old_version', 'Old Version', 100, 80),
+    ('new_version', 'New Version', 100, 80),
+    ('details', 'Details', 300, 150),
+]
+DIFF_FILE_COLUMNS = [
+    ('#0', 'Change', 100, 80),
+    ('path', 'Target Path', 450, 200),
+    ('archive', 'Archive', 250, 150),
+    ('details', 'Details', 250, 150),
+]
+
+# Columns of the Statistics tabs
+STATS_COLUMNS = [
+    ('#0', 'Name', 400, 200),
+    ('files', 'Files', 100, 80),
+    ('size', 'Size (MB)', 100, 80),
+    ('share', 'Share of Size', 100, 80),
+]
+
+# Columns of the whole-modlist install tree and its largest directories list
+INSTALL_TREE_COLUMNS = [
+    ('#0', 'Path', 400, 250),
+    ('files', 'Files', 100, 80),
+    ('size', 'Size (MB)', 100, 80),
+    ('share', 'Share of Size', 100, 80),
+    ('archive', 'Archive', 250, 150),
+]
+LARGEST_DIRECTORIES_COLUMNS = [
+    ('#0', 'Directory', 450, 250),
+    ('files', 'Files', 100, 80),
+    ('size', 'Size (MB)', 100, 80),
+    ('share', 'Share of Size', 100, 80),
+]
+
+# Directories in the largest directories list, and files listed per opened directory (largest first)
+LARGEST_DIRECTORIES = 500
+INSTALL_TREE_FILES_SHOWN = 1000
+
+# Columns of the Diagnostics phase list
+DIAGNOSTICS_COLUMNS = [
+    ('#0', 'Phase', 250, 150),
+    ('time', 'Time', 100, 80),
+    ('items', 'Items', 100, 80),
+    ('memory', 'Peak', 100, 80),
+]
+
+# Columns of the Find File results
+PATH_SEARCH_COLUMNS = [
+    ('#0', 'Target Path', 500, 250),
+    ('archive', 'Archive', 300, 150),
+    ('size', 'Size (bytes)', 100, 80),
+]
+
+# Columns of the embedded files list
+EMBEDDED_FILES_COLUMNS = [
+    ('#0', 'File', 350, 200),
+    ('role', 'Used As', 120, 80),
+    ('size', 'Size (bytes)', 100, 80),
+]
+
+# Columns of the duplicates window: repeated files, the copies of the selected one and
+# the archives sharing files. The ids double as sort keys
+DUPLICATE_GROUP_COLUMNS = [
+    ('#0', 'File', 450, 250),
+    ('copies', 'Copies', 70, 60),
+    ('size', 'Size (MB)', 90, 70),
+    ('wasted', 'Wasted (MB)', 100, 80),
+    ('archives', 'Archives', 80, 60),
+]
+DUPLICATE_COPY_COLUMNS = [
+    ('#0', 'Target Path', 500, 250),
+    ('archive', 'Archive', 300, 150),
+]
+ARCHIVE_OVERLAP_COLUMNS = [
+    ('#0', 'Archive', 320, 200),
+    ('other', 'Overlaps With', 320, 200),
+    ('files', 'Shared Files', 100, 80),
+    ('size', 'Shared (MB)', 100, 80),
+]
+
+# Largest image shown in the embedded file preview; bigger ones are scaled down
+PREVIEW_IMAGE_WIDTH = 640
+PREVIEW_IMAGE_HEIGHT = 480
+
+
+def load_worker(wabbajack_path, cache, load_queue, cancel_event):
+    """Load a modlist session off the UI thread, posting it to load_queue"""
+    def progress(stage, fraction):
+        load_queue.put(('progress', stage, fraction))
+    
+    try:
+        with diagnostics.profile_thread():
+            session = ModlistSession.load(wabbajack_path, cache, progress=progress, cancel_event=cancel_event)
+        load_queue.put(('done', session))
+    except LoadCancelled:
+        pass
+    except ModlistNotFoundError as e:
+        load_queue.put(('error', str(e)))
+    except Exception as e:
+        load_queue.put(('error', f"Failed to load Wabbajack file: {e}"))
+
+
+def diff_worker(old_path, new_modlist, cache, load_queue, cancel_event):
+    """Load an older version of a modlist and compare it against new_modlist off the UI thread"""
+    def progress(stage, fraction):
+        load_queue.put(('progress', stage, fraction))
+    
+    try:
+        with diagnostics.profile_thread():
+            old_modlist = load_modlist_cached(old_path, cache, progress=progress, cancel_event=cancel_event)
+            progress("Comparing", 0.0)
+            with diagnostics.phase("Compare modlists") as phase:
+                diff = ModlistDiff(old_modlist, new_modlist)
+                phase['items'] = len(diff.archives) + len(diff.files)
+            progress("Comparing", 1.0)
+        load_queue.put(('done', diff))
+    except LoadCancelled:
+        pass
+    except ModlistNotFoundError as e:
+        load_queue.put(('error', str(e)))
+    except Exception as e:
+        load_queue.put(('error', f"Failed to compare modlists: {e}"))
+
+def verify_worker(archives, folder, load_queue, cancel_event):
+    """Check a downloads folder against the archives off the UI thread"""
+    def progress(stage, fraction):
+        load_queue.put(('progress', stage, fraction))
+    
+    try:
+        with diagnostics.profile_thread():
+            with diagnostics.phase("Verify downloads") as phase:
+                verification = verify_downloads(archives, folder, HashCache(), progress=progress,
+                                                cancel_event=cancel_event)
+                phase['items'] = verification.hashed_files
+        load_queue.put(('done', verification))
+    except LoadCancelled:
+        pass
+    except Exception as e:
+        load_queue.put(('error', f"Failed to verify downloads: {e}"))
+
+
+def duplicates_worker(session, load_queue, cancel_event):
+    """Group the session's files by content hash off the UI thread"""
+    try:
+        load_queue.put(('progress', "Finding duplicate files", 0.0))
+        with diagnostics.profile_thread():
+            analysis = session.duplicates()
+        load_queue.put(('done', analysis))
+    except Exception as e:
+        load_queue.put(('error', f"Failed to find duplicate files: {e}"))
+
+
+class VirtualList:
+    """Treeview list that only materializes the rows currently in view.
+    
+    A fixed pool of Treeview items (the rows that fit in the widget plus a
+    small overscan) is refilled from the row data as the list scrolls, so the
+    number of rows does not affect populating, scrolling or filtering.
+    ``columns`` is a list of (column id, heading, width, minwidth) with '#0'
+    first, ``rows`` a sequence of (text, values, tags), ``order`` the row
+    indexes being shown, in display order, and ``on_select`` is called with
+    the row index the user picks. With ``on_sort``, clicking a heading calls
+    it with the column id.
+    """
+    
+    def __init__(self, parent, columns, on_select=None, on_sort=None):
+        self.on_select = on_select
+        self.headings = {column[0]: column[1] for column in columns}
+        self.rows = []
+        self.order = []
+        self.top = 0
+        self.selected = None
+        self.slots = []
+        self.row_height = DEFAULT_ROW_HEIGHT
+        self.heading_height = DEFAULT_HEADING_HEIGHT
+        self.blank_values = ('',) * (len(columns) - 1)
+        
+        self.tree = ttk.Treeview(parent, columns=[column[0] for column in columns[1:]],
+                                 show='tree headings', selectmode='browse')
+        for column, heading, width, minwidth in columns:
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width, minwidth=minwidth)
+            if on_sort:
+                self.tree.heading(column, command=lambda column=column: on_sort(column))
+        
+        # The scrollbar drives the window into the rows, not the Treeview itself
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        
+        self.tree.bind('<Configure>', self.resize)
+        self.tree.bind('<<TreeviewSelect>>', self.on_tree_select)
+        self.tree.bind('<MouseWheel>', self.on_mouse_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<Up>', lambda e: self.move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self.move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self.move_selection(-self.visible_count()))
+        self.tree.bind('<Next>', lambda e: self.move_selection(self.visible_count()))
+        self.tree.bind('<Home>', lambda e: self.move_selection(-len(self.order)))
+        self.tree.bind('<End>', lambda e: self.move_selection(len(self.order)))
+    
+    def grid(self, row, column):
+        self.tree.grid(row=row, column=column, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=row, column=column + 1, sticky=(tk.N, tk.S))
+    
+    def set_rows(self, rows):
+        """Show a new set of (text, values, tags) rows"""
+        self.rows = rows
+        self.order = list(range(len(rows)))
+        self.top = 0
+        self.selected = None
+        self.render()
+    
+    def show_sort(self, column, descending):
+        """Mark the heading the list is sorted by with an arrow"""
+        for heading_column, heading in self.headings.items():
+            if heading_column == column:
+                heading = f"{heading} {'▼' if descending else '▲'}"
+            self.tree.heading(heading_column, text=heading)
+    
+    def update_rows(self, rows):
+        """Replace the row data, keeping the order, scroll position and selection"""
+        self.rows = rows
+        self.render()
+    
+    def set_order(self, order):
+        """Show only the given row indexes, in the given order"""
+        self.order = order
+        self.top = 0
+        self.render()
+    
+    def visible_count(self):
+        """Number of rows that fit in the widget"""
+        return max(1, (self.tree.winfo_height() - self.heading_height) // self.row_height)
+    
+    def resize(self, event=None):
+        """Grow or shrink the item pool to fit the widget, then redraw"""
+        needed = self.visible_count() + LIST_OVERSCAN
+        while len(self.slots) < needed:
+            self.slots.append(self.tree.insert('', 'end', text='', values=self.blank_values))
+        if len(self.slots) > needed:
+            self.tree.delete(*self.slots[needed:])
+            del self.slots[needed:]
+        self.render()
+    
+    def render(self):
+        """Fill the item pool with the rows starting at the current scroll position"""
+        self.top = max(0, min(self.top, len(self.order) - self.visible_count()))
+        
+        selected_slot = None
+        for slot, item in enumerate(self.slots):
+            position = self.top + slot
+            if position < len(self.order):
+                index = self.order[position]
+                text, values, tags = self.rows[index]
+                self.tree.item(item, text=text, values=values, tags=tags)
+                if index == self.selected:
+                    selected_slot = item
+            else:
+                self.tree.item(item, text='', values=self.blank_values, tags=())
+        
+        # Keep the pool pinned to the top; scrolling is done by refilling it
+        self.tree.yview_moveto(0)
+        
+        # Only touch the selection if it changed, as that fires <<TreeviewSelect>>
+        current = self.tree.selection()
+        if selected_slot is None and current:
+            self.tree.selection_remove(*current)
+        elif selected_slot is not None and current != (selected_slot,):
+            self.tree.selection_set(selected_slot)
+        
+        if self.order:
+            first = self.top / len(self.order)
+            last = min(1.0, (self.top + self.visible_count()) / len(self.order))
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        
+        self.measure_rows()
+    
+    def measure_rows(self):
+        """Pick up the real row and heading heights once the rows are drawn"""
+        bbox = self.tree.bbox(self.slots[0]) if self.slots else ''
+        if bbox and (bbox[3] != self.row_height or bbox[1] != self.heading_height):
+            self.row_height = bbox[3]
+            self.heading_height = bbox[1]
+            self.tree.after_idle(self.resize)
+    
+    def yview(self, *args):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.order))
+            self.render()
+        elif args[0] == 'scroll':
+            step = self.visible_count() if args[2] == 'pages' else 1
+            self.scroll(int(args[1]) * step)
+    
+    def scroll(self, rows):
+        self.top += rows
+        self.render()
+        return 'break'
+    
+    def on_mouse_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS reports small deltas
+        delta = event.delta // 120 if abs(event.delta) >= 120 else event.delta
+        return self.scroll(-3 * delta)
+    
+    def on_tree_select(self, event):
+        """Map a clicked slot back to the row it currently shows"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self.slots:
+            return
+        position = self.top + self.slots.index(selection[0])
+        if position >= len(self.order):
+            return
+        index = self.order[position]
+        # Selections made by render() itself map back to the current row
+        if index != self.selected:
+            self.selected = index
+            if self.on_select:
+                self.on_select(index)
+    
+    def move_selection(self, rows):
+        """Move the selection by a number of rows, scrolling to keep it visible"""
+        if not self.order:
+            return 'break'
+        try:
+            position = self.order.index(self.selected) + rows
+        except ValueError:
+            position = self.top if rows > 0 else self.top + self.visible_count() - 1
+        self.select_position(max(0, min(position, len(self.order) - 1)))
+        return 'break'
+    
+    def select(self, index):
+        """Select a row by index and scroll it into view; False if the row is not shown"""
+        try:
+            position = self.order.index(index)
+        except ValueError:
+            return False
+        self.select_position(position)
+        return True
+    
+    def select_position(self, position):
+        """Select the row at a display position, scrolling to keep it visible"""
+        top = self.top
+        if position < self.top:
+            self.top = position
+        elif position >= self.top + self.visible_count():
+            self.top = position - self.visible_count() + 1
+        
+        # Scrolling to the row already selected must still refill the slots, or they
+        # keep showing the old rows while clicks map through the new top
+        index = self.order[position]
+        changed = index != self.selected
+        self.selected = index
+        if changed or self.top != top:
+            self.render()
+        if changed and self.on_select:
+            self.on_select(index)
+
+
+def diff_archive_row(change):
+    """List row (text, values, tags) for an ArchiveChange"""
+    old_state = change.old.get('State', {}) if change.old else {}
+    new_state = change.new.get('State', {}) if change.new else {}
+    archive = change.new or change.old
+    name = (new_state or old_state).get('Name', archive.get('Name', 'Unknown Mod'))
+    return (change.status.capitalize(),
+            (name, old_state.get('Version', ''), new_state.get('Version', ''), change.reason),
+            (change.status,))
+
+
+def diff_file_row(change):
+    """List row (text, values, tags) for a FileChange"""
+    if change.status == 'moved':
+        details = f"Moved from {change.old_path}"
+    elif change.status == 'changed' and change.size != change.old_size:
+        details = f"{change.old_size:,} -> {change.size:,} bytes"
+    elif change.status == 'changed':
+        details = "Content changed"
+    else:
+        details = f"{change.size or change.old_size:,} bytes"
+    return (change.status.capitalize(),
+            (change.path, change.archive or change.old_archive, details),
+            (change.status,))
+
+
+class LazyRows:
+    """Sequence of list rows formatted from items only when they are shown"""
+    
+    def __init__(self, items, format_row):
+        self.items = items
+        self.format_row = format_row
+    
+    def __len__(self):
+        return len(self.items)
+    
+    def __getitem__(self, index):
+        return self.format_row(self.items[index])
+
+
+class DiffWindow:
+    """Window listing what changed between an older and a newer version of a modlist"""
+    
+    def __init__(self, root, diff):
+        self.diff = diff
+        old_info = diff.old.info
+        new_info = diff.new.info
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Changes in {new_info.get('Name', 'Unknown Modlist')}: "
+                          f"{old_info.get('Version', '?')} -> {new_info.get('Version', '?')}")
+        self.window.geometry("1000x600")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        
+        # Summary line and export
+        summary = diff.summary()
+        ttk.Label(frame, text=(
+            f"Archives: {summary.get('archives_added', 0)} added, {summary.get('archives_removed', 0)} removed, "
+            f"{summary.get('archives_updated', 0)} updated, {summary.get('archives_unchanged', 0)} unchanged    "
+            f"Files: {summary.get('files_added', 0):,} added, {summary.get('files_removed', 0):,} removed, "
+            f"{summary.get('files_changed', 0):,} changed, {summary.get('files_moved', 0):,} moved"
+        )).grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        ttk.Button(frame, text="Export...", command=self.export).grid(row=0, column=1, sticky=tk.E, pady=(0, 10))
+        
+        # One virtual list per tab, file rows are only formatted when shown
+        notebook = ttk.Notebook(frame)
+        notebook.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.lists = []
+        for title, columns, rows in (
+            ("Archives", DIFF_ARCHIVE_COLUMNS, [diff_archive_row(change) for change in diff.archives]),
+            ("Files", DIFF_FILE_COLUMNS, LazyRows(diff.files, diff_file_row)),
+        ):
+            tab = ttk.Frame(notebook)
+            tab.columnconfigure(0, weight=1)
+            tab.rowconfigure(0, weight=1)
+            notebook.add(tab, text=f"{title} ({len(rows):,})")
+            
+            changes = VirtualList(tab, columns)
+            changes.grid(row=0, column=0)
+            changes.set_rows(rows)
+            self.lists.append(changes)
+    
+    def export(self):
+        """Save the differences as JSON, or JSON Lines for a .jsonl file name"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Export Changes",
+            defaultextension=".json",
+            filetypes=[
+                ("JSON files", "*.json"),
+                ("JSON Lines files", "*.jsonl")
+            ]
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith('.jsonl'):
+                with open(path, 'w', encoding='utf-8') as f:
+                    self.diff.write_jsonl(f)
+            else:
+                self.diff.write_json(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export changes: {e}", parent=self.window)
+
+
+def stats_rows(totals):
+    """List rows for (name, file count, total size) totals, largest first"""
+    grand_total = sum(size for _, _, size in totals) or 1
+    return [(name, (f"{count:,}", f"{size / (1024 * 1024):,.1f}", f"{size / grand_total * 100:.1f}%"), ())
+            for name, count, size in sorted(totals, key=lambda total: total[2], reverse=True)]
+
+
+class StatsWindow:
+    """Window with installed file counts and sizes per directive type, top-level directory and archive"""
+    
+    def __init__(self, root, modlist):
+        store = modlist.mod_details
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Statistics - {modlist.name}")
+        self.window.geometry("800x500")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        
+        type_totals = store.type_totals()
+        installed_size = sum(size for _, _, size in type_totals)
+        ttk.Label(frame, text=f"{len(store):,} files, {installed_size / (1024 * 1024):,.1f} MB installed").grid(
+            row=0, column=0, sticky=tk.W, pady=(0, 10))
+        
+        # Totals are kept by the store, so every tab is built without touching the rows
+        archive_totals = [(modlist.archive_lookup.get(archive_hash) or "(Not from an archive)", count, size)
+                          for archive_hash, count, size in store.archive_totals()]
+        top_dir_totals = [(f"{name}\\" if name else "(Root)", count, size)
+                          for name, count, size in store.top_dir_totals()]
+        
+        notebook = ttk.Notebook(frame)
+        notebook.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.lists = []
+        for title, totals in (("By Directive Type", type_totals),
+                              ("By Top-Level Directory", top_dir_totals),
+                              ("By Archive", archive_totals)):
+            tab = ttk.Frame(notebook)
+            tab.columnconfigure(0, weight=1)
+            tab.rowconfigure(0, weight=1)
+            notebook.add(tab, text=title)
+            
+            totals_list = VirtualList(tab, STATS_COLUMNS)
+            totals_list.grid(row=0, column=0)
+            totals_list.set_rows(stats_rows(totals))
+            self.lists.append(totals_list)
+
+
+class InstallTreeWindow:
+    """Window with the final installed layout of the whole modlist and its disk usage"""
+    
+    def __init__(self, root, modlist):
+        self.modlist = modlist
+        self.install_tree = modlist.install_tree
+        self.grand_total = self.install_tree.node_total_size[0] or 1
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Install Tree - {modlist.name}")
+        self.window.geometry("900x600")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        
+        tree = self.install_tree
+        ttk.Label(frame, text=f"{tree.node_file_count[0]:,} files in {len(tree) - 1:,} directories, "
+                              f"{tree.node_total_size[0] / (1024 * 1024):,.1f} MB installed").grid(
+            row=0, column=0, sticky=tk.W, pady=(0, 10))
+        
+        self.notebook = ttk.Notebook(frame)
+        self.notebook.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Folders tab: directories are filled in when first opened
+        folders_tab = ttk.Frame(self.notebook)
+        folders_tab.columnconfigure(0, weight=1)
+        folders_tab.rowconfigure(0, weight=1)
+        self.notebook.add(folders_tab, text="Folders")
+        self.folders = ttk.Treeview(folders_tab, columns=[column[0] for column in INSTALL_TREE_COLUMNS[1:]],
+                                    show='tree headings')
+        for column, heading, width, minwidth in INSTALL_TREE_COLUMNS:
+            self.folders.heading(column, text=heading)
+            self.folders.column(column, width=width, minwidth=minwidth)
+        folders_scroll = ttk.Scrollbar(folders_tab, orient=tk.VERTICAL, command=self.folders.yview)
+        self.folders.configure(yscrollcommand=folders_scroll.set)
+        self.folders.bind('<<TreeviewOpen>>', self.on_folder_open)
+        self.folders.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        folders_scroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.unopened = set()
+        self.populate(0, '')
+        
+        # Largest Directories tab, optionally limited to one depth
+        largest_tab = ttk.Frame(self.notebook)
+        largest_tab.columnconfigure(0, weight=1)
+        largest_tab.rowconfigure(1, weight=1)
+        self.notebook.add(largest_tab, text="Largest Directories")
+        depth_frame = ttk.Frame(largest_tab)
+        depth_frame.grid(row=0, column=0, sticky=tk.W, pady=(5, 5))
+        ttk.Label(depth_frame, text="Depth:").pack(side=tk.LEFT)
+        max_depth = max(tree.node_depth) if len(tree) > 1 else 1
+        self.depth_var = tk.StringVar(value="Any")
+        depth_box = ttk.Combobox(depth_frame, textvariable=self.depth_var, state='readonly', width=8,
+                                 values=["Any"] + [str(depth) for depth in range(1, max_depth + 1)])
+        depth_box.bind('<<ComboboxSelected>>', self.show_largest)
+        depth_box.pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(depth_frame, text="Select a directory to show it in Folders").pack(side=tk.LEFT, padx=(10, 0))
+        self.largest_list = VirtualList(largest_tab, LARGEST_DIRECTORIES_COLUMNS, self.reveal)
+        self.largest_list.grid(row=1, column=0)
+        self.largest_nodes = []
+        self.show_largest()
+    
+    def size_values(self, count, size):
+        return (f"{count:,}", f"{size / (1024 * 1024):,.1f}", f"{size / self.grand_total * 100:.1f}%")
+    
+    def populate(self, node, parent):
+        """Insert a directory's subdirectories (largest first) and its largest files"""
+        tree = self.install_tree
+        store = tree.store
+        with diagnostics.phase("Expand install tree") as phase:
+            children = sorted(tree.node_children(node), key=tree.node_total_size.__getitem__, reverse=True)
+            for child in children:
+                item = self.folders.insert(parent, 'end', iid=f"d{child}", text=f"📁 {tree.names[child]}\\",
+                                           values=self.size_values(tree.node_file_count[child],
+                                                                   tree.node_total_size[child]) + ('',))
+                # Placeholder child so the directory can be opened
+                self.folders.insert(item, 'end', text="")
+                self.unopened.add(item)
+            
+            rows = tree.node_files(node)
+            shown = heapq.nlargest(INSTALL_TREE_FILES_SHOWN, rows, key=store.size.__getitem__)
+            for row in shown:
+                archive_hash = store.row_archive(row)
+                source = self.modlist.archive_lookup.get(archive_hash) if archive_hash else store.row_type(row)
+                self.folders.insert(parent, 'end', text=f"📄 {store.target_name(row)}",
+                                    values=('', f"{store.size[row] / (1024 * 1024):,.1f}",
+                                            f"{store.size[row] / self.grand_total * 100:.1f}%", source or ''))
+            if len(rows) > len(shown):
+                self.folders.insert(parent, 'end', text=f"... {len(rows) - len(shown):,} smaller files not shown")
+            phase['items'] = len(children) + len(shown)
+    
+    def open_folder(self, item):
+        """Fill in a directory's contents the first time it is opened"""
+        if item in self.unopened:
+            self.unopened.discard(item)
+            self.folders.delete(*self.folders.get_children(item))
+            self.populate(int(item[1:]), item)
+    
+    def on_folder_open(self, event):
+        self.open_folder(self.folders.focus())
+    
+    def show_largest(self, event=None):
+        """List the directories with the most bytes below them"""
+        tree = self.install_tree
+        depth = None if self.depth_var.get() == "Any" else int(self.depth_var.get())
+        self.largest_nodes = tree.largest(LARGEST_DIRECTORIES, depth)
+        self.largest_list.set_rows(LazyRows(self.largest_nodes, lambda node: (
+            f"{tree.path(node)}\\", self.size_values(tree.node_file_count[node], tree.node_total_size[node]), ())))
+    
+    def reveal(self, index):
+        """Open the Folders tab at a directory picked in the largest directories list"""
+        # Opening each directory top-down creates the item of the next one
+        item = ''
+        for node in self.install_tree.ancestors(self.largest_nodes[index]):
+            item = f"d{node}"
+            self.open_folder(item)
+            self.folders.item(item, open=True)
+        self.folders.selection_set(item)
+        self.folders.focus(item)
+        self.folders.see(item)
+        self.notebook.select(0)
+
+
+class DiagnosticsWindow:
+    """Window listing the timed phases of this session, newest first"""
+    
     def __init__(self, root):
+        self.window = tk.Toplevel(root)
+        self.window.title("Diagnostics")
+        self.window.geometry("700x500")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        
+        if diagnostics.profiling:
+            profile_text = f"Session profiling is on; the report is written to {diagnostics.profile_path} on exit"
+        else:
+            profile_text = f"Session profiling is off; set {PROFILE_ENV_VAR} or run with --profile FILE to enable it"
+        ttk.Label(frame, text=profile_text).grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=0, column=1, sticky=tk.E, pady=(0, 10))
+        ttk.Button(buttons, text="Refresh", command=self.refresh).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Save Report...", command=self.save_report).pack(side=tk.LEFT, padx=(5, 0))
+        
+        list_frame = ttk.Frame(frame)
+        list_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        list_frame.columnconfigure(0, weight=1)
+        list_frame.rowconfigure(0, weight=1)
+        self.phase_list = VirtualList(list_frame, DIAGNOSTICS_COLUMNS)
+        self.phase_list.grid(row=0, column=0)
+        self.refresh()
+    
+    def refresh(self):
+        """Show the phases recorded so far"""
+        rows = []
+        for phase in reversed(diagnostics.phases):
+            rows.append((phase.name,
+                         (format_seconds(phase.seconds),
+                          f"{phase.items:,}" if phase.items is not None else '',
+                          format_peak(phase)),
+                         ()))
+        self.phase_list.set_rows(rows)
+    
+    def save_report(self):
+        """Save the phase table as text, to attach to a bug report"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Save Diagnostics Report",
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt")]
+        )
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(diagnostics.report() + '\n')
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save report: {e}", parent=self.window)
+
+
+class PathSearchWindow:
+    """Window answering which archive installs a path, and which paths are written more than once"""
+    
+    def __init__(self, root, modlist, on_select_archive):
+        self.modlist = modlist
+        self.on_select_archive = on_select_archive
+        self.results = []
+        self.search_job = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Find File - {modlist.name}")
+        self.window.geometry("1000x600")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(2, weight=1)
+        
+        # Query entry and conflict filter
+        ttk.Label(frame, text="Target path, path prefix or glob (for example meshes\\actors\\*.nif):").grid(
+            row=0, column=0, columnspan=2, sticky=tk.W)
+        self.query_var = tk.StringVar()
+        self.query_var.trace('w', self.schedule_search)
+        query_entry = ttk.Entry(frame, textvariable=self.query_var)
+        query_entry.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(5, 10))
+        self.conflicts_var = tk.BooleanVar()
+        ttk.Checkbutton(frame, text=f"Only overwritten paths ({modlist.paths.conflict_count():,})",
+                        variable=self.conflicts_var, command=self.search).grid(
+            row=1, column=1, sticky=tk.E, padx=(10, 0), pady=(5, 10))
+        
+        # Results, one row per directive; rows are only formatted when shown
+        results_frame = ttk.Frame(frame)
+        results_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        results_frame.columnconfigure(0, weight=1)
+        results_frame.rowconfigure(0, weight=1)
+        self.results_list = VirtualList(results_frame, PATH_SEARCH_COLUMNS, self.on_result_select)
+        self.results_list.grid(row=0, column=0)
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.status_var).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        self.search()
+        query_entry.focus_set()
+    
+    def schedule_search(self, *args):
+        """Debounce query input so the search runs once typing pauses"""
+        if self.search_job is not None:
+            self.window.after_cancel(self.search_job)
+        self.search_job = self.window.after(SEARCH_DEBOUNCE_MS, self.search)
+    
+    def search(self):
+        """Show the directives matching the current query"""
+        self.search_job = None
+        with diagnostics.phase("Find file") as phase:
+            self.results = self.modlist.paths.search(self.query_var.get(), conflicts_only=self.conflicts_var.get())
+            phase['items'] = len(self.results)
+        self.results_list.set_rows(LazyRows(self.results, self.result_row))
+        self.status_var.set(f"{len(self.results):,} of {len(self.modlist.paths):,} files")
+    
+    def result_row(self, row):
+        """List row (text, values, tags) for a DirectiveStore row"""
+        store = self.modlist.mod_details
+        archive_hash = store.row_archive(row)
+        return (store.target_path(row),
+                (self.modlist.archive_lookup.get(archive_hash, archive_hash), f"{store.size[row]:,}"),
+                ())
+    
+    def on_result_select(self, index):
+        """Show the mod that installs the selected file in the main window"""
+        archive_index = self.modlist.archive_index.get(self.modlist.mod_details.row_archive(self.results[index]))
+        if archive_index is not None:
+            self.on_select_archive(archive_index)
+
+
+class EmbeddedFilesWindow:
+    """Window listing the files stored inside the .wabbajack, with a preview of the selected one"""
+    
+    def __init__(self, root, session):
+        self.contents = session.contents
+        self.image = None
+        self.filter_job = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Embedded Files - {session.modlist.name}")
+        self.window.geometry("1100x650")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=2)
+        frame.columnconfigure(1, weight=3)
+        frame.rowconfigure(2, weight=1)
+        
+        # Member list with a filter on target path or member name
+        ttk.Label(frame, text="Filter:").grid(row=0, column=0, sticky=tk.W)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace('w', self.schedule_filter)
+        filter_entry = ttk.Entry(frame, textvariable=self.filter_var)
+        filter_entry.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=(5, 10))
+        list_frame = ttk.Frame(frame)
+        list_frame.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        list_frame.columnconfigure(0, weight=1)
+        list_frame.rowconfigure(0, weight=1)
+        self.file_list = VirtualList(list_frame, EMBEDDED_FILES_COLUMNS, self.show_preview)
+        self.file_list.grid(row=0, column=0)
+        
+        # Preview of the selected member: a description line, then its text or image
+        preview_frame = ttk.Frame(frame)
+        preview_frame.grid(row=0, column=1, rowspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(10, 0))
+        preview_frame.columnconfigure(0, weight=1)
+        preview_frame.rowconfigure(1, weight=1)
+        self.description_var = tk.StringVar()
+        ttk.Label(preview_frame, textvariable=self.description_var).grid(row=0, column=0, sticky=tk.W)
+        self.preview_text = scrolledtext.ScrolledText(preview_frame, wrap=tk.NONE, font=('TkFixedFont', 9))
+        self.preview_text.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(5, 0))
+        self.preview_image = ttk.Label(preview_frame, anchor=tk.CENTER)
+        
+        self.status_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.status_var).grid(row=3, column=0, columnspan=2, sticky=tk.W, pady=(10, 0))
+        
+        try:
+            with diagnostics.phase("Index embedded files") as phase:
+                self.files = embedded_files(session.modlist, self.contents)
+                phase['items'] = len(self.files)
+            self.status_var.set(f"{len(self.files):,} embedded files")
+        except (OSError, zipfile.BadZipFile) as e:
+            self.files = []
+            self.status_var.set(f"Can't read {os.path.basename(self.contents.path)}: {e}")
+        self.keys = [f"{label}\n{name}".lower() for name, label, _, _ in self.files]
+        self.file_list.set_rows([(label, (role, f"{size:,}"), ()) for _, label, role, size in self.files])
+        filter_entry.focus_set()
+    
+    def schedule_filter(self, *args):
+        """Debounce filter input so the list is filtered once typing pauses"""
+        if self.filter_job is not None:
+            self.window.after_cancel(self.filter_job)
+        self.filter_job = self.window.after(SEARCH_DEBOUNCE_MS, self.apply_filter)
+    
+    def apply_filter(self):
+        self.filter_job = None
+        text = self.filter_var.get().lower()
+        self.file_list.set_order([index for index, key in enumerate(self.keys) if text in key])
+        self.status_var.set(f"{len(self.file_list.order):,} of {len(self.files):,} embedded files")
+    
+    def show_preview(self, index):
+        """Show the text, image or hex dump of the selected member"""
+        name, label, role, size = self.files[index]
+        try:
+            with diagnostics.phase("Preview embedded file", size):
+                preview = self.contents.preview(name)
+        except (OSError, zipfile.BadZipFile, RuntimeError) as e:
+            self.description_var.set(f"Can't read {name}: {e}")
+            return
+        
+        description = f"{label} - {size:,} bytes" if label == name else f"{label} ({name}) - {size:,} bytes"
+        if preview.kind == 'image':
+            description += f", {preview.image_format} image {preview.width} x {preview.height}"
+            if self.show_image(preview):
+                self.description_var.set(description)
+                return
+            description += " (not displayable here)"
+        elif preview.truncated and preview.kind == 'text':
+            description += f", first {PREVIEW_TEXT_BYTES // 1024:,} KB shown"
+        elif preview.truncated:
+            description += f", first {PREVIEW_HEX_BYTES:,} bytes shown"
+        self.description_var.set(description)
+        
+        self.preview_image.grid_remove()
+        self.image = None
+        self.preview_text.grid()
+        self.preview_text.config(state=tk.NORMAL)
+        self.preview_text.delete(1.0, tk.END)
+        self.preview_text.insert(1.0, preview.text or '')
+        self.preview_text.config(state=tk.DISABLED)
+    
+    def show_image(self, preview):
+        """Display an image preview scaled to fit; False if Tk can't decode it"""
+        if preview.data is None:
+            return False
+        try:
+            image = tk.PhotoImage(data=base64.b64encode(preview.data).decode('ascii'))
+        except tk.TclError:
+            return False
+        factor = max(1, -(-preview.width // PREVIEW_IMAGE_WIDTH), -(-preview.height // PREVIEW_IMAGE_HEIGHT))
+        self.image = image.subsample(factor) if factor > 1 else image
+        self.preview_text.grid_remove()
+        self.preview_image.configure(image=self.image)
+        self.preview_image.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(5, 0))
+        return True
+
+
+def toggle_sort(current, column, text_columns=('#0',)):
+    """(column, descending) after a heading click: the sorted column reverses, others start largest first or A-Z"""
+    if current is not None and current[0] == column:
+        return column, not current[1]
+    return column, column not in text_columns
+
+
+class DuplicatesWindow:
+    """Window listing file contents installed more than once and the archives that ship the same files"""
+    
+    def __init__(self, root, analysis):
+        self.analysis = analysis
+        self.group_sort = None
+        self.overlap_sort = None
+        self.group_names = None
+        
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Duplicate Files - {analysis.modlist.name}")
+        self.window.geometry("1000x650")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        frame = ttk.Frame(self.window, padding="10")
+        frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        frame.columnconfigure(0, weight=1)
+        frame.rowconfigure(1, weight=1)
+        
+        # Summary line and export
+        summary = analysis.summary()
+        ttk.Label(frame, text=(
+            f"{summary['groups']:,} files installed more than once, {summary['duplicate_files']:,} extra copies, "
+            f"{summary['wasted_bytes'] / (1024 * 1024):,.1f} MB wasted    "
+            f"{summary['archive_pairs']:,} pairs of archives share files"
+        )).grid(row=0, column=0, sticky=tk.W, pady=(0, 10))
+        ttk.Button(frame, text="Export...", command=self.export).grid(row=0, column=1, sticky=tk.E, pady=(0, 10))
+        
+        notebook = ttk.Notebook(frame)
+        notebook.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # Repeated files, with the copies of the selected one below
+        groups_tab = ttk.Frame(notebook)
+        groups_tab.columnconfigure(0, weight=1)
+        groups_tab.rowconfigure(0, weight=3)
+        groups_tab.rowconfigure(2, weight=1)
+        notebook.add(groups_tab, text=f"Duplicate Files ({len(analysis):,})")
+        self.groups_list = VirtualList(groups_tab, DUPLICATE_GROUP_COLUMNS, self.on_group_select, self.sort_groups)
+        self.groups_list.grid(row=0, column=0)
+        self.groups_list.set_rows(LazyRows(range(len(analysis)), self.group_row))
+        ttk.Label(groups_tab, text="Copies of the selected file:").grid(row=1, column=0, sticky=tk.W, pady=(10, 5))
+        self.copies_list = VirtualList(groups_tab, DUPLICATE_COPY_COLUMNS)
+        self.copies_list.grid(row=2, column=0)
+        
+        # Archive pairs sharing files
+        overlaps_tab = ttk.Frame(notebook)
+        overlaps_tab.columnconfigure(0, weight=1)
+        overlaps_tab.rowconfigure(0, weight=1)
+        notebook.add(overlaps_tab, text=f"Archive Overlap ({len(analysis.overlaps):,})")
+        self.overlaps_list = VirtualList(overlaps_tab, ARCHIVE_OVERLAP_COLUMNS, on_sort=self.sort_overlaps)
+        self.overlaps_list.grid(row=0, column=0)
+        self.overlaps_list.set_rows(LazyRows(analysis.overlaps, self.overlap_row))
+        
+        # Most wasted space and most shared bytes first
+        self.sort_groups('wasted')
+        self.sort_overlaps('size')
+    
+    def group_row(self, group):
+        """List row for a group, named by the target path of its first copy"""
+        analysis = self.analysis
+        size = analysis.group_size[group]
+        return (analysis.store.target_path(analysis.group_rows[analysis.group_offsets[group]]),
+                (f"{analysis.group_copies[group]:,}", f"{size / (1024 * 1024):,.2f}",
+                 f"{analysis.group_wasted[group] / (1024 * 1024):,.2f}", f"{analysis.group_archives[group]:,}"),
+                ())
+    
+    def overlap_row(self, overlap):
+        return (self.analysis.archive_name(overlap.first),
+                (self.analysis.archive_name(overlap.second), f"{overlap.files:,}",
+                 f"{overlap.size / (1024 * 1024):,.1f}"),
+                ())
+    
+    def sort_groups(self, column):
+        """Sort the repeated files by a column; clicking it again reverses the direction"""
+        self.group_sort = column, descending = toggle_sort(self.group_sort, column)
+        analysis = self.analysis
+        with diagnostics.phase("Sort duplicate files", len(analysis)):
+            if column == '#0':
+                if self.group_names is None:
+                    self.group_names = [analysis.store.target_path(analysis.group_rows[start]).casefold()
+                                        for start in analysis.group_offsets[:-1]]
+                order = sorted(range(len(analysis)), key=self.group_names.__getitem__, reverse=descending)
+            else:
+                order = analysis.order(f"group_{column}", descending)
+        self.groups_list.set_order(order)
+        self.groups_list.show_sort(column, descending)
+    
+    def sort_overlaps(self, column):
+        """Sort the archive pairs by a column; clicking it again reverses the direction"""
+        self.overlap_sort = column, descending = toggle_sort(self.overlap_sort, column, ('#0', 'other'))
+        analysis = self.analysis
+        overlaps = analysis.overlaps
+        if column in ('#0', 'other'):
+            names = [analysis.archive_name(overlap.first if column == '#0' else overlap.second).casefold()
+                     for overlap in overlaps]
+            key = names.__getitem__
+        else:
+            values = [getattr(overlap, column) for overlap in overlaps]
+            key = values.__getitem__
+        with diagnostics.phase("Sort archive overlap", len(overlaps)):
+            order = sorted(range(len(overlaps)), key=key, reverse=descending)
+        self.overlaps_list.set_order(order)
+        self.overlaps_list.show_sort(column, descending)
+    
+    def on_group_select(self, group):
+        """List every copy of the selected file with the archive it comes from"""
+        analysis = self.analysis
+        self.copies_list.set_rows([(analysis.store.target_path(row), (analysis.row_archive_name(row),), ())
+                                   for row in analysis.group_files(group)])
+    
+    def export(self):
+        """Save the duplicates as JSON, or JSON Lines for a .jsonl file name"""
+        path = filedialog.asksaveasfilename(
+            parent=self.window,
+            title="Export Duplicate Files",
+            defaultextension=".json",
+            filetypes=[
+                ("JSON files", "*.json"),
+                ("JSON Lines files", "*.jsonl")
+            ]
+        )
+        if not path:
+            return
+        try:
+            if path.lower().endswith('.jsonl'):
+                with open(path, 'w', encoding='utf-8') as f:
+                    self.analysis.write_jsonl(f)
+            else:
+                self.analysis.write_json(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export duplicate files: {e}", parent=self.window)
+
+
+class WabbajackGuideApp:
+    def __init__(self, root, wabbajack_path=None):
         self.root = root
         self.root.title("Wabbajack Manual Installation Guide")
         self.root.geometry("1200x800")
@@ -16,17 +1119,51 @@ class WabbajackGuideApp:
         # Make window resizable
         self.root.resizable(True, True)
         
-        # Initialize data
-        self.modlist_data = None
-        self.archives = []
-        self.directives = []
-        self.archive_lookup = {}
-        self.mod_details = {}
+        # Everything read from the open file lives in the session, replaced as a whole
+        # by the next load; windows showing its modlist are closed with it
+        self.session = None
+        self.session_windows = []
+        self.search_job = None
+        self.saved_queries = SavedQueries()
+        
+        # Mod list sort: [(column id, descending)] with the primary key first,
+        # kept from one modlist to the next
+        self.sort_keys = []
+        
+        # Files tab directory items whose contents have not been inserted yet,
+        # and the pending prefetch of the rows around the selection
+        self.unopened_directories = {}
+        self.prefetch_job = None
+        
         self.current_wabbajack_file = None
         
+        # Parsed modlists are cached on disk so reopening a file is instant
+        self.cache = ModlistCache()
+        
+        # Background load state; while a modlist loads, actions that would cancel it are disabled
+        self.load_queue = None
+        self.load_cancel_event = None
+        self.loading_modlist = False
+        
+        # Timing of the last modlist load, shown in the status bar
+        self.load_mark = 0
+        self.load_started = 0.0
+        self.load_summary = ''
+        
         self.setup_ui()
-        self.show_load_prompt()
         
+        # Open the given file, or ask for one, only once the window is up
+        if wabbajack_path:
+            self.current_wabbajack_file = os.path.abspath(wabbajack_path)
+            self.root.after_idle(self.extract_and_load_modlist, self.current_wabbajack_file)
+        else:
+            self.root.after_idle(self.show_load_prompt)
+        
+    @property
+    def modlist(self):
+        """The open modlist, or None before the first load"""
+        return self.session.modlist if self.session is not None else None
+    
     def show_load_prompt(self):
         """Show dialog to load Wabbajack file"""
         result = messagebox.askyesno(
@@ -52,98 +1189,279 @@ class WabbajackGuideApp:
             self.extract_and_load_modlist(file_path)
     
     def extract_and_load_modlist(self, wabbajack_path):
-        """Extract modlist.json from Wabbajack file and load it"""
+        """Load the modlist from a Wabbajack file on a background thread"""
+        self.start_background_task(load_worker, (wabbajack_path, self.cache), self.apply_loaded_modlist)
+        self.set_loading_modlist(True)
+        self.load_mark = diagnostics.mark()
+        self.load_started = time.perf_counter()
+    
+    def start_background_task(self, worker, args, on_done):
+        """Run worker(*args, load_queue, cancel_event) on a background thread.
+        
+        Progress is shown in the status bar and on_done is called on the UI
+        thread with the payload of the worker's 'done' message.
+        """
+        # Only one task runs at a time; starting another cancels the one in flight
+        self.cancel_load()
+        
+        self.load_queue = queue.Queue()
+        self.load_cancel_event = threading.Event()
+        thread = threading.Thread(target=worker, args=args + (self.load_queue, self.load_cancel_event), daemon=True)
+        
+        self.show_load_progress("Opening", 0.0)
+        thread.start()
+        self.root.after(LOAD_POLL_INTERVAL_MS, self.poll_load_queue, self.load_queue, on_done)
+    
+    def cancel_load(self):
+        """Cancel the background task in flight, keeping the current modlist"""
+        if self.load_cancel_event is not None:
+            self.load_cancel_event.set()
+        self.load_cancel_event = None
+        self.load_queue = None
+        self.set_loading_modlist(False)
+        self.hide_load_progress()
+    
+    def set_loading_modlist(self, loading):
+        """Disable the actions that run their own background task while a modlist loads"""
+        self.loading_modlist = loading
+        for button in self.task_buttons:
+            button.state(['disabled'] if loading else ['!disabled'])
+    
+    def poll_load_queue(self, load_queue, on_done):
+        """Apply messages posted by the background worker, then reschedule"""
+        # Messages from a cancelled or superseded load are ignored
+        if load_queue is not self.load_queue:
+            return
+        
         try:
-            # Create temporary directory for extraction
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extract modlist.json from Wabbajack file
-                with zipfile.ZipFile(wabbajack_path, 'r') as zip_ref:
-                    # Look for modlist file (could be named 'modlist' or 'modlist.json')
-                    modlist_files = [f for f in zip_ref.namelist() if f == 'modlist' or f == 'modlist.json']
-                    
-                    if not modlist_files:
-                        messagebox.showerror("Error", "No modlist file found in Wabbajack archive")
-                        return
-                    
-                    modlist_file = modlist_files[0]
-                    zip_ref.extract(modlist_file, temp_dir)
-                    
-                    # Load and parse the modlist JSON
-                    modlist_path = os.path.join(temp_dir, modlist_file)
-                    with open(modlist_path, 'r', encoding='utf-8') as f:
-                        self.modlist_data = json.load(f)
-                
-                # Process the loaded data
-                self.archives = self.modlist_data.get('Archives', [])
-                self.directives = self.modlist_data.get('Directives', [])
+            while True:
+                message = load_queue.get_nowait()
+                kind = message[0]
                 
-                # Create archive lookup
-                for archive in self.archives:
-                    archive_hash = archive.get('Hash', '')
-                    archive_name = archive.get('Name', '')
-                    self.archive_lookup[archive_hash] = archive_name
-                
-                # Process directives for mod details
-                self.process_directives()
-                
-                # Update UI
-                self.update_ui_after_load()
-                
-                messagebox.showinfo("Success", f"Successfully loaded modlist from:\n{os.path.basename(wabbajack_path)}")
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load Wabbajack file: {e}")
+                if kind == 'progress':
+                    self.show_load_progress(message[1], message[2])
+                elif kind == 'done':
+                    # The worker is finished, only updating the UI remains
+                    self.load_cancel_event = None
+                    self.load_queue = None
+                    self.cancel_button.pack_forget()
+                    on_done(*message[1:])
+                    return
+                elif kind == 'error':
+                    self.cancel_load()
+                    messagebox.showerror("Error", message[1])
+                    return
+        except queue.Empty:
+            pass
+        
+        self.root.after(LOAD_POLL_INTERVAL_MS, self.poll_load_queue, load_queue, on_done)
+    
+    def apply_loaded_modlist(self, session):
+        """Swap in a freshly loaded modlist session, free the previous one and refresh the UI"""
+        previous, self.session = self.session, session
+        if self.prefetch_job is not None:
+            self.root.after_cancel(self.prefetch_job)
+            self.prefetch_job = None
+        
+        # Nothing may keep showing (or refer into) the previous modlist
+        for window in self.session_windows:
+            if window.window.winfo_exists():
+                window.window.destroy()
+        self.session_windows = []
+        self.mod_list.set_rows([])
+        self.files_tree.delete(*self.files_tree.get_children())
+        self.unopened_directories = {}
+        self.overview_text.delete(1.0, tk.END)
+        if previous is not None:
+            previous.close()
+        self.update_sorted_order()
+        
+        # Update UI
+        self.update_ui_after_load(on_complete=self.finish_load)
+    
+    def finish_load(self):
+        """Clear load progress once the new modlist is fully shown"""
+        # Summarize the load with its slowest phases
+        elapsed = time.perf_counter() - self.load_started
+        slowest = sorted(diagnostics.since(self.load_mark), key=lambda phase: phase.seconds, reverse=True)[:3]
+        diagnostics.add("Open modlist", elapsed, len(self.session.archives))
+        self.load_summary = f" in {format_seconds(elapsed)} ({diagnostics.summary(slowest)})"
+        self.set_loading_modlist(False)
+        self.hide_load_progress()
+        messagebox.showinfo("Success", f"Successfully loaded modlist from:\n{os.path.basename(self.modlist.path)}")
+    
+    def show_load_progress(self, stage, fraction):
+        """Show the current load stage and percentage in the status bar"""
+        self.status_var.set(f"{stage}... {fraction * 100:.0f}%")
+        self.load_progress['value'] = fraction * 100
+        if not self.load_progress.winfo_ismapped():
+            self.load_progress.pack(side=tk.LEFT, padx=(10, 0))
+            self.cancel_button.pack(side=tk.LEFT, padx=(5, 0))
+    
+    def hide_load_progress(self):
+        """Remove the progress bar and Cancel button from the status bar"""
+        self.load_progress.pack_forget()
+        self.cancel_button.pack_forget()
+        self.update_status()
+    
+    def update_status(self):
+        """Show the loaded modlist summary in the status bar"""
+        if self.modlist is None:
+            self.status_var.set("No modlist loaded")
+        elif len(self.mod_list.order) < len(self.session.archives):
+            self.status_var.set(f"Showing {len(self.mod_list.order)} of {len(self.session.archives)} mods")
+        elif self.session.verification is not None:
+            verification = self.session.verification
+            self.status_var.set(f"Downloads in {verification.folder}: {verification.summary()}")
+        else:
+            self.status_var.set(f"Loaded {len(self.session.archives)} mods from {os.path.basename(self.modlist.path)}"
+                                f"{self.load_summary}")
+    
+    def clear_cache(self):
+        """Delete all cached modlists after confirmation"""
+        cache_size = self.cache.total_size()
+        if not messagebox.askyesno(
+            "Clear Cache",
+            f"Delete all cached modlists ({cache_size / (1024 * 1024):.1f} MB)?\n\n"
+            "Modlists will be parsed again the next time they are opened."
+        ):
+            return
+        freed = self.cache.clear()
+        self.status_var.set(f"Cleared {freed / (1024 * 1024):.1f} MB from the modlist cache")
+    
+    def open_stats(self):
+        """Open a window with installed totals per directive type, directory and archive"""
+        if self.modlist is None:
+            messagebox.showinfo("Statistics", "Load a modlist first.")
+            return
+        self.session_windows.append(StatsWindow(self.root, self.modlist))
+    
+    def open_install_tree(self):
+        """Open a window with the installed layout and disk usage of the whole modlist"""
+        if self.modlist is None:
+            messagebox.showinfo("Install Tree", "Load a modlist first.")
+            return
+        self.session_windows.append(InstallTreeWindow(self.root, self.modlist))
+    
+    def open_path_search(self):
+        """Open a window for finding which mods install a path"""
+        if self.modlist is None:
+            messagebox.showinfo("Find File", "Load a modlist first.")
+            return
+        self.session_windows.append(PathSearchWindow(self.root, self.modlist, self.show_mod))
+    
+    def open_embedded_files(self):
+        """Open a window previewing the inline files, image and readme stored in the .wabbajack"""
+        if self.modlist is None:
+            messagebox.showinfo("Embedded Files", "Load a modlist first.")
+            return
+        self.session_windows.append(EmbeddedFilesWindow(self.root, self.session))
+    
+    def open_diagnostics(self):
+        """Open a window with the timed phases of this session"""
+        # It shows the process-wide diagnostics, not the modlist, so it stays open across loads
+        DiagnosticsWindow(self.root)
+    
+    def open_duplicates(self):
+        """Open a window with the files installed more than once, analysing them on first use"""
+        if self.modlist is None:
+            messagebox.showinfo("Duplicate Files", "Load a modlist first.")
+            return
+        if self.session.duplicate_analysis is not None:
+            self.show_duplicates(self.session.duplicate_analysis)
+        else:
+            self.start_background_task(duplicates_worker, (self.session,), self.show_duplicates)
+    
+    def show_duplicates(self, analysis):
+        self.hide_load_progress()
+        # The analysis of a modlist that has since been replaced is not shown
+        if analysis.modlist is self.modlist:
+            self.session_windows.append(DuplicatesWindow(self.root, analysis))
+    
+    def show_mod(self, archive_index):
+        """Select a mod in the mod list, clearing a search that hides it"""
+        if not self.mod_list.select(archive_index):
+            self.search_var.set('')
+            self.filter_mods()
+            self.mod_list.select(archive_index)
+    
+    def verify_downloads_folder(self):
+        """Pick a downloads folder and mark each mod as present, missing or mismatched"""
+        if self.modlist is None:
+            messagebox.showinfo("Verify Downloads", "Load a modlist first, then pick the folder holding its downloads.")
+            return
+        verification = self.session.verification
+        folder = filedialog.askdirectory(
+            title="Select Downloads Folder",
+            initialdir=verification.folder if verification is not None else None
+        )
+        if folder:
+            self.start_background_task(verify_worker, (self.session.archives, folder), self.apply_verification)
+    
+    def apply_verification(self, verification):
+        """Show the download state of every mod in the mod list"""
+        self.session.apply_verification(verification)
+        if any(column == 'download' for column, _ in self.sort_keys) or 'download' in self.search_var.get():
+            self.update_sorted_order()
+            self.filter_mods()
+        self.mod_list.update_rows(self.session.rows)
+        self.hide_load_progress()
+    
+    def compare_with_file(self):
+        """Pick an older version of the loaded modlist and show what changed"""
+        if self.modlist is None:
+            messagebox.showinfo("Compare", "Load a modlist first, then pick an older version to compare it with.")
+            return
+        file_path = filedialog.askopenfilename(
+            title="Select Older Version to Compare With",
+            filetypes=[
+                ("Wabbajack files", "*.wabbajack"),
+                ("All files", "*.*")
+            ]
+        )
+        if file_path:
+            self.start_background_task(diff_worker, (file_path, self.modlist, self.cache), self.show_diff)
+    
+    def show_diff(self, diff):
+        """Open a window listing the differences found by compare_with_file"""
+        self.hide_load_progress()
+        # A comparison against a modlist that has since been replaced is not shown
+        if diff.new is self.modlist:
+            self.session_windows.append(DiffWindow(self.root, diff))
     
-    def update_ui_after_load(self):
+    def update_ui_after_load(self, on_complete=None):
         """Update UI elements after loading modlist data"""
+        modlist_data = self.modlist.info
+        
         # Update header
-        if self.modlist_data:
-            title = f"Manual Installation Guide: {self.modlist_data.get('Name', 'Unknown Modlist')}"
-            self.root.title(f"Wabbajack Manual Installation Guide - {self.modlist_data.get('Name', 'Unknown Modlist')}")
+        if modlist_data:
+            title = f"Manual Installation Guide: {modlist_data.get('Name', 'Unknown Modlist')}"
+            self.root.title(f"Wabbajack Manual Installation Guide - {modlist_data.get('Name', 'Unknown Modlist')}")
         
         # Update modlist info
         if hasattr(self, 'info_text'):
-            if self.modlist_data:
-                info_text = f"""Name: {self.modlist_data.get('Name', 'Unknown')}
-Author: {self.modlist_data.get('Author', 'Unknown')}
-Version: {self.modlist_data.get('Version', 'Unknown')}
-Game: {self.modlist_data.get('GameType', 'Unknown')}
-Description: {self.modlist_data.get('Description', 'No description available')}
-Wabbajack Version: {self.modlist_data.get('WabbajackVersion', 'Unknown')}
-Total Mods: {len(self.archives)}"""
+            if modlist_data:
+                info_text = f"""Name: {modlist_data.get('Name', 'Unknown')}
+Author: {modlist_data.get('Author', 'Unknown')}
+Version: {modlist_data.get('Version', 'Unknown')}
+Game: {modlist_data.get('GameType', 'Unknown')}
+Description: {modlist_data.get('Description', 'No description available')}
+Wabbajack Version: {modlist_data.get('WabbajackVersion', 'Unknown')}
+Total Mods: {len(self.session.archives)}
+Overwritten Files: {self.modlist.paths.conflict_count():,} paths are installed by more than one directive"""
                 self.info_text.config(state=tk.NORMAL)
                 self.info_text.delete(1.0, tk.END)
                 self.info_text.insert(1.0, info_text)
                 self.info_text.config(state=tk.DISABLED)
         
         # Populate mod list
-        self.populate_mod_list()
-        
-        # Update status
-        if hasattr(self, 'status_var'):
-            self.status_var.set("No modlist loaded")
+        self.populate_mod_list(on_complete=on_complete)
     
     def load_modlist_data(self):
         """Load and parse the modlist JSON file (kept for compatibility)"""
         # This method is now deprecated, use load_wabbajack_file instead
         pass
     
-    def process_directives(self):
-        """Process directives to create mod details lookup"""
-        for directive in self.directives:
-            if directive.get('$type') == 'FromArchive':
-                archive_hash = directive.get('ArchiveHashPath', [''])[0] if directive.get('ArchiveHashPath') else ''
-                archive_path = directive.get('ArchiveHashPath', ['', ''])[1] if len(directive.get('ArchiveHashPath', [])) > 1 else ''
-                
-                if archive_hash not in self.mod_details:
-                    self.mod_details[archive_hash] = []
-                
-                self.mod_details[archive_hash].append({
-                    'target_path': directive.get('To', ''),
-                    'archive_path': archive_path,
-                    'size': directive.get('Size', 0)
-                })
-    
     def setup_ui(self):
         """Setup the main UI components"""
         # Create main frame
@@ -163,9 +1481,31 @@ Total Mods: {len(self.archives)}"""
         self.title_label = ttk.Label(header_frame, text="Wabbajack Manual Installation Guide", font=('Arial', 16, 'bold'))
         self.title_label.pack()
         
-        # Load file button
-        load_button = ttk.Button(header_frame, text="Load Wabbajack File", command=self.load_wabbajack_file)
-        load_button.pack(pady=(5, 0))
+        # Load file and cache buttons
+        button_frame = ttk.Frame(header_frame)
+        button_frame.pack(pady=(5, 0))
+        load_button = ttk.Button(button_frame, text="Load Wabbajack File", command=self.load_wabbajack_file)
+        load_button.pack(side=tk.LEFT)
+        stats_button = ttk.Button(button_frame, text="Statistics", command=self.open_stats)
+        stats_button.pack(side=tk.LEFT, padx=(5, 0))
+        tree_button = ttk.Button(button_frame, text="Install Tree", command=self.open_install_tree)
+        tree_button.pack(side=tk.LEFT, padx=(5, 0))
+        find_button = ttk.Button(button_frame, text="Find File...", command=self.open_path_search)
+        find_button.pack(side=tk.LEFT, padx=(5, 0))
+        embedded_button = ttk.Button(button_frame, text="Embedded Files", command=self.open_embedded_files)
+        embedded_button.pack(side=tk.LEFT, padx=(5, 0))
+        duplicates_button = ttk.Button(button_frame, text="Duplicate Files", command=self.open_duplicates)
+        duplicates_button.pack(side=tk.LEFT, padx=(5, 0))
+        compare_button = ttk.Button(button_frame, text="Compare With...", command=self.compare_with_file)
+        compare_button.pack(side=tk.LEFT, padx=(5, 0))
+        verify_button = ttk.Button(button_frame, text="Verify Downloads...", command=self.verify_downloads_folder)
+        verify_button.pack(side=tk.LEFT, padx=(5, 0))
+        # Each of these runs a background task, which would cancel a modlist load in progress
+        self.task_buttons = [compare_button, verify_button, duplicates_button]
+        clear_cache_button = ttk.Button(button_frame, text="Clear Cache", command=self.clear_cache)
+        clear_cache_button.pack(side=tk.LEFT, padx=(5, 0))
+        diagnostics_button = ttk.Button(button_frame, text="Diagnostics", command=self.open_diagnostics)
+        diagnostics_button.pack(side=tk.LEFT, padx=(5, 0))
         
         # Modlist info - compact section with limited height
         info_frame = ttk.LabelFrame(main_frame, text="Modlist Information", padding="5")
@@ -185,9 +1525,24 @@ Total Mods: {len(self.archives)}"""
         search_frame = ttk.LabelFrame(outer_paned, text="Search Mods", padding="10")
         ttk.Label(search_frame, text="Search:").pack(anchor=tk.W)
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', self.filter_mods)
-        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
-        search_entry.pack(anchor=tk.W, pady=(5, 0), fill=tk.X)
+        self.search_var.trace('w', self.schedule_filter)
+        search_row = ttk.Frame(search_frame)
+        search_row.pack(anchor=tk.W, pady=(5, 0), fill=tk.X)
+        search_entry = ttk.Entry(search_row, textvariable=self.search_var, width=30)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        
+        # Saved queries
+        delete_query_button = ttk.Button(search_row, text="Delete", command=self.delete_saved_query)
+        delete_query_button.pack(side=tk.RIGHT, padx=(5, 0))
+        save_query_button = ttk.Button(search_row, text="Save Query...", command=self.save_query)
+        save_query_button.pack(side=tk.RIGHT, padx=(5, 0))
+        self.saved_query_var = tk.StringVar()
+        self.saved_query_box = ttk.Combobox(search_row, textvariable=self.saved_query_var, state='readonly',
+                                            values=self.saved_queries.names(), width=25)
+        self.saved_query_box.bind('<<ComboboxSelected>>', self.apply_saved_query)
+        self.saved_query_box.pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Label(search_row, text="Saved:").pack(side=tk.RIGHT, padx=(10, 0))
+        ttk.Label(search_frame, text=SEARCH_HELP, foreground='gray').pack(anchor=tk.W, pady=(5, 0))
         
         # Create inner PanedWindow for resizable mod list and details
         paned_window = ttk.PanedWindow(outer_paned, orient=tk.VERTICAL)
@@ -197,25 +1552,12 @@ Total Mods: {len(self.archives)}"""
         mod_frame.columnconfigure(0, weight=1)
         mod_frame.rowconfigure(0, weight=1)
         
-        # Create treeview for mods
-        self.tree = ttk.Treeview(mod_frame, columns=('author', 'version', 'size'), show='tree headings')
-        self.tree.heading('#0', text='Mod Name')
-        self.tree.heading('author', text='Author')
-        self.tree.heading('version', text='Version')
-        self.tree.heading('size', text='Size (MB)')
-        
-        # Configure column widths
-        self.tree.column('#0', width=400, minwidth=300)
-        self.tree.column('author', width=150, minwidth=100)
-        self.tree.column('version', width=100, minwidth=80)
-        self.tree.column('size', width=100, minwidth=80)
-        
-        # Scrollbar for treeview
-        tree_scroll = ttk.Scrollbar(mod_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscrollcommand=tree_scroll.set)
-        
-        self.tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        tree_scroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        # Virtualized list of mods, only the visible rows are materialized
+        self.mod_list = VirtualList(mod_frame, MOD_LIST_COLUMNS, self.on_mod_select, self.sort_mods)
+        self.tree = self.mod_list.tree
+        self.mod_list.grid(row=0, column=0)
+        for download_state in DOWNLOAD_STATES:
+            self.tree.tag_configure(download_state, foreground=DOWNLOAD_STATE_COLORS[download_state])
         
         # Details frame
         details_frame = ttk.LabelFrame(paned_window, text="Mod Details", padding="10")
@@ -259,6 +1601,8 @@ Total Mods: {len(self.archives)}"""
         files_scroll = ttk.Scrollbar(files_frame, orient=tk.VERTICAL, command=self.files_tree.yview)
         self.files_tree.configure(yscrollcommand=files_scroll.set)
         
+        self.files_tree.bind('<<TreeviewOpen>>', self.on_files_tree_open)
+        
         self.files_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         files_scroll.grid(row=0, column=1, sticky=(tk.N, tk.S))
         
@@ -274,12 +1618,6 @@ Total Mods: {len(self.archives)}"""
         outer_paned.add(search_frame, weight=10)  # Search frame at top - higher weight for more space
         outer_paned.add(paned_window, weight=5)  # Mod list/details area gets less initial space
         
-        # Bind tree selection event
-        self.tree.bind('<<TreeviewSelect>>', self.on_mod_select)
-        
-        # Populate mod list (will be empty initially)
-        self.populate_mod_list()
-        
         # Status bar
         status_frame = ttk.Frame(main_frame)
         status_frame.grid(row=3, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
@@ -288,6 +1626,10 @@ Total Mods: {len(self.archives)}"""
         self.status_var.set("No modlist loaded")
         ttk.Label(status_frame, textvariable=self.status_var).pack(side=tk.LEFT)
         
+        # Load progress and Cancel button, only packed while a load is running
+        self.load_progress = ttk.Progressbar(status_frame, orient=tk.HORIZONTAL, length=200, mode='determinate')
+        self.cancel_button = ttk.Button(status_frame, text="Cancel", command=self.cancel_load)
+        
         # Generated timestamp
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         ttk.Label(status_frame, text=f"Generated: {timestamp}").pack(side=tk.RIGHT)
@@ -306,265 +1648,236 @@ Total Mods: {len(self.archives)}"""
     def open_link(self, event):
         """Open link in default browser"""
         try:
-            # Get the clicked position
+            # The clicked link is the tagged range around the click position
             index = self.overview_text.index(f"@{event.x},{event.y}")
-            # Get the line containing the click
-            line_start = self.overview_text.index(f"{index} linestart")
-            line_end = self.overview_text.index(f"{index} lineend")
-            line_text = self.overview_text.get(line_start, line_end)
-            
-            # Extract URL from the line
-            if "Mod Page:" in line_text:
-                url = line_text.split("Mod Page:")[1].strip()
-                webbrowser.open(url)
-            elif "Direct Download:" in line_text:
-                url = line_text.split("Direct Download:")[1].strip()
-                webbrowser.open(url)
-            elif "Download:" in line_text and "Direct download (link not available)" not in line_text:
-                url = line_text.split("Download:")[1].strip()
-                webbrowser.open(url)
+            link_range = self.overview_text.tag_prevrange("link", f"{index}+1c")
+            if link_range:
+                import webbrowser
+                webbrowser.open(self.overview_text.get(*link_range))
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open link: {e}")
     
-    def organize_files_by_directory(self, file_list):
-        """Organize files into a directory tree structure"""
-        tree = {}
-        
-        for file_info in file_list:
-            target_path = file_info['target_path']
-            archive_path = file_info['archive_path']
-            size = file_info['size']
-            
-            # Split target path into parts
-            parts = target_path.split('/')
-            
-            # Build tree structure
-            current = tree
-            for i, part in enumerate(parts[:-1]):
-                if part not in current:
-                    current[part] = {'type': 'dir', 'children': {}}
-                current = current[part]['children']
-            
-            # Add file
-            filename = parts[-1]
-            current[filename] = {
-                'type': 'file', 
-                'size': size, 
-                'target_path': target_path,
-                'archive_path': archive_path
-            }
-        
-        return tree
-    
-    def populate_files_tree(self, file_tree, parent=""):
-        """Recursively populate the files treeview"""
-        for name, item in file_tree.items():
-            if item['type'] == 'dir':
-                # Create directory node
-                dir_id = self.files_tree.insert(parent, 'end', text=f"📁 {name}/", 
-                                              values=("", ""), tags=('directory',))
-                # Recursively add children
-                self.populate_files_tree(item['children'], dir_id)
-            else:
-                # Create file node
-                size_str = f"{item['size']:,}" if item['size'] > 0 else "0"
-                source_path = item.get('archive_path', 'Unknown')
-                self.files_tree.insert(parent, 'end', text=f"📄 {name}", 
-                                     values=(source_path, size_str), tags=('file',))
-    
-    def populate_mod_list(self):
-        """Populate the treeview with mod data"""
-        self.tree.delete(*self.tree.get_children())
-        
-        for i, archive in enumerate(self.archives):
-            state = archive.get('State', {})
-            filename = archive.get('Name', 'Unknown Mod')
-            size = archive.get('Size', 0)
-            archive_hash = archive.get('Hash', '')
-            
-            # Get mod details
-            mod_author = state.get('Author', 'Unknown')
-            mod_version = state.get('Version', '')
-            actual_mod_name = state.get('Name', filename)
-            
-            # Calculate size in MB
-            size_mb = size / (1024 * 1024) if size > 0 else 0
-            
-            # Insert into treeview with archive_hash as a tag
-            item_id = self.tree.insert('', 'end', 
-                                     text=f"{i+1}. {actual_mod_name}",
-                                     values=(mod_author, mod_version, f"{size_mb:.1f}"),
-                                     tags=(archive_hash,))
+    def populate_files_tree(self, node, parent=""):
+        """Insert one directory level into the files treeview"""
+        for name, child in node.dirs.items():
+            # Directories show their totals and get a placeholder child until opened
+            dir_id = self.files_tree.insert(parent, 'end', text=f"📁 {name}/",
+                                          values=(f"{child.file_count:,} files", f"{child.total_size:,}"),
+                                          tags=('directory',))
+            self.files_tree.insert(dir_id, 'end', text="")
+            self.unopened_directories[dir_id] = child
+        
+        store = self.session.mod_details
+        for name, row in node.files:
+            # Create file node, noting files that are not copied from the archive as-is
+            source_path = store.entry(row).archive_path
+            directive_type = store.row_type(row)
+            if directive_type != 'FromArchive':
+                source_path = f"{source_path} ({directive_type})"
+            self.files_tree.insert(parent, 'end', text=f"📄 {name}",
+                                 values=(source_path, f"{store.size[row]:,}"), tags=('file',))
+    
+    def on_files_tree_open(self, event):
+        """Fill in a directory's contents the first time it is expanded"""
+        item = self.files_tree.focus()
+        node = self.unopened_directories.pop(item, None)
+        if node is not None:
+            with diagnostics.phase("Expand directory", len(node.dirs) + len(node.files)):
+                self.files_tree.delete(*self.files_tree.get_children(item))
+                self.populate_files_tree(node, item)
+    
+    def populate_mod_list(self, on_complete=None):
+        """Populate the mod list with the precomputed rows"""
+        with diagnostics.phase("Populate mod list", len(self.session.rows)):
+            self.mod_list.set_rows(self.session.rows)
+        
+        # Keep any search typed while the modlist was loading, and the sort order
+        if self.search_var.get():
+            self.filter_mods()
+        elif self.session.sorted_order is not None:
+            self.mod_list.set_order(list(self.session.sorted_order))
+        if on_complete:
+            on_complete()
+    
+    def schedule_filter(self, *args):
+        """Debounce search input so filtering runs once typing pauses"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.filter_mods)
     
     def filter_mods(self, *args):
-        """Filter mods based on search text"""
-        search_text = self.search_var.get().lower()
-        
-        # Hide all items first
-        for item in self.tree.get_children():
-            self.tree.detach(item)
-        
-        # Show only matching items
-        for i, archive in enumerate(self.archives):
-            state = archive.get('State', {})
-            filename = archive.get('Name', 'Unknown Mod')
-            size = archive.get('Size', 0)
-            archive_hash = archive.get('Hash', '')
-            
-            mod_author = state.get('Author', 'Unknown')
-            mod_version = state.get('Version', '')
-            actual_mod_name = state.get('Name', filename)
-            
-            # Check if search text matches
-            if (search_text in actual_mod_name.lower() or 
-                search_text in mod_author.lower() or 
-                search_text in filename.lower()):
-                
-                size_mb = size / (1024 * 1024) if size > 0 else 0
-                
-                item_id = self.tree.insert('', 'end',
-                                         text=f"{i+1}. {actual_mod_name}",
-                                         values=(mod_author, mod_version, f"{size_mb:.1f}"),
-                                         tags=(archive_hash,))
+        """Filter mods based on search text or a structured query"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = None
+        if self.session is None:
+            return
+        with diagnostics.phase("Search") as phase:
+            matches = self.search_matches()
+            self.mod_list.set_order(self.sorted_mods(matches))
+            phase['items'] = len(matches)
         
         # Update status
-        visible_count = len(self.tree.get_children())
-        self.status_var.set(f"Showing {visible_count} of {len(self.archives)} mods")
+        status = (f"Showing {len(matches)} of {len(self.session.archives)} mods "
+                  f"(searched in {format_seconds(phase['seconds'])})")
+        if self.session.query_error:
+            status += f"; searched as plain text, not a valid query: {self.session.query_error}"
+        self.status_var.set(status)
     
-    def on_mod_select(self, event):
-        """Handle mod selection and show details"""
-        selection = self.tree.selection()
-        if not selection:
+    def search_matches(self):
+        """Archive indexes matching the search box (plain text or a query), in modlist order"""
+        return self.session.search(self.search_var.get())
+    
+    def save_query(self):
+        """Save the search box text under a name"""
+        text = self.search_var.get().strip()
+        if not text:
+            messagebox.showinfo("Save Query", "Type a search or query first.")
             return
-        
-        item = selection[0]
-        # Get archive_hash from the item's tags
-        item_tags = self.tree.item(item, 'tags')
-        archive_hash = item_tags[0] if item_tags else ""
-        
-        # Find the archive data
-        archive = None
-        for arch in self.archives:
-            if arch.get('Hash') == archive_hash:
-                archive = arch
-                break
-        
-        if not archive:
+        try:
+            if is_structured(text):
+                Query(text)
+        except QueryError as e:
+            messagebox.showerror("Save Query", f"Invalid query: {e}")
             return
+        name = simpledialog.askstring("Save Query", "Name for this query:", parent=self.root,
+                                      initialvalue=self.saved_query_var.get())
+        if not name:
+            return
+        try:
+            self.saved_queries.save(name, text)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save query: {e}")
+            return
+        self.saved_query_box['values'] = self.saved_queries.names()
+        self.saved_query_var.set(name)
+    
+    def apply_saved_query(self, event=None):
+        """Put the picked saved query in the search box"""
+        text = self.saved_queries.get(self.saved_query_var.get())
+        if text is not None:
+            self.search_var.set(text)
+            self.filter_mods()
+    
+    def delete_saved_query(self):
+        """Forget the saved query picked in the list"""
+        name = self.saved_query_var.get()
+        if not name:
+            return
+        try:
+            self.saved_queries.delete(name)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to delete query: {e}")
+            return
+        self.saved_query_box['values'] = self.saved_queries.names()
+        self.saved_query_var.set('')
+    
+    def sort_mods(self, column):
+        """Sort the mod list by a column; clicking it again reverses the direction.
         
-        # Get mod details
-        state = archive.get('State', {})
-        filename = archive.get('Name', 'Unknown Mod')
-        size = archive.get('Size', 0)
-        
-        mod_type = state.get('$type', '')
-        mod_page_link = ""
-        direct_file_link = ""
-        mod_author = state.get('Author', 'Unknown')
-        mod_description = state.get('Description', '')
-        mod_version = state.get('Version', '')
-        actual_mod_name = state.get('Name', filename)
-        
-        # Generate links
-        if 'NexusDownloader' in mod_type:
-            mod_id = state.get('ModID')
-            file_id = state.get('FileID')
-            game_name = state.get('GameName', 'skyrimse')
-            
-            if mod_id and file_id:
-                if game_name.lower() == 'skyrimspecialedition':
-                    mod_page_link = f"https://www.nexusmods.com/skyrimspecialedition/mods/{mod_id}"
-                    direct_file_link = f"https://www.nexusmods.com/skyrimspecialedition/mods/{mod_id}?tab=files&file_id={file_id}"
-                else:
-                    mod_page_link = f"https://www.nexusmods.com/{game_name.lower()}/mods/{mod_id}"
-                    direct_file_link = f"https://www.nexusmods.com/{game_name.lower()}/mods/{mod_id}?tab=files&file_id={file_id}"
-        
-        elif 'HttpDownloader' in mod_type:
-            direct_file_link = state.get('Url', '')
-        
-        # Clear previous content
-        self.overview_text.delete(1.0, tk.END)
-        
-        # Build overview text with clickable links
-        overview = f"Mod Name: {actual_mod_name}\n"
-        overview += f"Filename: {filename}\n"
-        overview += f"Author: {mod_author}\n"
-        if mod_version:
-            overview += f"Version: {mod_version}\n"
-        
-        size_mb = size / (1024 * 1024) if size > 0 else 0
-        overview += f"Archive Size: {size_mb:.1f} MB\n\n"
-        
-        if mod_description:
-            overview += f"Description: {mod_description}\n\n"
-        
-        # Add download links with clickable formatting
-        if mod_page_link and direct_file_link:
-            overview += f"Mod Page: {mod_page_link}\n"
-            overview += f"Direct Download: {direct_file_link}\n\n"
-        elif direct_file_link:
-            overview += f"Download: {direct_file_link}\n\n"
+        The previously sorted columns are kept as tie breakers.
+        """
+        if self.sort_keys and self.sort_keys[0][0] == column:
+            self.sort_keys[0] = (column, not self.sort_keys[0][1])
         else:
-            overview += "Download: Direct download (link not available)\n\n"
-        
-        # Add file count information
-        if archive_hash in self.mod_details:
-            file_list = self.mod_details[archive_hash]
-            overview += f"Files to be installed: {len(file_list)} files\n"
-            total_size = sum(f['size'] for f in file_list)
-            overview += f"Total file size: {total_size:,} bytes ({total_size / (1024*1024):.1f} MB)\n"
-        else:
-            overview += "No file details available for this mod.\n"
+            self.sort_keys = [(column, False)] + [key for key in self.sort_keys if key[0] != column]
+            del self.sort_keys[MAX_SORT_KEYS:]
+        self.mod_list.show_sort(*self.sort_keys[0])
+        if self.session is None:
+            return
         
-        # Insert text and make links clickable
-        self.overview_text.insert(1.0, overview)
-        self.make_links_clickable()
+        with diagnostics.phase("Sort mod list", len(self.session.archives)):
+            self.update_sorted_order()
+            self.mod_list.set_order(self.sorted_mods(self.search_matches()))
         
-        # Update files tab (but don't switch to it)
-        self.update_files_tab(archive_hash)
+        # Keep the selected mod in view
+        if self.mod_list.selected is not None:
+            self.mod_list.select(self.mod_list.selected)
+    
+    def update_sorted_order(self):
+        """Recompute the order of all archives for the current sort keys"""
+        self.session.sort(self.sort_keys)
+    
+    def sorted_mods(self, matches):
+        """Put the archive indexes matching a search in the current sort order"""
+        return self.session.sorted_mods(matches)
+    
+    def on_mod_select(self, archive_index):
+        """Handle mod selection and show details"""
+        archive_hash = self.session.archives[archive_index].get('Hash', '')
+        with diagnostics.phase("Select mod", len(self.session.mod_details.get(archive_hash) or ())):
+            overview = self.session.overview(archive_index)
+            
+            # Insert text and make links clickable
+            self.overview_text.delete(1.0, tk.END)
+            self.overview_text.insert(1.0, overview.text)
+            self.make_links_clickable(overview.links)
+            
+            # Update files tab (but don't switch to it)
+            self.update_files_tab(archive_hash)
         
         # Switch to overview tab by default
         self.notebook.select(0)
+        
+        # Warm the caches for the rows around the selection once the UI is idle
+        if self.prefetch_job is not None:
+            self.root.after_cancel(self.prefetch_job)
+        self.prefetch_job = self.root.after_idle(self.prefetch_neighbours, archive_index)
+    
+    def prefetch_neighbours(self, archive_index):
+        """Build the detail views of the rows next to the selection ahead of time"""
+        self.prefetch_job = None
+        order = self.mod_list.order
+        try:
+            position = order.index(archive_index)
+        except ValueError:
+            return
+        
+        for neighbour in order[max(0, position - PREFETCH_ROWS):position + PREFETCH_ROWS + 1]:
+            if neighbour not in self.session.overviews:
+                self.session.overview(neighbour)
+            archive_hash = self.session.archives[neighbour].get('Hash', '')
+            if archive_hash in self.session.mod_details and archive_hash not in self.session.directory_trees:
+                self.session.directory_tree(archive_hash)
     
     def update_files_tab(self, archive_hash):
         """Update the files tab with organized file tree"""
         # Clear previous files
         self.files_tree.delete(*self.files_tree.get_children())
+        self.unopened_directories = {}
         
-        if archive_hash in self.mod_details:
-            file_list = self.mod_details[archive_hash]
-            
-            # Organize files by directory
-            file_tree = self.organize_files_by_directory(file_list)
-            
-            # Populate the tree
-            self.populate_files_tree(file_tree)
+        if archive_hash in self.session.mod_details:
+            # Only the top level is inserted; deeper levels are added when opened
+            node = self.session.directory_tree(archive_hash)
+            with diagnostics.phase("Files tab", len(node.dirs) + len(node.files)):
+                self.populate_files_tree(node)
         else:
             # Show message if no files
             self.files_tree.insert('', 'end', text="No file details available for this mod.")
     
-    def make_links_clickable(self):
-        """Make URLs in the text widget clickable"""
-        content = self.overview_text.get(1.0, tk.END)
-        lines = content.split('\n')
-        
-        for i, line in enumerate(lines):
-            if "Mod Page:" in line:
-                start = f"{i+1}.{line.find('Mod Page:') + 10}"
-                end = f"{i+1}.{len(line)}"
-                self.overview_text.tag_add("link", start, end)
-            elif "Direct Download:" in line:
-                start = f"{i+1}.{line.find('Direct Download:') + 17}"
-                end = f"{i+1}.{len(line)}"
-                self.overview_text.tag_add("link", start, end)
-            elif "Download:" in line and "Direct download (link not available)" not in line:
-                start = f"{i+1}.{line.find('Download:') + 10}"
-                end = f"{i+1}.{len(line)}"
-                self.overview_text.tag_add("link", start, end)
+    def make_links_clickable(self, links):
+        """Tag the (start, end, url) link spans of the overview text as clickable"""
+        for start, end, url in links:
+            self.overview_text.tag_add("link", f"1.0+{start}c", f"1.0+{end}c")
 
 def main():
+    # Downloads are hashed in worker processes, which a frozen build must support
+    # (multiprocessing is only imported then, as it slows down startup)
+    if getattr(sys, 'frozen', False):
+        import multiprocessing
+        multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="Browse Wabbajack modlists")
+    parser.add_argument('wabbajack', nargs='?',
+                        help="Modlist to open, loaded in the background once the window is shown")
+    parser.add_argument('--profile', metavar='FILE',
+                        help=f"Write a cProfile/tracemalloc report for the session to FILE on exit "
+                             f"(or set {PROFILE_ENV_VAR})")
+    args = parser.parse_args()
+    start_session_profile(args.profile)
+    
     root = tk.Tk()
-    app = WabbajackGuideApp(root)
+    app = WabbajackGuideApp(root, args.wabbajack)
     root.mainloop()
 
 if __name__ == "__main__":